@@ -0,0 +1,149 @@
+"""
+Аналитика режима питания по всей истории пользователя.
+
+Приёмы загружаются одним запросом в виде колонок (дни / минуты суток / ккал),
+все распределения считаются векторно в NumPy. Результат кэшируется в
+nutrition_bot.meal_timing_summary и сбрасывается при изменении приёмов
+(см. refresh_day_stats), поэтому повторный просмотр — одно чтение по ключу.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.repo_stats import StatsRepo
+
+
+# версия формата payload: при изменении расчёта старый кэш пересчитывается
+TIMING_VERSION = 1
+
+# «поздние» приёмы: с 21:00 до 05:00
+LATE_FROM_MIN = 21 * 60
+LATE_TO_MIN = 5 * 60
+
+# сколько пиков по часам показывать как «типичное время»
+TYPICAL_HOURS = 3
+
+
+@dataclass(frozen=True)
+class DayTypeTiming:
+    days: int
+    avg_kcal: float               # по дням с записями
+    avg_meals: float
+    first_meal_median: Optional[int]   # минуты от полуночи
+    last_meal_median: Optional[int]
+
+
+@dataclass(frozen=True)
+class MealTiming:
+    meals: int
+    days: int
+    hour_hist: List[int]          # приёмов по часам 0..23
+    typical_hours: List[int]      # самые частые часы приёмов
+    meal_time_median: Optional[int]
+    window_median: Optional[int]  # пищевое окно (первый—последний приём), мин; дни с 2+ приёмами
+    window_mean: Optional[int]
+    late_kcal_share: float        # доля ккал поздних приёмов, 0..1
+    weekday: DayTypeTiming
+    weekend: DayTypeTiming
+
+
+def _median_int(a: np.ndarray) -> Optional[int]:
+    return int(round(float(np.median(a)))) if a.size else None
+
+
+def _day_type(mask: np.ndarray, day_kcal: np.ndarray, day_meals: np.ndarray,
+              first: np.ndarray, last: np.ndarray) -> DayTypeTiming:
+    n = int(mask.sum())
+    return DayTypeTiming(
+        days=n,
+        avg_kcal=float(day_kcal[mask].mean()) if n else 0.0,
+        avg_meals=float(day_meals[mask].mean()) if n else 0.0,
+        first_meal_median=_median_int(first[mask]),
+        last_meal_median=_median_int(last[mask]),
+    )
+
+
+def compute_meal_timing(days: np.ndarray, minutes: np.ndarray, kcal: np.ndarray) -> MealTiming:
+    """
+    days — номер дня от 1970-01-01, minutes — минуты от полуночи, kcal — ккал приёма.
+    Массивы отсортированы по (день, время).
+    """
+    n = int(days.size)
+    if n == 0:
+        empty = DayTypeTiming(days=0, avg_kcal=0.0, avg_meals=0.0, first_meal_median=None, last_meal_median=None)
+        return MealTiming(
+            meals=0, days=0, hour_hist=[0] * 24, typical_hours=[], meal_time_median=None,
+            window_median=None, window_mean=None, late_kcal_share=0.0, weekday=empty, weekend=empty,
+        )
+
+    hour_hist = np.bincount(minutes // 60, minlength=24)
+    typical = np.argsort(-hour_hist, kind="stable")[:TYPICAL_HOURS]
+    typical = np.sort(typical[hour_hist[typical] > 0])
+
+    # границы дней в отсортированных массивах
+    day_ids, starts, counts = np.unique(days, return_index=True, return_counts=True)
+    first = minutes[starts]
+    last = minutes[starts + counts - 1]
+    day_kcal = np.add.reduceat(kcal, starts)
+
+    multi = counts >= 2
+    windows = (last - first)[multi]
+
+    late = (minutes >= LATE_FROM_MIN) | (minutes < LATE_TO_MIN)
+    total_kcal = float(kcal.sum())
+    late_share = float(kcal[late].sum()) / total_kcal if total_kcal > 0 else 0.0
+
+    # 1970-01-01 — четверг: (день + 3) % 7 даёт Пн=0 … Вс=6
+    weekend = (day_ids + 3) % 7 >= 5
+
+    return MealTiming(
+        meals=n,
+        days=int(day_ids.size),
+        hour_hist=[int(x) for x in hour_hist],
+        typical_hours=[int(x) for x in typical],
+        meal_time_median=_median_int(minutes),
+        window_median=_median_int(windows),
+        window_mean=int(round(float(windows.mean()))) if windows.size else None,
+        late_kcal_share=late_share,
+        weekday=_day_type(~weekend, day_kcal, counts, first, last),
+        weekend=_day_type(weekend, day_kcal, counts, first, last),
+    )
+
+
+def _to_payload(t: MealTiming) -> dict:
+    return {"v": TIMING_VERSION, **asdict(t)}
+
+
+def _from_payload(p: dict) -> Optional[MealTiming]:
+    if p.get("v") != TIMING_VERSION:
+        return None
+    data = {k: v for k, v in p.items() if k != "v"}
+    data["weekday"] = DayTypeTiming(**data["weekday"])
+    data["weekend"] = DayTypeTiming(**data["weekend"])
+    return MealTiming(**data)
+
+
+async def get_meal_timing(session: AsyncSession, user_id: uuid.UUID) -> MealTiming:
+    """
+    Аналитика из кэша; при промахе — расчёт по всей истории и запись в кэш.
+    """
+    repo = StatsRepo(session)
+    cached = await repo.get_timing_summary(user_id)
+    if cached is not None:
+        t = _from_payload(cached)
+        if t is not None:
+            return t
+
+    days, minutes, kcal = await repo.meal_timing_columns(user_id)
+    t = compute_meal_timing(
+        np.asarray(days, dtype=np.int32),
+        np.asarray(minutes, dtype=np.int32),
+        np.asarray(kcal, dtype=np.float64),
+    )
+    await repo.put_timing_summary(user_id, _to_payload(t))
+    return t
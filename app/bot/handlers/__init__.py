@@ -2,8 +2,11 @@ from aiogram import Router
 
 from .start import router as start_router
 from .menu import router as menu_router
+from .quick_log import router as quick_log_router
 from .add_meal import router as add_meal_router
 from .day_view import router as day_view_router
+from .meal_templates import router as meal_templates_router
+from .edit_meal import router as edit_meal_router
 from .stats import router as stats_router
 from .admin_products import router as admin_products_router
 from .noop import router as noop_router
@@ -13,9 +16,12 @@ def build_router() -> Router:
     r = Router()
     r.include_router(start_router)
     r.include_router(menu_router)
+    r.include_router(quick_log_router)
     r.include_router(add_meal_router)
     r.include_router(stats_router)
     r.include_router(day_view_router)
+    r.include_router(meal_templates_router)
+    r.include_router(edit_meal_router)
     r.include_router(admin_products_router)
     r.include_router(noop_router)
     return r
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import uuid
+from dataclasses import asdict
 from datetime import date, time
 
 from aiogram import Router, F
@@ -10,9 +11,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.bot.states import AddMealFlow
 from app.bot.keyboards.time_picker import build_time_picker, TimePickCb, TimeActionCb
-from app.bot.keyboards.products import build_product_candidates_kb, ProductPickCb, ProductActionCb, ProductPageCb
+from app.bot.keyboards.products import (
+    build_product_candidates_kb,
+    build_frequent_products_kb,
+    build_items_review_kb,
+    ItemReviewCb,
+    ProductPickCb,
+    ProductActionCb,
+    ProductPageCb,
+    FrequentPickCb,
+)
 from app.bot.utils.dates import now_in_tz
-from app.bot.utils.parse import parse_time_hhmm, snap_to_15, parse_items_csv
+from app.bot.utils.parse import parse_time_hhmm, snap_to_15, parse_items, parse_nutrition
 from app.bot.utils.panel import edit_panel_from_callback, ensure_panel
 from app.bot.utils.text import (
     pick_time_text,
@@ -20,9 +30,16 @@ from app.bot.utils.text import (
     enter_items_text,
     map_item_text,
     ask_grams_text,
+    own_product_text,
+    quick_items_text,
+    frequent_hint_text,
+    items_review_text,
 )
-from app.db.repo_meals import MealRepo
-from app.db.repo_products import ProductRepo
+from app.db.repo_frequent import FrequentRepo
+from app.db.repo_meals import MealRepo, DraftItem, DraftPhoto
+from app.db.repo_products import ProductRepo, RankedCandidate, BUCKET_HISTORY, is_confident
+from app.db.repo_usage import UsageRepo
+from app.db.repo_user_products import UserProductRepo
 
 from app.bot.keyboards.meals import build_day_meals_kb
 from app.bot.keyboards.menu import main_menu_kb
@@ -46,6 +63,67 @@ def _grams_kb() -> "object":
     return b.as_markup()
 
 
+def _photo_kb(*, with_skip: bool) -> "object":
+    from aiogram.utils.keyboard import InlineKeyboardBuilder
+    b = InlineKeyboardBuilder()
+    b.button(text="✅ Готово", callback_data="photo:done")
+    if with_skip:
+        b.button(text="⏭ Пропустить фото", callback_data="photo:done")
+    b.button(text="⬅️ В меню", callback_data="menu:back")
+    b.adjust(1)
+    return b.as_markup()
+
+
+PHOTO_PROMPT_TEXT = "Теперь пришли фото (можно несколько). Когда закончишь — нажми «Готово»."
+
+
+# ========== черновик ==========
+# Весь приём пищи до «Готово» живёт в FSM: meal_id (сгенерирован заранее — нужен для пути фото),
+# draft_items (DraftItem как dict), draft_photos (DraftPhoto как dict).
+# В БД он пишется одной транзакцией в photo_done, брошенный flow ничего не оставляет.
+async def _start_draft(state: FSMContext, t: time) -> None:
+    await state.update_data(
+        meal_time=t,
+        meal_id=str(uuid.uuid4()),
+        note=None,
+        draft_items=[],
+        draft_photos=[],
+        quick_items=[],
+    )
+
+
+def _draft_item(st: dict, item_id: str) -> dict | None:
+    return next((it for it in st.get("draft_items", []) if it["id"] == item_id), None)
+
+
+async def _update_draft_item(state: FSMContext, item_id: str, **changes) -> None:
+    st = await state.get_data()
+    items = [dict(it, **changes) if it["id"] == item_id else it for it in st.get("draft_items", [])]
+    await state.update_data(draft_items=items)
+
+
+async def _items_prompt(state: FSMContext, session: AsyncSession, user_id) -> tuple[str, "object"]:
+    """
+    Экран ввода продуктов: текст + клавиатура "⭐ Частые продукты" (из предрасчитанной агрегации).
+    """
+    st = await state.get_data()
+    d: date = st["meal_date"]
+    t: time = st["meal_time"]
+    quick: list[dict] = st.get("quick_items", [])
+
+    frequent = await FrequentRepo(session).list_for_user(user_id)
+
+    parts = []
+    if quick:
+        parts.append(quick_items_text(quick))
+    parts.append(enter_items_text(d, t))
+    if frequent:
+        parts.append(frequent_hint_text())
+
+    kb = build_frequent_products_kb(products=frequent, can_finish=bool(quick))
+    return "\n\n".join(parts), kb
+
+
 async def _render_return_screen(
     cq: CallbackQuery,
     *,
@@ -112,7 +190,6 @@ async def day_add_meal(cq: CallbackQuery, state: FSMContext, profile):
 
     await state.update_data(
         meal_date=d,
-        replace_meal_id=None,
         return_to=f"day:view:{d.isoformat()}",
     )
     await state.set_state(AddMealFlow.picking_time)
@@ -121,18 +198,9 @@ async def day_add_meal(cq: CallbackQuery, state: FSMContext, profile):
     await edit_panel_from_callback(cq, pick_time_text(d), build_time_picker(now))
 
 
-async def _cleanup_draft(session: AsyncSession, state: FSMContext) -> None:
-    data = await state.get_data()
-    meal_id = data.get("meal_id")
-    if meal_id:
-        repo = MealRepo(session)
-        await repo.delete_meal(uuid.UUID(meal_id))
-
-
 @router.callback_query(StateFilter(AddMealFlow), F.data == "menu:back")
-async def flow_cancel_to_menu(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
-    # если начали flow и уже создали meal (после выбора времени), удаляем черновик
-    await _cleanup_draft(session, state)
+async def flow_cancel_to_menu(cq: CallbackQuery, state: FSMContext):
+    # черновик только в FSM — в БД до «Готово» ничего не писали
     await state.clear()
     from app.bot.utils.text import menu_text
     from app.bot.keyboards.menu import main_menu_kb
@@ -144,17 +212,13 @@ async def flow_cancel_to_menu(cq: CallbackQuery, state: FSMContext, session: Asy
 # ========== time picker ==========
 @router.callback_query(AddMealFlow.picking_time, TimePickCb.filter())
 async def time_picked(cq: CallbackQuery, callback_data: TimePickCb, state: FSMContext, session: AsyncSession, user_id):
-    st = await state.get_data()
-    d: date = st["meal_date"]
     t = time(hour=callback_data.hh, minute=callback_data.mm)
 
-    repo = MealRepo(session)
-    meal = await repo.create_meal(user_id=user_id, meal_date=d, meal_time=t, note=None)
-
-    await state.update_data(meal_time=t, meal_id=str(meal.id))
+    await _start_draft(state, t)
     await state.set_state(AddMealFlow.typing_items)
 
-    await edit_panel_from_callback(cq, enter_items_text(d, t), reply_markup=None)
+    text, kb = await _items_prompt(state, session, user_id)
+    await edit_panel_from_callback(cq, text, reply_markup=kb)
 
 
 @router.callback_query(AddMealFlow.picking_time, TimeActionCb.filter(F.action == "custom"))
@@ -177,21 +241,17 @@ async def time_custom_input(message: Message, state: FSMContext, profile, sessio
         return
 
     t = snap_to_15(t0)
-    st = await state.get_data()
-    d: date = st["meal_date"]
-
-    repo = MealRepo(session)
-    meal = await repo.create_meal(user_id=user_id, meal_date=d, meal_time=t, note=None)
 
-    await state.update_data(meal_time=t, meal_id=str(meal.id))
+    await _start_draft(state, t)
     await state.set_state(AddMealFlow.typing_items)
 
+    text, kb = await _items_prompt(state, session, user_id)
     await ensure_panel(
         bot=message.bot,
         chat_id=message.chat.id,
         state=state,
-        text=enter_items_text(d, t),
-        reply_markup=None,
+        text=text,
+        reply_markup=kb,
     )
 
 
@@ -202,104 +262,316 @@ async def time_back(cq: CallbackQuery, state: FSMContext, profile, session: Asyn
 
 # ========== items text ==========
 @router.message(AddMealFlow.typing_items)
-async def items_input(message: Message, state: FSMContext, session: AsyncSession):
+async def items_input(message: Message, state: FSMContext, session: AsyncSession, user_id):
     st = await state.get_data()
-    meal_id = uuid.UUID(st["meal_id"])
-    raw_items = parse_items_csv(message.text or "")
-    if not raw_items:
+    parsed = parse_items(message.text or "")
+    if not parsed:
         await ensure_panel(
             bot=message.bot,
             chat_id=message.chat.id,
             state=state,
-            text="Не вижу продуктов. Напиши через запятую, например: макароны, котлеты",
+            text="Не вижу продуктов. Напиши через запятую, например: макароны 150г, котлеты",
             reply_markup=None,
         )
         return
 
-    repo = MealRepo(session)
-    meal = await repo.get_meal(meal_id)
-    if meal is None:
+    draft_items: list[dict] = list(st.get("draft_items", []))
+
+    # граммы, указанные прямо в тексте, сразу в черновик — для таких позиций шаг граммов пропускается
+    mappings = await _auto_mappings(session, user_id, [raw for raw, _ in parsed], accept_confident=True)
+    new_items = [
+        DraftItem(id=str(uuid.uuid4()), position=idx, raw_name=raw, grams=grams, **mapping)
+        for idx, ((raw, grams), mapping) in enumerate(zip(parsed, mappings), start=len(draft_items) + 1)
+    ]
+
+    await state.update_data(
+        note=message.text.strip(),
+        draft_items=draft_items + [asdict(it) for it in new_items],
+    )
+    await _start_items_step(message.chat.id, message.bot, state, session, user_id, [it.id for it in new_items])
+
+
+def _is_mapped(draft: dict) -> bool:
+    return bool(draft.get("product_ref_id") or draft.get("user_product_id"))
+
+
+async def _start_items_step(chat_id: int, bot, state: FSMContext, session: AsyncSession, user_id, item_ids: list[str]) -> None:
+    """
+    Шаг после ввода позиций. Если часть позиций уже привязана (свой продукт, история, exact,
+    уверенный авто-выбор) — одна сводка по всем позициям: подтвердить разом или нажать на
+    позицию, чтобы поменять. Если не привязано ничего — сразу маппинг по одной позиции.
+    """
+    await state.update_data(review_ids=item_ids, item_ids=item_ids, item_index=0, mapping_confirmed=False)
+    st = await state.get_data()
+    if any(_is_mapped(_draft_item(st, i)) for i in item_ids):
+        await _show_items_review(chat_id, bot, state)
+        return
+    await state.update_data(items_review=False)
+    await state.set_state(AddMealFlow.mapping_item)
+    await _render_mapping_step(chat_id, bot, state, session, user_id)
+
+
+async def _show_items_review(chat_id: int, bot, state: FSMContext) -> None:
+    await state.update_data(items_review=True)
+    await state.set_state(AddMealFlow.reviewing_items)
+    st = await state.get_data()
+    items = [_draft_item(st, i) for i in st.get("review_ids", [])]
+    await ensure_panel(
+        bot=bot,
+        chat_id=chat_id,
+        state=state,
+        text=items_review_text(items),
+        reply_markup=build_items_review_kb(items),
+    )
+
+
+async def _render_item_step(chat_id: int, bot, state: FSMContext, session: AsyncSession, user_id) -> None:
+    """
+    Текущая позиция (item_index): после подтверждения сводки привязанным позициям нужны
+    только граммы, остальным — шаг маппинга.
+    """
+    st = await state.get_data()
+    draft = _draft_item(st, st["item_ids"][int(st["item_index"])])
+    assert draft is not None
+    if st.get("mapping_confirmed") and _is_mapped(draft):
+        await state.update_data(current_item_id=draft["id"])
+        await state.set_state(AddMealFlow.typing_grams)
         await ensure_panel(
-            bot=message.bot,
-            chat_id=message.chat.id,
+            bot=bot,
+            chat_id=chat_id,
             state=state,
-            text="Ошибка: прием пищи не найден. Попробуй заново.",
-            reply_markup=None,
+            text=f"✅ {draft.get('product_name') or draft['raw_name']}\n\nВведи граммы:",
+            reply_markup=_grams_kb(),
         )
         return
+    await state.set_state(AddMealFlow.mapping_item)
+    await _render_mapping_step(chat_id, bot, state, session, user_id)
 
-    meal.note = message.text.strip()
-    items = await repo.create_items_for_meal(meal_id, raw_items)
 
-    # Авто-маппинг: точное совпадение по name или synonym
-    repo_p = ProductRepo(session)
-    for it in items:
-        exact = await repo_p.find_exact_product(it.raw_name)
-        if exact:
-            await repo.set_item_product(it.id, exact.id)
+@router.callback_query(AddMealFlow.reviewing_items, ItemReviewCb.filter())
+async def review_item_picked(cq: CallbackQuery, callback_data: ItemReviewCb, state: FSMContext, session: AsyncSession, user_id):
+    item_id = str(short_to_uuid(callback_data.item))
+    if _draft_item(await state.get_data(), item_id) is None:
+        await cq.answer("Ошибка: позиция не найдена", show_alert=True)
+        return
 
-    await state.update_data(item_ids=[str(it.id) for it in items], item_index=0)
+    # маппинг одной позиции, после него (и граммов, если их нет) — обратно в сводку
+    await state.update_data(item_ids=[item_id], item_index=0, mapping_confirmed=False)
     await state.set_state(AddMealFlow.mapping_item)
-    await _render_mapping_step(message.chat.id, message.bot, state, session)
+    await _render_mapping_step(cq.message.chat.id, cq.bot, state, session, user_id)
+    await cq.answer()
 
 
-async def _render_mapping_step(chat_id: int, bot, state: FSMContext, session: AsyncSession, page: int = 1):
+@router.callback_query(AddMealFlow.reviewing_items, F.data == "items:confirm")
+async def review_confirmed(cq: CallbackQuery, state: FSMContext, session: AsyncSession, user_id):
     st = await state.get_data()
-    idx = int(st["item_index"])
-    item_ids: list[str] = st["item_ids"]
-    item_id = uuid.UUID(item_ids[idx])
+    pending = [
+        i for i in st.get("review_ids", [])
+        if not _is_mapped(_draft_item(st, i)) or _draft_item(st, i).get("grams") is None
+    ]
+    await state.update_data(items_review=False, mapping_confirmed=True, item_ids=pending, item_index=0)
+
+    if not pending:
+        await state.set_state(AddMealFlow.waiting_photo)
+        await state.update_data(photos_count=0)
+        await edit_panel_from_callback(cq, PHOTO_PROMPT_TEXT, reply_markup=_photo_kb(with_skip=True))
+        return
 
-    repo_m = MealRepo(session)
-    item = await repo_m.get_item(item_id)
-    assert item is not None
+    await _render_item_step(cq.message.chat.id, cq.bot, state, session, user_id)
+    await cq.answer()
 
-    repo_p = ProductRepo(session)
 
-    # Если ещё не выбран продукт — пробуем exact match и ставим его как "выбран по умолчанию",
-    # но всё равно показываем список (как ты хотел).
-    if item.product_ref_id is None:
-        exact = await repo_p.find_exact_product(item.raw_name)
-        if exact:
-            await repo_m.set_item_product(item_id, exact.id)
-
-    # Подтягиваем item заново (чтобы увидеть выбранный product_ref_id)
-    item = await repo_m.get_item(item_id)
-    assert item is not None
-
-    page_size = 10
-    total_candidates = 0
-    candidates = []
-    candidates, total_candidates = await repo_p.search_ranked_candidates(
-        item.raw_name,
+@router.callback_query(AddMealFlow.typing_items, FrequentPickCb.filter())
+async def frequent_picked(cq: CallbackQuery, callback_data: FrequentPickCb, state: FSMContext, session: AsyncSession, user_id):
+    """
+    Одно нажатие — готовая позиция: продукт + обычная порция + ккал (без маппинга и ввода граммов).
+    """
+    product_id = short_to_uuid(callback_data.prod)
+    frequent = await FrequentRepo(session).list_for_user(user_id)
+    fp = next((p for p in frequent if p.product_id == product_id), None)
+    if fp is None:
+        await cq.answer("Продукт не найден, введи его текстом", show_alert=True)
+        return
+
+    st = await state.get_data()
+    quick: list[dict] = list(st.get("quick_items", []))
+    draft_items: list[dict] = list(st.get("draft_items", []))
+
+    item = DraftItem(
+        id=str(uuid.uuid4()),
+        position=len(draft_items) + 1,
+        raw_name=fp.name,
+        product_ref_id=str(fp.product_id),
+        grams=fp.usual_grams,
+    )
+    quick.append({"name": fp.name, "grams": fp.usual_grams, "kcal": round(fp.kcal_per_100g * fp.usual_grams / 100.0, 2)})
+    await state.update_data(quick_items=quick, draft_items=draft_items + [asdict(item)])
+
+    text, kb = await _items_prompt(state, session, user_id)
+    await edit_panel_from_callback(cq, text, reply_markup=kb)
+
+
+@router.callback_query(AddMealFlow.typing_items, F.data == "items:done")
+async def items_done(cq: CallbackQuery, state: FSMContext):
+    st = await state.get_data()
+    if not st.get("quick_items"):
+        await cq.answer("Сначала добавь хотя бы один продукт", show_alert=True)
+        return
+
+    await state.set_state(AddMealFlow.waiting_photo)
+    await state.update_data(photos_count=0)
+    await edit_panel_from_callback(cq, PHOTO_PROMPT_TEXT, reply_markup=_photo_kb(with_skip=True))
+
+
+async def _candidates_page(
+    session: AsyncSession,
+    user_id,
+    raw_name: str,
+    page: int,
+    page_size: int = 10,
+) -> tuple[list[RankedCandidate], int, int]:
+    """
+    Страница кандидатов для raw_name: (кандидаты, номер страницы, всего страниц).
+    Ранжированный список кэшируется на время шага маппинга:
+    листание страниц и возврат с экрана граммов — срез из кэша без запросов к БД.
+    Свои продукты пользователя (поиск по ним в памяти) и ранее выбранные для этого raw_name
+    продукты справочника — наверх первой страницы.
+    """
+    pinned = await UserProductRepo(session).search(user_id, raw_name)
+    pinned += [
+        RankedCandidate(product_id=p.product_id, name=p.name, score=1.0, bucket=BUCKET_HISTORY)
+        for p in await UsageRepo(session).picks_for(user_id, raw_name)
+    ]
+    candidates, total_candidates = await ProductRepo(session).search_ranked_candidates(
+        raw_name,
         limit=page_size,
         offset=(page - 1) * page_size,
+        pinned=pinned,
     )
     total_pages = max(1, (total_candidates + page_size - 1) // page_size)
-    page = max(1, min(total_pages, page))
+    return candidates, max(1, min(total_pages, page)), total_pages
+
+
+async def _auto_mappings(
+    session: AsyncSession,
+    user_id,
+    raw_names: list[str],
+    *,
+    accept_confident: bool = False,
+) -> list[dict]:
+    """
+    Авто-маппинг позиций — поля привязки DraftItem для каждого raw_name:
+    свой продукт пользователя с таким же названием, затем персональная история
+    (raw_name всегда маппился в один продукт), затем точное совпадение по name или synonym.
+    Первые два — из кэшей в памяти, справочник — одним запросом на все оставшиеся имена.
+    accept_confident — для оставшихся ещё и уверенный лучший кандидат ранжированного поиска
+    (is_confident; auto_selected=True). Выдача поиска остаётся в кэше для шага маппинга.
+    """
+    user_products = UserProductRepo(session)
+    usage = UsageRepo(session)
+    repo_p = ProductRepo(session)
+
+    result: list[dict | None] = []
+    for raw in raw_names:
+        own = await user_products.find_exact(user_id, raw)
+        if own is not None:
+            result.append({"product_ref_id": None, "user_product_id": str(own.id), "product_name": own.name})
+            continue
+        personal = await usage.auto_pick(user_id, raw)
+        result.append({"product_ref_id": str(personal.product_id), "user_product_id": None} if personal else None)
+
+    rest = [raw for raw, m in zip(raw_names, result) if m is None]
+    exact = await repo_p.find_exact_products(rest) if rest else {}
+    for i, raw in enumerate(raw_names):
+        if result[i] is None and raw in exact:
+            result[i] = {"product_ref_id": str(exact[raw]), "user_product_id": None}
+
+    if accept_confident:
+        for i, raw in enumerate(raw_names):
+            if result[i] is not None:
+                continue
+            top, _ = await repo_p.search_ranked_candidates(raw, limit=1, offset=0)
+            if top and is_confident(top[0]):
+                result[i] = {
+                    "product_ref_id": str(top[0].product_id),
+                    "user_product_id": None,
+                    "product_name": top[0].name,
+                    "auto_selected": True,
+                }
+
+    # имена продуктов справочника для сводки — из кэша фактов
+    facts = await repo_p.get_facts_many(
+        [uuid.UUID(m["product_ref_id"]) for m in result if m is not None and m["product_ref_id"] and "product_name" not in m]
+    )
+    out: list[dict] = []
+    for m in result:
+        if m is None:
+            m = {"product_ref_id": None, "user_product_id": None}
+        elif m["product_ref_id"] and "product_name" not in m:
+            f = facts.get(uuid.UUID(m["product_ref_id"]))
+            m = dict(m, product_name=f.name if f else None)
+        out.append(m)
+    return out
+
+
+async def _render_mapping_step(chat_id: int, bot, state: FSMContext, session: AsyncSession, user_id, page: int = 1):
+    st = await state.get_data()
+    idx = int(st["item_index"])
+    item_ids: list[str] = st["item_ids"]
+    item_id = uuid.UUID(item_ids[idx])
+
+    draft = _draft_item(st, item_ids[idx])
+    assert draft is not None
+    raw_name: str = draft["raw_name"]
+
+    repo_p = ProductRepo(session)
+
+    # Если ещё не выбран продукт — пробуем свой продукт / персональный авто-выбор / exact match
+    # и ставим его как "выбран по умолчанию", но всё равно показываем список (как ты хотел).
+    own_id = draft.get("user_product_id")
+    if not (draft["product_ref_id"] or own_id):
+        mapping = (await _auto_mappings(session, user_id, [raw_name]))[0]
+        if mapping["product_ref_id"] or mapping["user_product_id"]:
+            await _update_draft_item(state, item_ids[idx], record_usage=False, **mapping)
+            draft = dict(draft, **mapping)
+            own_id = draft["user_product_id"]
+    selected = draft["product_ref_id"] or own_id
+    selected_id = uuid.UUID(selected) if selected else None
+
+    candidates, page, total_pages = await _candidates_page(session, user_id, raw_name, page)
 
     kb = build_product_candidates_kb(
         item_id=item_id,
         candidates=candidates,
-        selected_product_id=item.product_ref_id,
+        selected_product_id=selected_id,
         page=page,
         total_pages=total_pages,
     )
 
     # Текст: каноническое имя, если выбрано
     chosen_line = ""
-    if item.product_ref_id:
-        prod = await repo_p.get_product(item.product_ref_id)
-        if prod:
-            if str(prod.name).casefold() == item.raw_name.casefold():
-                chosen_line = f"Текущее: ✅ {prod.name}\n\n"
+    if selected_id:
+        # имя выбранного обычно уже есть среди кандидатов страницы
+        chosen_name = next((c.name for c in candidates if c.product_id == selected_id), None)
+        if chosen_name is None and own_id:
+            own = await UserProductRepo(session).get(user_id, selected_id)
+            chosen_name = own.name if own else None
+        elif chosen_name is None:
+            facts = await repo_p.get_facts(selected_id)
+            chosen_name = facts.name if facts else None
+        if chosen_name:
+            if chosen_name.casefold() == raw_name.casefold():
+                chosen_line = f"Текущее: ✅ {chosen_name}\n\n"
             else:
-                chosen_line = f"Текущее: ✅ {prod.name} (ввели: {item.raw_name})\n\n"
+                chosen_line = f"Текущее: ✅ {chosen_name} (ввели: {raw_name})\n\n"
 
+    grams_line = f"Граммы: {draft['grams']:g} г\n" if draft.get("grams") is not None else ""
     text = (
         f"{chosen_line}"
-        f"Продукт {idx + 1}/{len(item_ids)}\n\n"
+        f"Продукт {idx + 1}/{len(item_ids)}\n{grams_line}\n"
         f"Выбери продукт из справочника:\n"
-        f"🎯 точное совпадение → 🔎 похожие по названию → 🔁 похожие синонимы"
+        f"👤 свои → ⭐ выбирал раньше → 🎯 точное совпадение → 🔎 похожие по названию → 🔁 похожие синонимы\n"
+        f"Нет в списке — «➕ Свой продукт»."
     )
 
     await ensure_panel(
@@ -313,26 +585,53 @@ async def _render_mapping_step(chat_id: int, bot, state: FSMContext, session: As
 
 # ========== mapping ==========
 @router.callback_query(AddMealFlow.mapping_item, ProductPickCb.filter())
-async def product_picked(cq: CallbackQuery, callback_data: ProductPickCb, state: FSMContext, session: AsyncSession):
+async def product_picked(cq: CallbackQuery, callback_data: ProductPickCb, state: FSMContext, session: AsyncSession, user_id):
     from app.bot.utils.ids import short_to_uuid
 
     item_id = short_to_uuid(callback_data.item)
     product_id = short_to_uuid(callback_data.prod)
 
-    repo_m = MealRepo(session)
-    await repo_m.set_item_product(item_id, product_id)
-
-    item = await repo_m.get_item(item_id)
-    if item is None:
+    if _draft_item(await state.get_data(), str(item_id)) is None:
         await cq.answer("Ошибка: позиция не найдена", show_alert=True)
         return
 
-    # для подтверждения покажем, что привязали
-    repo_p = ProductRepo(session)
-    prod = await repo_p.get_product(product_id)
-    prod_name = str(prod.name) if prod else "неизвестный продукт"
+    if callback_data.src == "u":
+        own = await UserProductRepo(session).get(user_id, product_id)
+        if own is None:
+            await cq.answer("Продукт не найден", show_alert=True)
+            return
+        facts = own.facts()
+        await _update_draft_item(
+            state,
+            str(item_id),
+            product_ref_id=None,
+            user_product_id=str(own.id),
+            product_name=own.name,
+            auto_selected=False,
+            record_usage=False,
+        )
+    else:
+        facts = await ProductRepo(session).get_facts(product_id)
+        await _update_draft_item(
+            state,
+            str(item_id),
+            product_ref_id=str(product_id),
+            user_product_id=None,
+            product_name=facts.name if facts else None,
+            auto_selected=False,
+            record_usage=True,
+        )
 
     await state.update_data(current_item_id=str(item_id))
+    # граммы указаны во вводе — сразу к следующей позиции
+    if _draft_item(await state.get_data(), str(item_id)).get("grams") is not None:
+        await _advance_item(cq.message.chat.id, cq.bot, state, session, user_id)
+        await cq.answer()
+        return
+
+    # для подтверждения покажем, что привязали
+    prod_name = f"{facts.name} ({facts.kcal_per_100g:g} ккал/100 г)" if facts else "неизвестный продукт"
+
     await state.set_state(AddMealFlow.typing_grams)
 
     await edit_panel_from_callback(
@@ -343,23 +642,98 @@ async def product_picked(cq: CallbackQuery, callback_data: ProductPickCb, state:
 
 
 @router.callback_query(AddMealFlow.mapping_item, ProductActionCb.filter(F.action == "skip"))
-async def product_skip(cq: CallbackQuery, callback_data: ProductActionCb, state: FSMContext, session: AsyncSession):
+async def product_skip(cq: CallbackQuery, callback_data: ProductActionCb, state: FSMContext, session: AsyncSession, user_id):
     item_id = short_to_uuid(callback_data.item)
 
-    repo_m = MealRepo(session)
-    await repo_m.set_item_product(item_id, None)
-
-    item = await repo_m.get_item(item_id)
-    assert item is not None
+    draft = _draft_item(await state.get_data(), str(item_id))
+    assert draft is not None
+    await _update_draft_item(
+        state,
+        str(item_id),
+        product_ref_id=None,
+        user_product_id=None,
+        product_name=None,
+        auto_selected=False,
+        record_usage=False,
+    )
 
     await state.update_data(current_item_id=str(item_id))
+    if draft.get("grams") is not None:
+        await _advance_item(cq.message.chat.id, cq.bot, state, session, user_id)
+        await cq.answer()
+        return
+
     await state.set_state(AddMealFlow.typing_grams)
 
-    await edit_panel_from_callback(cq, ask_grams_text(item.raw_name), reply_markup=_grams_kb())
+    await edit_panel_from_callback(cq, ask_grams_text(draft["raw_name"]), reply_markup=_grams_kb())
+
+
+@router.callback_query(AddMealFlow.mapping_item, ProductActionCb.filter(F.action == "own"))
+async def product_own(cq: CallbackQuery, callback_data: ProductActionCb, state: FSMContext):
+    item_id = short_to_uuid(callback_data.item)
+
+    draft = _draft_item(await state.get_data(), str(item_id))
+    if draft is None:
+        await cq.answer("Ошибка: позиция не найдена", show_alert=True)
+        return
+
+    await state.update_data(current_item_id=str(item_id))
+    await state.set_state(AddMealFlow.typing_own_product)
+    await edit_panel_from_callback(cq, own_product_text(draft["raw_name"]), reply_markup=_grams_kb())
 
 
-@router.callback_query(AddMealFlow.typing_grams, F.data == "grams:back")
-async def grams_back_to_mapping(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
+@router.message(AddMealFlow.typing_own_product)
+async def own_product_input(message: Message, state: FSMContext, session: AsyncSession, user_id):
+    st = await state.get_data()
+    item_id: str = st["current_item_id"]
+    draft = _draft_item(st, item_id)
+    assert draft is not None
+
+    parsed = parse_nutrition(message.text or "")
+    if parsed is None:
+        await ensure_panel(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            state=state,
+            text="Не понял. " + own_product_text(draft["raw_name"]),
+            reply_markup=_grams_kb(),
+        )
+        return
+
+    kcal, protein, fat, carbs = parsed
+    own = await UserProductRepo(session).upsert(
+        user_id,
+        name=draft["raw_name"],
+        kcal_per_100g=kcal,
+        protein_100g=protein,
+        fat_100g=fat,
+        carbs_100g=carbs,
+    )
+    await _update_draft_item(
+        state,
+        item_id,
+        product_ref_id=None,
+        user_product_id=str(own.id),
+        product_name=own.name,
+        auto_selected=False,
+        record_usage=False,
+    )
+    if draft.get("grams") is not None:
+        await _advance_item(message.chat.id, message.bot, state, session, user_id)
+        return
+
+    await state.set_state(AddMealFlow.typing_grams)
+    await ensure_panel(
+        bot=message.bot,
+        chat_id=message.chat.id,
+        state=state,
+        text=f"Сохранено: 👤 {own.name} ({kcal:g} ккал/100 г)\n\nВведи граммы:",
+        reply_markup=_grams_kb(),
+    )
+
+
+@router.callback_query(StateFilter(AddMealFlow.typing_grams, AddMealFlow.typing_own_product), F.data == "grams:back")
+async def grams_back_to_mapping(cq: CallbackQuery, state: FSMContext, session: AsyncSession, user_id):
     st = await state.get_data()
     cur = st.get("current_item_id")
     item_ids: list[str] = st.get("item_ids", [])
@@ -369,18 +743,22 @@ async def grams_back_to_mapping(cq: CallbackQuery, state: FSMContext, session: A
 
     await state.update_data(item_index=item_ids.index(cur))
     await state.set_state(AddMealFlow.mapping_item)
-    await _render_mapping_step(cq.message.chat.id, cq.bot, state, session)
+    await _render_mapping_step(cq.message.chat.id, cq.bot, state, session, user_id)
     await cq.answer()
 
 
 @router.callback_query(AddMealFlow.mapping_item, ProductActionCb.filter(F.action == "back"))
 async def mapping_back_to_items(cq: CallbackQuery, state: FSMContext, profile, session: AsyncSession, user_id):
+    if (await state.get_data()).get("items_review"):
+        await _show_items_review(cq.message.chat.id, cq.bot, state)
+        await cq.answer()
+        return
     # MVP: возвращаемся на экран "Назад" откуда пришли (вне item mapping углубляться не будем)
     await _render_return_screen(cq, state=state, profile=profile, session=session, user_id=user_id)
 
 
 @router.callback_query(AddMealFlow.mapping_item, ProductPageCb.filter())
-async def product_page(cq: CallbackQuery, callback_data: ProductPageCb, state: FSMContext, session: AsyncSession):
+async def product_page(cq: CallbackQuery, callback_data: ProductPageCb, state: FSMContext, session: AsyncSession, user_id):
     item_id = short_to_uuid(callback_data.item)
 
     # синхронизируем item_index по item_id (на случай, если пользователь листает позже)
@@ -389,14 +767,14 @@ async def product_page(cq: CallbackQuery, callback_data: ProductPageCb, state: F
     if str(item_id) in item_ids:
         await state.update_data(item_index=item_ids.index(str(item_id)))
 
-    await _render_mapping_step(cq.message.chat.id, cq.bot, state, session, page=callback_data.page)
+    await _render_mapping_step(cq.message.chat.id, cq.bot, state, session, user_id, page=callback_data.page)
     await cq.answer()
 
 # ========== grams ==========
 @router.message(AddMealFlow.typing_grams)
-async def grams_input(message: Message, state: FSMContext, session: AsyncSession):
+async def grams_input(message: Message, state: FSMContext, session: AsyncSession, user_id):
     st = await state.get_data()
-    item_id = uuid.UUID(st["current_item_id"])
+    item_id: str = st["current_item_id"]
 
     try:
         grams = float((message.text or "").replace(",", ".").strip())
@@ -412,50 +790,51 @@ async def grams_input(message: Message, state: FSMContext, session: AsyncSession
         )
         return
 
-    repo_m = MealRepo(session)
-    await repo_m.set_item_grams_and_kcal(item_id, grams)
+    # ккал посчитаются в SQL при сохранении черновика
+    await _update_draft_item(state, item_id, grams=grams)
+    await _advance_item(message.chat.id, message.bot, state, session, user_id)
+
 
+async def _advance_item(chat_id: int, bot, state: FSMContext, session: AsyncSession, user_id) -> None:
+    """
+    Следующая позиция или, если позиции кончились, — сводка (правили позицию из неё) / шаг фото.
+    """
     st = await state.get_data()
-    idx = int(st["item_index"])
+    idx = int(st["item_index"]) + 1
     item_ids: list[str] = st["item_ids"]
 
-    idx += 1
+    if idx >= len(item_ids) and st.get("items_review"):
+        await _show_items_review(chat_id, bot, state)
+        return
+
     if idx >= len(item_ids):
         await state.set_state(AddMealFlow.waiting_photo)
         await state.update_data(item_index=idx, photos_count=0)
 
-        from aiogram.utils.keyboard import InlineKeyboardBuilder
-        b = InlineKeyboardBuilder()
-        b.button(text="✅ Готово", callback_data="photo:done")
-        b.button(text="⏭ Пропустить фото", callback_data="photo:done")
-        b.button(text="⬅️ В меню", callback_data="menu:back")
-        b.adjust(1)
-
         await ensure_panel(
-            bot=message.bot,
-            chat_id=message.chat.id,
+            bot=bot,
+            chat_id=chat_id,
             state=state,
-            text="Теперь пришли фото (можно несколько). Когда закончишь — нажми «Готово».",
-            reply_markup=b.as_markup(),
+            text=PHOTO_PROMPT_TEXT,
+            reply_markup=_photo_kb(with_skip=True),
         )
         return
 
     await state.update_data(item_index=idx)
-    await state.set_state(AddMealFlow.mapping_item)
-    await _render_mapping_step(message.chat.id, message.bot, state, session)
+    await _render_item_step(chat_id, bot, state, session, user_id)
 
 
 # ========== photos ==========
 @router.message(AddMealFlow.waiting_photo, F.photo)
 async def photo_received(message: Message, state: FSMContext, session: AsyncSession, db_user):
-    from app.bot.utils.photos import save_telegram_photo_locally
+    from app.bot.utils.photos import append_draft_photo, store_telegram_photo
 
     st = await state.get_data()
     meal_id = uuid.UUID(st["meal_id"])
     meal_date: date = st["meal_date"]
 
     photo = message.photo[-1]
-    saved = await save_telegram_photo_locally(
+    saved = await store_telegram_photo(
         bot=message.bot,
         tg_user_id=db_user.tg_user_id,
         day=meal_date,
@@ -463,43 +842,46 @@ async def photo_received(message: Message, state: FSMContext, session: AsyncSess
         photo=photo,
     )
 
-    repo = MealRepo(session)
-    await repo.add_photo(
-        meal_id=meal_id,
+    draft_photo = DraftPhoto(
         tg_file_id=photo.file_id,
         tg_file_unique_id=photo.file_unique_id,
-        local_path=saved.local_path,
+        storage_uri=saved.storage_uri,
         mime_type="image/jpeg",
         width=photo.width,
         height=photo.height,
         file_size_bytes=photo.file_size,
     )
-
-    photos_count = int(st.get("photos_count", 0)) + 1
-    await state.update_data(photos_count=photos_count)
-
-    from aiogram.utils.keyboard import InlineKeyboardBuilder
-    b = InlineKeyboardBuilder()
-    b.button(text="✅ Готово", callback_data="photo:done")
-    b.button(text="⬅️ В меню", callback_data="menu:back")
-    b.adjust(1)
+    # несколько фото альбомом приходят почти одновременно — добавление сериализовано
+    photos_count = await append_draft_photo(state, draft_photo)
 
     await ensure_panel(
         bot=message.bot,
         chat_id=message.chat.id,
         state=state,
         text=f"Фото добавлено: {photos_count}\n\nМожешь отправить еще фото или нажми «Готово».",
-        reply_markup=b.as_markup(),
+        reply_markup=_photo_kb(with_skip=False),
     )
 
 
 @router.callback_query(AddMealFlow.waiting_photo, F.data == "photo:done")
-async def photo_done(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
+async def photo_done(cq: CallbackQuery, state: FSMContext, session: AsyncSession, user_id):
     st = await state.get_data()
-    replace = st.get("replace_meal_id")
-    if replace:
-        repo = MealRepo(session)
-        await repo.delete_meal(uuid.UUID(replace))
+    repo = MealRepo(session)
+
+    # весь черновик — в одной транзакции (коммит делает DbSessionMiddleware)
+    saved = await repo.save_draft(
+        uuid.UUID(st["meal_id"]),
+        user_id=user_id,
+        meal_date=st["meal_date"],
+        meal_time=st["meal_time"],
+        note=st.get("note"),
+        items=[DraftItem(**it) for it in st.get("draft_items", [])],
+        photos=[DraftPhoto(**ph) for ph in st.get("draft_photos", [])],
+    )
 
     await state.clear()
+    if not saved:
+        # повторное нажатие / повторная доставка callback — приём уже сохранён первым
+        await cq.answer("Запись уже сохранена")
+        return
     await edit_panel_from_callback(cq, "Готово ✅\nЗапись сохранена.", reply_markup=main_menu_kb())
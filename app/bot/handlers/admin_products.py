@@ -13,7 +13,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.bot.states_admin import AdminProductsFlow
 from app.bot.utils.panel import edit_panel_from_callback, ensure_panel
-from app.db.repo_products import ProductRepo
+from app.db.hooks import after_commit
+from app.db.repo_products import NewProduct, ProductRepo
+from app.jobs.recompute_kcal import schedule_kcal_recompute
 from app.bot.keyboards.admin_products import (
     products_list_kb,
     product_card_kb,
@@ -357,7 +359,7 @@ async def admin_products_edit_submit(message: Message, state: FSMContext, sessio
         return
 
     repo = ProductRepo(session)
-    await repo.update_ref(
+    nutrients_changed = await repo.update_ref(
         product_id,
         name=name,
         kcal_per_100g=kcal,
@@ -368,6 +370,13 @@ async def admin_products_edit_submit(message: Message, state: FSMContext, sessio
         synonyms=syns,
     )
 
+    if nutrients_changed:
+        # пересчёт истории читает новое значение — запускаем после коммита правки (DbSessionMiddleware)
+        after_commit(
+            session,
+            lambda: schedule_kcal_recompute(product_id, product_name=name, bot=message.bot, chat_id=message.chat.id),
+        )
+
     await state.set_state(None)
 
     await _after_save_show_missing_or_card(
@@ -434,18 +443,12 @@ async def admin_products_add_missing_all(cq: CallbackQuery, callback_data: APMis
     existing_casefold = {e.casefold() for e in existing}
     missing = [s for s in syns if s.casefold() not in existing_casefold]
 
-    created = 0
-    for name in missing:
-        await repo.create_ref(
-            name=name,
-            kcal_per_100g=float(p.kcal_per_100g),
-            protein_100g=None,
-            fat_100g=None,
-            carbs_100g=None,
-            brand=None,
-            synonyms=(),
-        )
-        created += 1
+    result = await repo.create_refs_bulk(
+        [NewProduct(name=name, kcal_per_100g=float(p.kcal_per_100g)) for name in missing]
+    )
 
-    await cq.answer(f"Добавлено: {created}", show_alert=True)
+    text = f"Добавлено: {len(result.created)}"
+    if result.skipped:
+        text += f"\nУже были в справочнике: {len(result.skipped)}"
+    await cq.answer(text, show_alert=True)
     await _render_card(cq, session, product_id, back_page)
@@ -17,9 +17,10 @@ from app.bot.keyboards.meals import (
 )
 from app.bot.keyboards.calendar import CalendarPickCb, CalendarMode
 from app.bot.utils.panel import edit_panel_from_callback
+from app.bot.utils.photo_delivery import PhotoRef, deliver_photos
 from app.bot.utils.text import day_view_text, meal_details_text, meal_details_text_view
-from app.bot.states import AddMealFlow
 from app.db.repo_meals import MealRepo
+from app.jobs.runner import spawn_job
 
 
 router = Router()
@@ -82,11 +83,9 @@ async def show_meal(cq: CallbackQuery, callback_data: MealActionCb, session: Asy
 @router.callback_query(MealActionCb.filter(F.action == "photos"))
 async def send_meal_photos(cq: CallbackQuery, callback_data: MealActionCb, session: AsyncSession):
     """
-    Отправляем фото приёма пищи в чат.
-    Используем tg_file_id (быстро, без диска). Если захочешь — можно fallback на local_path.
+    Отправляем фото приёма пищи в чат: по tg_file_id, при ошибке — перезаливка из хранилища.
+    Альбомы уходят в фоне, ответ на callback их не ждёт.
     """
-    from aiogram.types import InputMediaPhoto
-
     meal_id = uuid.UUID(callback_data.meal_id)
     repo = MealRepo(session)
     photos = await repo.list_photos(meal_id)
@@ -95,15 +94,9 @@ async def send_meal_photos(cq: CallbackQuery, callback_data: MealActionCb, sessi
         await cq.answer("Фото нет", show_alert=True)
         return
 
-    # Telegram media group: максимум 10 элементов
-    chunks = [photos[i:i+10] for i in range(0, len(photos), 10)]
-    for chunk in chunks:
-        media = []
-        for p in chunk:
-            media.append(InputMediaPhoto(media=p.tg_file_id))
-        await cq.bot.send_media_group(chat_id=cq.message.chat.id, media=media)
-
-    await cq.answer("Фото отправлены ✅")
+    refs = [PhotoRef(tg_file_id=p.tg_file_id, storage_uri=p.storage_uri, photo_id=p.id) for p in photos]
+    await cq.answer("Отправляю фото…")
+    spawn_job(f"meal_photos:{meal_id}", deliver_photos(cq.bot, cq.message.chat.id, refs))
 
 
 @router.callback_query(MealActionCb.filter(F.action == "delete"))
@@ -135,23 +128,3 @@ async def delete_meal(cq: CallbackQuery, callback_data: MealActionCb, session: A
     kb = build_day_meals_kb(day, meals, back_cb="menu:calendar_recent")
     await edit_panel_from_callback(cq, "Удалено ✅\n\n" + day_view_text(day, meals), kb)
 
-
-@router.callback_query(MealActionCb.filter(F.action == "edit"))
-async def edit_meal_start(cq: CallbackQuery, callback_data: MealActionCb, state: FSMContext, session: AsyncSession, profile):
-    meal_id = uuid.UUID(callback_data.meal_id)
-    repo = MealRepo(session)
-    meal = await repo.get_meal(meal_id)
-    if meal is None:
-        await cq.answer("Не найдено")
-        return
-
-    # редактирование = создать новое, удалить старое на финале
-    await state.update_data(meal_date=meal.meal_date, replace_meal_id=str(meal_id), return_to=f"day:view:{meal.meal_date.isoformat()}")
-    await state.set_state(AddMealFlow.picking_time)
-
-    from app.bot.keyboards.time_picker import build_time_picker
-    from app.bot.utils.dates import now_in_tz
-    from app.bot.utils.text import pick_time_text
-
-    now = now_in_tz(profile.timezone_iana)
-    await edit_panel_from_callback(cq, pick_time_text(meal.meal_date), build_time_picker(now))
@@ -0,0 +1,578 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import asdict, replace
+from datetime import time
+
+from aiogram import Router, F
+from aiogram.types import CallbackQuery, Message
+from aiogram.fsm.context import FSMContext
+from aiogram.filters import StateFilter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bot.handlers.add_meal import _candidates_page, _auto_mappings
+from app.bot.keyboards.edit_meal import (
+    EditCb,
+    build_edit_meal_kb,
+    build_edit_item_kb,
+    build_edit_photos_kb,
+    build_edit_back_kb,
+)
+from app.bot.keyboards.meals import MealActionCb, build_meal_actions_kb
+from app.bot.keyboards.products import build_product_candidates_kb, ProductPickCb, ProductActionCb, ProductPageCb
+from app.bot.keyboards.time_picker import build_time_picker, TimePickCb, TimeActionCb
+from app.bot.states import EditMealFlow
+from app.bot.utils.dates import now_in_tz
+from app.bot.utils.ids import short_to_uuid
+from app.bot.utils.panel import edit_panel_from_callback, ensure_panel
+from app.bot.utils.parse import parse_time_hhmm, snap_to_15, parse_items, parse_nutrition
+from app.bot.utils.photo_delivery import PhotoRef, deliver_photos
+from app.bot.utils.text import (
+    pick_time_text,
+    enter_custom_time_text,
+    edit_meal_text,
+    edit_item_text,
+    meal_details_text_view,
+    own_product_text,
+)
+from app.db.repo_meals import MealRepo, DraftItem, DraftPhoto
+from app.db.repo_products import ProductRepo
+from app.db.repo_user_products import UserProductRepo
+from app.jobs.runner import spawn_job
+
+
+router = Router()
+
+# Правка существующего приёма пищи. Состояние в FSM:
+# edit_meal_id, meal_date, meal_time, edit_items (DraftItem как dict, id существующих позиций
+# сохранены), edit_photos (оставленные фото: id + tg_file_id), draft_photos (новые DraftPhoto),
+# edit_removed_photos (id удалённых). По «Сохранить» MealRepo.apply_edit применяет diff.
+
+
+def _renumber(items: list[dict]) -> list[dict]:
+    return [dict(it, position=i) for i, it in enumerate(items, start=1)]
+
+
+def _item(st: dict, item_id: str) -> dict | None:
+    return next((it for it in st.get("edit_items", []) if it["id"] == item_id), None)
+
+
+async def _update_item(state: FSMContext, item_id: str, **changes) -> None:
+    st = await state.get_data()
+    items = [dict(it, **changes) if it["id"] == item_id else it for it in st.get("edit_items", [])]
+    await state.update_data(edit_items=items)
+
+
+def _review(st: dict) -> tuple[str, object]:
+    items: list[dict] = st.get("edit_items", [])
+    photos_count = len(st.get("edit_photos", [])) + len(st.get("draft_photos", []))
+    return (
+        edit_meal_text(st["meal_date"], st["meal_time"], items, photos_count),
+        build_edit_meal_kb(items, photos_count),
+    )
+
+
+def _item_screen(st: dict, item_id: str) -> tuple[str, object] | None:
+    items: list[dict] = st.get("edit_items", [])
+    it = _item(st, item_id)
+    if it is None:
+        return None
+    idx = items.index(it)
+    return edit_item_text(it), build_edit_item_kb(item_id, can_up=idx > 0, can_down=idx < len(items) - 1)
+
+
+async def _show_review(cq: CallbackQuery, state: FSMContext) -> None:
+    await state.set_state(EditMealFlow.reviewing)
+    text, kb = _review(await state.get_data())
+    await edit_panel_from_callback(cq, text, kb)
+
+
+async def _show_review_message(message: Message, state: FSMContext) -> None:
+    await state.set_state(EditMealFlow.reviewing)
+    text, kb = _review(await state.get_data())
+    await ensure_panel(bot=message.bot, chat_id=message.chat.id, state=state, text=text, reply_markup=kb)
+
+
+async def _render_meal_card(cq: CallbackQuery, session: AsyncSession, meal_id: uuid.UUID, prefix: str = "") -> None:
+    repo = MealRepo(session)
+    meal = await repo.get_meal(meal_id)
+    if meal is None:
+        await cq.answer("Не найдено")
+        return
+    items = await repo.list_items_view(meal_id)
+    photos = await repo.list_photos(meal_id)
+    kb = build_meal_actions_kb(meal_id, back_to_day_cb=f"day:view:{meal.meal_date.isoformat()}", photos_count=len(photos))
+    await edit_panel_from_callback(cq, prefix + meal_details_text_view(meal, items, photos), kb)
+
+
+# ========== entry / exit ==========
+@router.callback_query(MealActionCb.filter(F.action == "edit"))
+async def edit_meal_start(cq: CallbackQuery, callback_data: MealActionCb, state: FSMContext, session: AsyncSession):
+    meal_id = uuid.UUID(callback_data.meal_id)
+    repo = MealRepo(session)
+    meal = await repo.get_meal(meal_id)
+    if meal is None:
+        await cq.answer("Не найдено")
+        return
+
+    items = await repo.list_items_view(meal_id)
+    photos = await repo.list_photos(meal_id)
+
+    draft_items = [
+        DraftItem(
+            id=str(it.id),
+            position=it.position,
+            raw_name=it.raw_name,
+            product_ref_id=str(it.product_ref_id) if it.product_ref_id else None,
+            user_product_id=str(it.user_product_id) if it.user_product_id else None,
+            grams=it.grams,
+            product_name=it.product_name,
+        )
+        for it in items
+    ]
+    await state.update_data(
+        edit_meal_id=str(meal_id),
+        meal_date=meal.meal_date,
+        meal_time=meal.meal_time,
+        edit_items=[asdict(it) for it in draft_items],
+        edit_photos=[
+            {"id": str(p.id), "tg_file_id": p.tg_file_id, "tg_file_unique_id": p.tg_file_unique_id, "storage_uri": p.storage_uri}
+            for p in photos
+        ],
+        edit_removed_photos=[],
+        draft_photos=[],
+    )
+    await _show_review(cq, state)
+
+
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "cancel"))
+async def edit_cancel(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
+    st = await state.get_data()
+    await state.set_state(None)
+    await _render_meal_card(cq, session, uuid.UUID(st["edit_meal_id"]))
+
+
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "save"))
+async def edit_save(cq: CallbackQuery, state: FSMContext, session: AsyncSession, user_id):
+    st = await state.get_data()
+    meal_id = uuid.UUID(st["edit_meal_id"])
+    if not st.get("edit_items"):
+        await cq.answer("В приёме не осталось позиций. Добавь позицию или удали приём целиком.", show_alert=True)
+        return
+
+    ok = await MealRepo(session).apply_edit(
+        meal_id,
+        user_id=user_id,
+        meal_time=st["meal_time"],
+        items=[DraftItem(**it) for it in st.get("edit_items", [])],
+        removed_photo_ids=[uuid.UUID(i) for i in st.get("edit_removed_photos", [])],
+        new_photos=[DraftPhoto(**ph) for ph in st.get("draft_photos", [])],
+    )
+    await state.set_state(None)
+    await state.update_data(edit_items=None, edit_photos=None, draft_photos=None, edit_removed_photos=None)
+    if not ok:
+        await cq.answer("Приём пищи не найден", show_alert=True)
+        return
+    await _render_meal_card(cq, session, meal_id, prefix="Сохранено ✅\n\n")
+
+
+@router.callback_query(StateFilter(EditMealFlow), EditCb.filter(F.action == "back"))
+async def edit_back(cq: CallbackQuery, state: FSMContext):
+    await _show_review(cq, state)
+
+
+# ========== time ==========
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "time"))
+async def edit_time(cq: CallbackQuery, state: FSMContext, profile):
+    st = await state.get_data()
+    await state.set_state(EditMealFlow.picking_time)
+    now = now_in_tz(profile.timezone_iana)
+    await edit_panel_from_callback(cq, pick_time_text(st["meal_date"], selected=st["meal_time"]), build_time_picker(now))
+
+
+@router.callback_query(EditMealFlow.picking_time, TimePickCb.filter())
+async def edit_time_picked(cq: CallbackQuery, callback_data: TimePickCb, state: FSMContext):
+    await state.update_data(meal_time=time(hour=callback_data.hh, minute=callback_data.mm))
+    await _show_review(cq, state)
+
+
+@router.callback_query(EditMealFlow.picking_time, TimeActionCb.filter(F.action == "custom"))
+async def edit_time_custom(cq: CallbackQuery, state: FSMContext):
+    await state.set_state(EditMealFlow.typing_custom_time)
+    await edit_panel_from_callback(cq, enter_custom_time_text(), reply_markup=None)
+
+
+@router.message(EditMealFlow.typing_custom_time)
+async def edit_time_custom_input(message: Message, state: FSMContext):
+    t0 = parse_time_hhmm(message.text or "")
+    if t0 is None:
+        await ensure_panel(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            state=state,
+            text="Неверный формат. Введи ЧЧ:ММ, например 08:30",
+            reply_markup=None,
+        )
+        return
+    await state.update_data(meal_time=snap_to_15(t0))
+    await _show_review_message(message, state)
+
+
+@router.callback_query(EditMealFlow.picking_time, TimeActionCb.filter(F.action == "back"))
+async def edit_time_back(cq: CallbackQuery, state: FSMContext):
+    await _show_review(cq, state)
+
+
+# ========== items ==========
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "item"))
+async def edit_item(cq: CallbackQuery, callback_data: EditCb, state: FSMContext):
+    screen = _item_screen(await state.get_data(), callback_data.ref)
+    if screen is None:
+        await cq.answer("Позиция не найдена")
+        return
+    await edit_panel_from_callback(cq, *screen)
+
+
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action.in_(["up", "down"])))
+async def edit_item_move(cq: CallbackQuery, callback_data: EditCb, state: FSMContext):
+    st = await state.get_data()
+    items: list[dict] = list(st.get("edit_items", []))
+    it = _item(st, callback_data.ref)
+    if it is None:
+        await cq.answer("Позиция не найдена")
+        return
+    idx = items.index(it)
+    j = idx - 1 if callback_data.action == "up" else idx + 1
+    if 0 <= j < len(items):
+        items[idx], items[j] = items[j], items[idx]
+    await state.update_data(edit_items=_renumber(items))
+
+    screen = _item_screen(await state.get_data(), callback_data.ref)
+    assert screen is not None
+    await edit_panel_from_callback(cq, *screen)
+
+
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "del"))
+async def edit_item_delete(cq: CallbackQuery, callback_data: EditCb, state: FSMContext):
+    st = await state.get_data()
+    items = [it for it in st.get("edit_items", []) if it["id"] != callback_data.ref]
+    await state.update_data(edit_items=_renumber(items))
+    await _show_review(cq, state)
+
+
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "add"))
+async def edit_add_items(cq: CallbackQuery, state: FSMContext):
+    await state.set_state(EditMealFlow.typing_items)
+    await edit_panel_from_callback(
+        cq,
+        "Напиши, что добавить (через запятую), граммы — по желанию.\nПример: хлеб 30г, чай",
+        reply_markup=build_edit_back_kb(),
+    )
+
+
+@router.message(EditMealFlow.typing_items)
+async def edit_add_items_input(message: Message, state: FSMContext, session: AsyncSession, user_id):
+    parsed = parse_items(message.text or "")
+    if not parsed:
+        await ensure_panel(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            state=state,
+            text="Не вижу продуктов. Напиши через запятую, например: хлеб, чай",
+            reply_markup=build_edit_back_kb(),
+        )
+        return
+
+    st = await state.get_data()
+    items: list[dict] = list(st.get("edit_items", []))
+    # уверенные совпадения поиска выбираются сразу ("✅ auto" на экране правки)
+    mappings = await _auto_mappings(session, user_id, [raw for raw, _ in parsed], accept_confident=True)
+    for (raw, grams), mapping in zip(parsed, mappings):
+        items.append(
+            asdict(
+                DraftItem(
+                    id=str(uuid.uuid4()),
+                    position=len(items) + 1,
+                    raw_name=raw,
+                    grams=grams,
+                    **mapping,
+                )
+            )
+        )
+    await state.update_data(edit_items=items)
+    await _show_review_message(message, state)
+
+
+# ========== grams ==========
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "grams"))
+async def edit_grams(cq: CallbackQuery, callback_data: EditCb, state: FSMContext):
+    it = _item(await state.get_data(), callback_data.ref)
+    if it is None:
+        await cq.answer("Позиция не найдена")
+        return
+    await state.update_data(edit_item=callback_data.ref)
+    await state.set_state(EditMealFlow.typing_grams)
+    await edit_panel_from_callback(cq, edit_item_text(it) + "\n\nВведи граммы:", reply_markup=build_edit_back_kb())
+
+
+@router.message(EditMealFlow.typing_grams)
+async def edit_grams_input(message: Message, state: FSMContext):
+    try:
+        grams = float((message.text or "").replace(",", ".").strip())
+        if grams <= 0:
+            raise ValueError
+    except ValueError:
+        await ensure_panel(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            state=state,
+            text="Введи граммы числом > 0 (например 120).",
+            reply_markup=build_edit_back_kb(),
+        )
+        return
+
+    st = await state.get_data()
+    await _update_item(state, st["edit_item"], grams=grams)
+    await _show_review_message(message, state)
+
+
+# ========== mapping ==========
+async def _render_edit_mapping(cq: CallbackQuery, state: FSMContext, session: AsyncSession, user_id, item_id: str, page: int = 1):
+    it = _item(await state.get_data(), item_id)
+    if it is None:
+        await cq.answer("Позиция не найдена")
+        return
+
+    candidates, page, total_pages = await _candidates_page(session, user_id, it["raw_name"], page)
+    selected = it.get("product_ref_id") or it.get("user_product_id")
+    kb = build_product_candidates_kb(
+        item_id=uuid.UUID(item_id),
+        candidates=candidates,
+        selected_product_id=uuid.UUID(selected) if selected else None,
+        page=page,
+        total_pages=total_pages,
+    )
+    text = (
+        f"{edit_item_text(it)}\n\n"
+        f"Выбери продукт из справочника:\n"
+        f"👤 свои → ⭐ выбирал раньше → 🎯 точное совпадение → 🔎 похожие по названию → 🔁 похожие синонимы\n"
+        f"Нет в списке — «➕ Свой продукт»."
+    )
+    await edit_panel_from_callback(cq, text, kb)
+
+
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "prod"))
+async def edit_product(cq: CallbackQuery, callback_data: EditCb, state: FSMContext, session: AsyncSession, user_id):
+    await state.set_state(EditMealFlow.mapping_item)
+    await _render_edit_mapping(cq, state, session, user_id, callback_data.ref)
+
+
+@router.callback_query(EditMealFlow.mapping_item, ProductPageCb.filter())
+async def edit_product_page(cq: CallbackQuery, callback_data: ProductPageCb, state: FSMContext, session: AsyncSession, user_id):
+    await _render_edit_mapping(cq, state, session, user_id, str(short_to_uuid(callback_data.item)), page=callback_data.page)
+
+
+@router.callback_query(EditMealFlow.mapping_item, ProductPickCb.filter())
+async def edit_product_picked(
+    cq: CallbackQuery, callback_data: ProductPickCb, state: FSMContext, session: AsyncSession, user_id
+):
+    item_id = str(short_to_uuid(callback_data.item))
+    product_id = short_to_uuid(callback_data.prod)
+    if callback_data.src == "u":
+        own = await UserProductRepo(session).get(user_id, product_id)
+        if own is None:
+            await cq.answer("Продукт не найден", show_alert=True)
+            return
+        await _update_item(
+            state,
+            item_id,
+            product_ref_id=None,
+            user_product_id=str(own.id),
+            product_name=own.name,
+            auto_selected=False,
+            record_usage=False,
+        )
+    else:
+        prod = await ProductRepo(session).get_facts(product_id)
+        if prod is None:
+            await cq.answer("Продукт не найден", show_alert=True)
+            return
+        await _update_item(
+            state,
+            item_id,
+            product_ref_id=str(product_id),
+            user_product_id=None,
+            product_name=prod.name,
+            auto_selected=False,
+            record_usage=True,
+        )
+    await state.set_state(EditMealFlow.reviewing)
+    screen = _item_screen(await state.get_data(), item_id)
+    if screen is None:
+        await _show_review(cq, state)
+        return
+    await edit_panel_from_callback(cq, *screen)
+
+
+@router.callback_query(EditMealFlow.mapping_item, ProductActionCb.filter(F.action == "own"))
+async def edit_product_own(cq: CallbackQuery, callback_data: ProductActionCb, state: FSMContext):
+    item_id = str(short_to_uuid(callback_data.item))
+    it = _item(await state.get_data(), item_id)
+    if it is None:
+        await cq.answer("Позиция не найдена")
+        return
+    await state.update_data(edit_item=item_id)
+    await state.set_state(EditMealFlow.typing_own_product)
+    await edit_panel_from_callback(cq, own_product_text(it["raw_name"]), reply_markup=build_edit_back_kb())
+
+
+@router.message(EditMealFlow.typing_own_product)
+async def edit_own_product_input(message: Message, state: FSMContext, session: AsyncSession, user_id):
+    st = await state.get_data()
+    item_id: str = st["edit_item"]
+    it = _item(st, item_id)
+    if it is None:
+        await _show_review_message(message, state)
+        return
+
+    parsed = parse_nutrition(message.text or "")
+    if parsed is None:
+        await ensure_panel(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            state=state,
+            text="Не понял. " + own_product_text(it["raw_name"]),
+            reply_markup=build_edit_back_kb(),
+        )
+        return
+
+    kcal, protein, fat, carbs = parsed
+    own = await UserProductRepo(session).upsert(
+        user_id,
+        name=it["raw_name"],
+        kcal_per_100g=kcal,
+        protein_100g=protein,
+        fat_100g=fat,
+        carbs_100g=carbs,
+    )
+    await _update_item(
+        state,
+        item_id,
+        product_ref_id=None,
+        user_product_id=str(own.id),
+        product_name=own.name,
+        auto_selected=False,
+        record_usage=False,
+    )
+
+    await state.set_state(EditMealFlow.reviewing)
+    text, kb = _item_screen(await state.get_data(), item_id)
+    await ensure_panel(bot=message.bot, chat_id=message.chat.id, state=state, text=text, reply_markup=kb)
+
+
+@router.callback_query(EditMealFlow.mapping_item, ProductActionCb.filter(F.action.in_(["skip", "back"])))
+async def edit_product_action(cq: CallbackQuery, callback_data: ProductActionCb, state: FSMContext):
+    item_id = str(short_to_uuid(callback_data.item))
+    if callback_data.action == "skip":
+        await _update_item(
+            state,
+            item_id,
+            product_ref_id=None,
+            user_product_id=None,
+            product_name=None,
+            auto_selected=False,
+            record_usage=False,
+        )
+
+    await state.set_state(EditMealFlow.reviewing)
+    screen = _item_screen(await state.get_data(), item_id)
+    if screen is None:
+        await _show_review(cq, state)
+        return
+    await edit_panel_from_callback(cq, *screen)
+
+
+# ========== photos ==========
+def _photos_screen(st: dict) -> tuple[str, object]:
+    kept: list[dict] = st.get("edit_photos", [])
+    new: list[dict] = st.get("draft_photos", [])
+    text = (
+        f"Фото: {len(kept) + len(new)}\n\n"
+        "Пришли новые фото, чтобы добавить их, или удали ненужные.\n"
+        "Номера фото — как в «📤 Показать»."
+    )
+    return text, build_edit_photos_kb(kept, new)
+
+
+@router.callback_query(EditMealFlow.reviewing, EditCb.filter(F.action == "photos"))
+async def edit_photos(cq: CallbackQuery, state: FSMContext):
+    await state.set_state(EditMealFlow.photos)
+    await edit_panel_from_callback(cq, *_photos_screen(await state.get_data()))
+
+
+@router.callback_query(EditMealFlow.photos, EditCb.filter(F.action == "photo_del"))
+async def edit_photo_delete(cq: CallbackQuery, callback_data: EditCb, state: FSMContext):
+    st = await state.get_data()
+    ref = callback_data.ref
+    if ref.startswith("n"):
+        new = list(st.get("draft_photos", []))
+        idx = int(ref[1:])
+        if 0 <= idx < len(new):
+            new.pop(idx)
+        await state.update_data(draft_photos=new)
+    else:
+        kept = [ph for ph in st.get("edit_photos", []) if ph["id"] != ref]
+        removed = list(st.get("edit_removed_photos", []))
+        if len(kept) != len(st.get("edit_photos", [])):
+            removed.append(ref)
+        await state.update_data(edit_photos=kept, edit_removed_photos=removed)
+
+    await edit_panel_from_callback(cq, *_photos_screen(await state.get_data()))
+
+
+@router.callback_query(EditMealFlow.photos, EditCb.filter(F.action == "photo_show"))
+async def edit_photo_show(cq: CallbackQuery, state: FSMContext):
+    st = await state.get_data()
+    photos = [
+        PhotoRef(tg_file_id=ph["tg_file_id"], storage_uri=ph.get("storage_uri"), photo_id=uuid.UUID(ph["id"]))
+        for ph in st.get("edit_photos", [])
+    ] + [PhotoRef(tg_file_id=ph["tg_file_id"], storage_uri=ph.get("storage_uri")) for ph in st.get("draft_photos", [])]
+    if not photos:
+        await cq.answer("Фото нет", show_alert=True)
+        return
+
+    # подпись — номер фото для кнопок удаления
+    photos = [replace(p, caption=str(n)) for n, p in enumerate(photos, start=1)]
+    await cq.answer()
+    spawn_job(f"edit_photos:{cq.message.chat.id}", deliver_photos(cq.bot, cq.message.chat.id, photos))
+
+
+@router.message(EditMealFlow.photos, F.photo)
+async def edit_photo_received(message: Message, state: FSMContext, db_user):
+    from app.bot.utils.photos import append_draft_photo, store_telegram_photo
+
+    st = await state.get_data()
+    photo = message.photo[-1]
+    known = {ph.get("tg_file_unique_id") for ph in st.get("edit_photos", []) + st.get("draft_photos", [])}
+    if photo.file_unique_id not in known:
+        saved = await store_telegram_photo(
+            bot=message.bot,
+            tg_user_id=db_user.tg_user_id,
+            day=st["meal_date"],
+            meal_id=uuid.UUID(st["edit_meal_id"]),
+            photo=photo,
+        )
+        draft_photo = DraftPhoto(
+            tg_file_id=photo.file_id,
+            tg_file_unique_id=photo.file_unique_id,
+            storage_uri=saved.storage_uri,
+            mime_type="image/jpeg",
+            width=photo.width,
+            height=photo.height,
+            file_size_bytes=photo.file_size,
+        )
+        await append_draft_photo(state, draft_photo)
+
+    text, kb = _photos_screen(await state.get_data())
+    await ensure_panel(bot=message.bot, chat_id=message.chat.id, state=state, text=text, reply_markup=kb)
+
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import uuid
+from datetime import date, time
+
+from aiogram import Router, F
+from aiogram.types import CallbackQuery, Message
+from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bot.keyboards.meals import MealActionCb, build_day_meals_kb
+from app.bot.keyboards.templates import TplCb, build_templates_kb
+from app.bot.keyboards.time_picker import build_time_picker, TimePickCb, TimeActionCb
+from app.bot.states import CloneMealFlow
+from app.bot.utils.dates import now_in_tz, today_in_tz
+from app.bot.utils.ids import short_to_uuid
+from app.bot.utils.panel import edit_panel_from_callback, ensure_panel
+from app.bot.utils.parse import parse_time_hhmm, snap_to_15
+from app.bot.utils.text import (
+    pick_time_text,
+    enter_custom_time_text,
+    day_view_text,
+    templates_text,
+    template_name,
+)
+from app.db.repo_meals import MealRepo
+from app.db.repo_templates import TEMPLATES_LIMIT, TemplateRepo, TemplateSaveResult
+
+
+router = Router()
+
+
+async def _clone(state: FSMContext, session: AsyncSession, user_id, t: time) -> tuple[date, bool]:
+    """
+    Создаёт приём пищи из исходного приёма или шаблона (что лежит в FSM).
+    """
+    st = await state.get_data()
+    d: date = st["clone_date"]
+
+    new_id = None
+    if st.get("clone_src_meal"):
+        new_id = await MealRepo(session).clone_meal(
+            uuid.UUID(st["clone_src_meal"]), user_id=user_id, meal_date=d, meal_time=t
+        )
+    elif st.get("clone_src_tpl"):
+        new_id = await TemplateRepo(session).instantiate(
+            uuid.UUID(st["clone_src_tpl"]), user_id=user_id, meal_date=d, meal_time=t
+        )
+
+    await state.set_state(None)
+    await state.update_data(clone_src_meal=None, clone_src_tpl=None)
+    return d, new_id is not None
+
+
+def _done_text(ok: bool) -> str:
+    return "Приём пищи добавлен ✅\n\n" if ok else "Не удалось: исходная запись не найдена.\n\n"
+
+
+# ========== entry points ==========
+@router.callback_query(MealActionCb.filter(F.action == "repeat"))
+async def repeat_meal(cq: CallbackQuery, callback_data: MealActionCb, state: FSMContext, session: AsyncSession, profile):
+    meal = await MealRepo(session).get_meal(uuid.UUID(callback_data.meal_id))
+    if meal is None:
+        await cq.answer("Не найдено")
+        return
+
+    today = today_in_tz(profile.timezone_iana)
+    await state.update_data(
+        clone_src_meal=callback_data.meal_id,
+        clone_src_tpl=None,
+        clone_date=today,
+        clone_back=("day", meal.meal_date),
+    )
+    await state.set_state(CloneMealFlow.picking_time)
+
+    now = now_in_tz(profile.timezone_iana)
+    await edit_panel_from_callback(cq, pick_time_text(today), build_time_picker(now))
+
+
+@router.callback_query(MealActionCb.filter(F.action == "save_tpl"))
+async def save_template(cq: CallbackQuery, callback_data: MealActionCb, session: AsyncSession, user_id):
+    meal_id = uuid.UUID(callback_data.meal_id)
+    repo = MealRepo(session)
+    meal = await repo.get_meal(meal_id)
+    if meal is None:
+        await cq.answer("Не найдено")
+        return
+
+    items = await repo.list_items_view(meal_id)
+    if not items:
+        await cq.answer("В приёме нет позиций", show_alert=True)
+        return
+
+    result = await TemplateRepo(session).save_from_meal(meal_id, user_id=user_id, name=template_name(meal, items))
+    if result == TemplateSaveResult.DUPLICATE:
+        await cq.answer("Такой шаблон уже есть")
+    elif result == TemplateSaveResult.LIMIT:
+        await cq.answer(f"Уже {TEMPLATES_LIMIT} шаблонов — удали ненужный, чтобы сохранить новый", show_alert=True)
+    elif result == TemplateSaveResult.NOT_FOUND:
+        await cq.answer("Не найдено")
+    else:
+        await cq.answer("Сохранено в шаблоны ✅")
+
+
+@router.callback_query(F.data.startswith("day:tpl:"))
+async def open_templates(cq: CallbackQuery, state: FSMContext, session: AsyncSession, user_id):
+    _, _, day_str = cq.data.split(":")
+    d = date.fromisoformat(day_str)
+    await state.update_data(tpl_day=d)
+
+    templates = await TemplateRepo(session).list_for_user(user_id)
+    await edit_panel_from_callback(cq, templates_text(d, bool(templates)), build_templates_kb(d, templates))
+
+
+@router.callback_query(TplCb.filter(F.action == "use"))
+async def use_template(cq: CallbackQuery, callback_data: TplCb, state: FSMContext, profile):
+    st = await state.get_data()
+    d: date = st.get("tpl_day") or today_in_tz(profile.timezone_iana)
+
+    await state.update_data(
+        clone_src_meal=None,
+        clone_src_tpl=str(short_to_uuid(callback_data.tpl)),
+        clone_date=d,
+        clone_back=("tpl", d),
+    )
+    await state.set_state(CloneMealFlow.picking_time)
+
+    now = now_in_tz(profile.timezone_iana)
+    await edit_panel_from_callback(cq, pick_time_text(d), build_time_picker(now))
+
+
+@router.callback_query(TplCb.filter(F.action == "del"))
+async def delete_template(cq: CallbackQuery, callback_data: TplCb, state: FSMContext, session: AsyncSession, user_id, profile):
+    repo = TemplateRepo(session)
+    await repo.delete(short_to_uuid(callback_data.tpl), user_id=user_id)
+
+    st = await state.get_data()
+    d: date = st.get("tpl_day") or today_in_tz(profile.timezone_iana)
+    templates = await repo.list_for_user(user_id)
+    await edit_panel_from_callback(cq, templates_text(d, bool(templates)), build_templates_kb(d, templates))
+
+
+# ========== time picker ==========
+@router.callback_query(CloneMealFlow.picking_time, TimePickCb.filter())
+async def clone_time_picked(cq: CallbackQuery, callback_data: TimePickCb, state: FSMContext, session: AsyncSession, user_id):
+    t = time(hour=callback_data.hh, minute=callback_data.mm)
+    d, ok = await _clone(state, session, user_id, t)
+
+    meals = await MealRepo(session).list_meals_by_day(user_id, d)
+    kb = build_day_meals_kb(d, meals, back_cb="menu:calendar_recent")
+    await edit_panel_from_callback(cq, _done_text(ok) + day_view_text(d, meals), kb)
+
+
+@router.callback_query(CloneMealFlow.picking_time, TimeActionCb.filter(F.action == "custom"))
+async def clone_time_custom(cq: CallbackQuery, state: FSMContext):
+    await state.set_state(CloneMealFlow.typing_custom_time)
+    await edit_panel_from_callback(cq, enter_custom_time_text(), reply_markup=None)
+
+
+@router.message(CloneMealFlow.typing_custom_time)
+async def clone_time_custom_input(message: Message, state: FSMContext, session: AsyncSession, user_id):
+    t0 = parse_time_hhmm(message.text or "")
+    if t0 is None:
+        await ensure_panel(
+            bot=message.bot,
+            chat_id=message.chat.id,
+            state=state,
+            text="Неверный формат. Введи ЧЧ:ММ, например 08:30",
+            reply_markup=None,
+        )
+        return
+
+    d, ok = await _clone(state, session, user_id, snap_to_15(t0))
+
+    meals = await MealRepo(session).list_meals_by_day(user_id, d)
+    kb = build_day_meals_kb(d, meals, back_cb="menu:calendar_recent")
+    await ensure_panel(
+        bot=message.bot,
+        chat_id=message.chat.id,
+        state=state,
+        text=_done_text(ok) + day_view_text(d, meals),
+        reply_markup=kb,
+    )
+
+
+@router.callback_query(CloneMealFlow.picking_time, TimeActionCb.filter(F.action == "back"))
+async def clone_time_back(cq: CallbackQuery, state: FSMContext, session: AsyncSession, user_id):
+    st = await state.get_data()
+    kind, d = st.get("clone_back") or ("day", st["clone_date"])
+    await state.set_state(None)
+
+    # возврат на экран, с которого пришли: карточка дня или список шаблонов
+    if kind == "tpl":
+        templates = await TemplateRepo(session).list_for_user(user_id)
+        await edit_panel_from_callback(cq, templates_text(d, bool(templates)), build_templates_kb(d, templates))
+        return
+
+    meals = await MealRepo(session).list_meals_by_day(user_id, d)
+    kb = build_day_meals_kb(d, meals, back_cb="menu:calendar_recent")
+    await edit_panel_from_callback(cq, day_view_text(d, meals), kb)
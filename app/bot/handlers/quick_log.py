@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import asdict
+
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.bot.handlers.add_meal import _auto_mappings, _start_draft, _start_items_step
+from app.bot.keyboards.meals import build_meal_actions_kb
+from app.bot.utils.dates import now_in_tz, today_in_tz
+from app.bot.utils.panel import ensure_panel
+from app.bot.utils.parse import parse_items, snap_to_15, split_leading_time
+from app.bot.utils.text import meal_details_text_view, quick_log_help_text
+from app.db.repo_meals import MealRepo, DraftItem
+
+
+router = Router()
+
+# Быстрая запись одним сообщением: "/log 08:30 овсянка 60г, молоко 200г"
+# (или тот же текст без команды, если начинается со времени и никакой flow не активен).
+# Позиции с однозначным авто-маппингом и граммами пишутся сразу одной транзакцией
+# (MealRepo.save_draft); если есть неоднозначные или выбранные по уверенности поиска
+# ("✅ auto") — черновик add flow со сводкой позиций, уточняются только они.
+
+
+async def _quick_log(message: Message, text: str, *, state: FSMContext, profile, session: AsyncSession, user_id) -> None:
+    t0, rest = split_leading_time(text)
+    parsed = parse_items(rest)
+    if not parsed:
+        await ensure_panel(bot=message.bot, chat_id=message.chat.id, state=state, text=quick_log_help_text())
+        return
+
+    meal_date = today_in_tz(profile.timezone_iana)
+    meal_time = snap_to_15(t0 or now_in_tz(profile.timezone_iana).time())
+
+    mappings = await _auto_mappings(session, user_id, [raw for raw, _ in parsed], accept_confident=True)
+    items = [
+        DraftItem(id=str(uuid.uuid4()), position=idx, raw_name=raw, grams=grams, **mapping)
+        for idx, ((raw, grams), mapping) in enumerate(zip(parsed, mappings), start=1)
+    ]
+    pending = [
+        it.id for it in items
+        if it.grams is None or it.auto_selected or not (it.product_ref_id or it.user_product_id)
+    ]
+
+    # /log прерывает любой начатый flow; панель — новым сообщением под командой
+    await state.clear()
+
+    if pending:
+        await state.update_data(meal_date=meal_date, return_to=f"day:view:{meal_date.isoformat()}")
+        await _start_draft(state, meal_time)
+        await state.update_data(note=rest, draft_items=[asdict(it) for it in items])
+        await _start_items_step(message.chat.id, message.bot, state, session, user_id, [it.id for it in items])
+        return
+
+    repo = MealRepo(session)
+    meal_id = uuid.uuid4()
+    # весь приём — в одной транзакции (коммит делает DbSessionMiddleware)
+    await repo.save_draft(
+        meal_id,
+        user_id=user_id,
+        meal_date=meal_date,
+        meal_time=meal_time,
+        note=rest,
+        items=items,
+        photos=[],
+    )
+    meal = await repo.get_meal(meal_id)
+    views = await repo.list_items_view(meal_id)
+    await ensure_panel(
+        bot=message.bot,
+        chat_id=message.chat.id,
+        state=state,
+        text="Записано ✅\n\n" + meal_details_text_view(meal, views, []),
+        reply_markup=build_meal_actions_kb(meal_id, back_to_day_cb=f"day:view:{meal_date.isoformat()}", photos_count=0),
+    )
+
+
+@router.message(Command("log"))
+async def cmd_log(message: Message, command: CommandObject, state: FSMContext, profile, session: AsyncSession, user_id):
+    await _quick_log(message, command.args or "", state=state, profile=profile, session=session, user_id=user_id)
+
+
+@router.message(StateFilter(None), F.text.regexp(r"^\s*\d{1,2}:\d{2}\s+\S"))
+async def quick_log_text(message: Message, state: FSMContext, profile, session: AsyncSession, user_id):
+    await _quick_log(message, message.text, state=state, profile=profile, session=session, user_id=user_id)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import date, timedelta
 
 from aiogram import Router, F
@@ -9,12 +10,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.bot.keyboards.calendar import CalendarNavCb, CalendarPickCb, CalendarMode, NoopCb, build_month_calendar
 from app.bot.utils.dates import add_month, today_in_tz
 from app.bot.utils.panel import edit_panel_from_callback
+from app.bot.utils.text import macros_text, meal_timing_text
+from app.analytics.meal_timing import get_meal_timing
 from app.db.repo_meals import MealRepo
-from app.bot.utils.charts import kcal_line_chart
+from app.db.repo_stats import StatsRepo, auto_bucket
+from app.bot.utils.charts import ReportData, stats_report_image
 
 
 router = Router()
 
+# быстрые диапазоны «последние N дней» на экране статистики дня
+LAST_DAYS_CHOICES = (30, 90, 365)
+
 
 def _week_range(d: date) -> tuple[date, date]:
     # неделя Пн-Вс
@@ -99,12 +106,10 @@ async def stats_pick_day(cq: CallbackQuery, session: AsyncSession, user_id):
         mins = (b.hour * 60 + b.minute) - (a.hour * 60 + a.minute)
         intervals.append(mins)
 
-    total_kcal = 0.0
-    photos_total = 0
-    for m in meals:
-        items = await repo.list_items(m.id)
-        total_kcal += sum(float(it.kcal_total or 0.0) for it in items)
-        photos_total += len(await repo.list_photos(m.id))
+    # итоги дня — из дневного rollup (ккал, БЖУ, фото уже агрегированы)
+    mark = (await repo.month_marks(user_id, d, d)).get(d)
+    total_kcal = mark.kcal_total if mark else 0.0
+    photos_total = mark.photos_count if mark else 0
 
     lines = [
         f"Статистика за {d.isoformat()}",
@@ -113,6 +118,8 @@ async def stats_pick_day(cq: CallbackQuery, session: AsyncSession, user_id):
         f"Фото: {photos_total}",
         f"Калорийность (из справочника): {total_kcal:.0f} ккал",
     ]
+    if mark:
+        lines.append(macros_text(mark.protein_g, mark.fat_g, mark.carbs_g))
     if intervals:
         lines.append("")
         lines.append("Интервалы между приемами (мин): " + ", ".join(str(x) for x in intervals))
@@ -122,81 +129,140 @@ async def stats_pick_day(cq: CallbackQuery, session: AsyncSession, user_id):
     b.button(text="📋 Открыть день (приемы)", callback_data=f"day:view:{d.isoformat()}")
     b.button(text="📈 Неделя", callback_data=f"stats:week:{d.isoformat()}")
     b.button(text="📊 Месяц", callback_data=f"stats:month:{d.isoformat()}")
+    for n in LAST_DAYS_CHOICES:
+        b.button(text=f"🗓 {n} дней", callback_data=f"stats:last:{n}:{d.isoformat()}")
+    b.button(text="⏱ Режим питания", callback_data="stats:timing")
     b.button(text="⬅️ Назад к календарю", callback_data="menu:stats")
-    b.adjust(1)
+    b.adjust(1, 2, 3, 1, 1)
 
     await edit_panel_from_callback(cq, "\n".join(lines), b.as_markup())
 
 
-@router.callback_query(F.data.startswith("stats:week:"))
-async def stats_week(cq: CallbackQuery, session: AsyncSession, user_id):
-    d = date.fromisoformat(cq.data.split(":")[2])
-    start, end = _week_range(d)
+async def _send_range_report(
+    cq: CallbackQuery,
+    session: AsyncSession,
+    user_id,
+    *,
+    start: date,
+    end: date,
+    title: str,
+    back_text: str,
+) -> None:
+    """
+    Отчёт за произвольный диапазон: все агрегаты одним запросом (StatsRepo.range_stats),
+    графики — по дням / неделям / месяцам в зависимости от длины диапазона.
+    Отправляется одним send_photo (сводная картинка, текст в подписи, кнопки).
+    """
+    bucket = auto_bucket(start, end)
+    st = await StatsRepo(session).range_stats(user_id, start, end, bucket=bucket)
 
-    repo = MealRepo(session)
-    days, kcal_vals, total_kcal, total_meals, total_photos = await repo.range_summary(user_id, start, end)
-
-    avg = total_kcal / len(days) if days else 0.0
-    max_kcal = max(kcal_vals) if kcal_vals else 0.0
-    max_day = days[kcal_vals.index(max_kcal)] if kcal_vals else start
-
-    text = (
-        f"📈 Неделя: {start.isoformat()} — {end.isoformat()}\n\n"
-        f"Всего ккал: {total_kcal:.0f}\n"
-        f"Среднее/день: {avg:.0f}\n"
-        f"Приемов: {total_meals}\n"
-        f"Фото: {total_photos}\n"
-        f"Самый калорийный день: {max_day.isoformat()} ({max_kcal:.0f} ккал)"
-    )
+    lines = [
+        f"{title}\n",
+        f"Всего ккал: {st.total_kcal:.0f}",
+        macros_text(st.protein_g, st.fat_g, st.carbs_g),
+        f"Среднее/день: {st.avg_kcal:.0f} (по дням с записями: {st.avg_kcal_recorded:.0f})",
+        f"Медиана / 90-й перцентиль: {st.p50_kcal:.0f} / {st.p90_kcal:.0f} ккал",
+        f"Дней с записями: {st.days_with_records}/{st.days}",
+        f"Серия: текущая {st.current_streak}, лучшая {st.longest_streak} дн.",
+        f"Приемов: {st.total_meals}",
+        f"Фото: {st.total_photos}",
+    ]
+    if st.max_day is not None:
+        lines.append(f"Самый калорийный день: {st.max_day.isoformat()} ({st.max_kcal:.0f} ккал)")
 
     await cq.answer()
-    await cq.message.edit_text(text, reply_markup=None)
 
-    chart = kcal_line_chart(days, kcal_vals, title=f"Ккал по дням (неделя {start.isoformat()}—{end.isoformat()})")
-    await cq.bot.send_photo(chat_id=cq.message.chat.id, photo=chart)
+    if bucket == "day":
+        report = ReportData(
+            dates=st.bucket_starts,
+            kcal=st.bucket_kcal,
+            kcal_title="Ккал по дням",
+            meals=[float(x) for x in st.bucket_meals],
+            meals_title="Приемов в день",
+            protein_g=st.protein_g,
+            fat_g=st.fat_g,
+            carbs_g=st.carbs_g,
+        )
+    else:
+        label = "неделям" if bucket == "week" else "месяцам"
+        report = ReportData(
+            dates=st.bucket_starts,
+            kcal=st.bucket_avg_kcal(),
+            kcal_title=f"Среднее ккал/день по {label}",
+            meals=st.bucket_avg_meals(),
+            meals_title="Приемов в день (среднее)",
+            protein_g=st.protein_g,
+            fat_g=st.fat_g,
+            carbs_g=st.carbs_g,
+            kcal_kind="bar",
+        )
+    # рендер — CPU-bound, не блокируем event loop
+    image = await asyncio.to_thread(stats_report_image, report)
 
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     b = InlineKeyboardBuilder()
-    b.button(text="📅 Вернуться к дню", callback_data="menu:stats")
+    b.button(text=back_text, callback_data="menu:stats")
     b.button(text="⬅️ В меню", callback_data="menu:back")
     b.adjust(1)
-    await cq.bot.send_message(chat_id=cq.message.chat.id, text="Дальше:", reply_markup=b.as_markup())
+
+    # весь отчёт — одно сообщение: картинка + сводка в подписи + навигация
+    await cq.bot.send_photo(
+        chat_id=cq.message.chat.id,
+        photo=image,
+        caption="\n".join(lines),
+        reply_markup=b.as_markup(),
+    )
+
+
+@router.callback_query(F.data.startswith("stats:week:"))
+async def stats_week(cq: CallbackQuery, session: AsyncSession, user_id):
+    d = date.fromisoformat(cq.data.split(":")[2])
+    start, end = _week_range(d)
+    await _send_range_report(
+        cq, session, user_id,
+        start=start, end=end,
+        title=f"📈 Неделя: {start.isoformat()} — {end.isoformat()}",
+        back_text="📅 Вернуться к дню",
+    )
 
 
 @router.callback_query(F.data.startswith("stats:month:"))
 async def stats_month(cq: CallbackQuery, session: AsyncSession, user_id):
     d = date.fromisoformat(cq.data.split(":")[2])
     start, end = _month_range(d)
+    await _send_range_report(
+        cq, session, user_id,
+        start=start, end=end,
+        title=f"📊 Месяц: {start.strftime('%Y-%m')}",
+        back_text="📅 Вернуться к календарю",
+    )
 
-    repo = MealRepo(session)
-    days, kcal_vals, total_kcal, total_meals, total_photos = await repo.range_summary(user_id, start, end)
-
-    avg = total_kcal / len(days) if days else 0.0
-    max_kcal = max(kcal_vals) if kcal_vals else 0.0
-    max_day = days[kcal_vals.index(max_kcal)] if kcal_vals else start
-
-    # days_with_records
-    days_with_records = sum(1 for v in kcal_vals if v > 0)
-
-    text = (
-        f"📊 Месяц: {start.strftime('%Y-%m')}\n\n"
-        f"Всего ккал: {total_kcal:.0f}\n"
-        f"Среднее/день: {avg:.0f}\n"
-        f"Дней с записями: {days_with_records}/{len(days)}\n"
-        f"Приемов: {total_meals}\n"
-        f"Фото: {total_photos}\n"
-        f"Самый калорийный день: {max_day.isoformat()} ({max_kcal:.0f} ккал)"
+
+@router.callback_query(F.data.startswith("stats:last:"))
+async def stats_last_days(cq: CallbackQuery, session: AsyncSession, user_id):
+    # stats:last:<n>:<дата конца диапазона>
+    _, _, n_raw, d_raw = cq.data.split(":")
+    n = int(n_raw)
+    if n not in LAST_DAYS_CHOICES:
+        await cq.answer()
+        return
+    end = date.fromisoformat(d_raw)
+    start = end - timedelta(days=n - 1)
+    await _send_range_report(
+        cq, session, user_id,
+        start=start, end=end,
+        title=f"🗓 {n} дней: {start.isoformat()} — {end.isoformat()}",
+        back_text="📅 Вернуться к календарю",
     )
 
-    await cq.answer()
-    await cq.message.edit_text(text, reply_markup=None)
 
-    chart = kcal_line_chart(days, kcal_vals, title=f"Ккал по дням (месяц {start.strftime('%Y-%m')})")
-    await cq.bot.send_photo(chat_id=cq.message.chat.id, photo=chart)
+@router.callback_query(F.data == "stats:timing")
+async def stats_timing(cq: CallbackQuery, session: AsyncSession, user_id):
+    t = await get_meal_timing(session, user_id)
 
     from aiogram.utils.keyboard import InlineKeyboardBuilder
     b = InlineKeyboardBuilder()
     b.button(text="📅 Вернуться к календарю", callback_data="menu:stats")
     b.button(text="⬅️ В меню", callback_data="menu:back")
     b.adjust(1)
-    await cq.bot.send_message(chat_id=cq.message.chat.id, text="Дальше:", reply_markup=b.as_markup())
+    await edit_panel_from_callback(cq, meal_timing_text(t), b.as_markup())
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+
+class EditCb(CallbackData, prefix="ed"):
+    action: str    # "item" | "time" | "add" | "photos" | "save" | "cancel" | "back"
+                   # | "prod" | "grams" | "up" | "down" | "del" | "photo_del" | "photo_show"
+    ref: str = ""  # uuid позиции / фото ("n<idx>" — новое, ещё не сохранённое фото)
+
+
+def _item_label(it: dict) -> str:
+    mapped = "✅" if it.get("product_ref_id") or it.get("user_product_id") else "❔"
+    if it.get("auto_selected"):
+        mapped = "✅ auto"
+    name = it.get("product_name") or it["raw_name"]
+    grams = f"{float(it['grams']):g} г" if it.get("grams") is not None else "— г"
+    return f"{it['position']}. {mapped} {name} · {grams}"[:60]
+
+
+def build_edit_meal_kb(items: list[dict], photos_count: int) -> InlineKeyboardMarkup:
+    b = InlineKeyboardBuilder()
+    for it in items:
+        b.button(text=_item_label(it), callback_data=EditCb(action="item", ref=it["id"]).pack())
+
+    b.button(text="🕒 Время", callback_data=EditCb(action="time").pack())
+    b.button(text="➕ Добавить продукты", callback_data=EditCb(action="add").pack())
+    b.button(text=f"📷 Фото ({photos_count})", callback_data=EditCb(action="photos").pack())
+    b.button(text="✅ Сохранить", callback_data=EditCb(action="save").pack())
+    b.button(text="⬅️ Отмена", callback_data=EditCb(action="cancel").pack())
+    b.adjust(*([1] * len(items)), 1, 1, 1, 2)
+    return b.as_markup()
+
+
+def build_edit_item_kb(item_id: str, *, can_up: bool, can_down: bool) -> InlineKeyboardMarkup:
+    b = InlineKeyboardBuilder()
+    b.button(text="🔁 Продукт", callback_data=EditCb(action="prod", ref=item_id).pack())
+    b.button(text="⚖️ Граммы", callback_data=EditCb(action="grams", ref=item_id).pack())
+    if can_up:
+        b.button(text="⬆️ Выше", callback_data=EditCb(action="up", ref=item_id).pack())
+    if can_down:
+        b.button(text="⬇️ Ниже", callback_data=EditCb(action="down", ref=item_id).pack())
+    b.button(text="🗑 Удалить позицию", callback_data=EditCb(action="del", ref=item_id).pack())
+    b.button(text="⬅️ К приёму", callback_data=EditCb(action="back").pack())
+    b.adjust(2, int(can_up) + int(can_down) or 1, 1, 1)
+    return b.as_markup()
+
+
+def build_edit_back_kb() -> InlineKeyboardMarkup:
+    b = InlineKeyboardBuilder()
+    b.button(text="⬅️ К приёму", callback_data=EditCb(action="back").pack())
+    return b.as_markup()
+
+
+def build_edit_photos_kb(kept: list[dict], new: list[dict]) -> InlineKeyboardMarkup:
+    b = InlineKeyboardBuilder()
+    n = 0
+    for ph in kept:
+        n += 1
+        b.button(text=f"🗑 Фото {n}", callback_data=EditCb(action="photo_del", ref=ph["id"]).pack())
+    for idx, _ in enumerate(new):
+        n += 1
+        b.button(text=f"🗑 Фото {n} (новое)", callback_data=EditCb(action="photo_del", ref=f"n{idx}").pack())
+
+    b.adjust(2)
+
+    if n:
+        b.row(InlineKeyboardButton(text="📤 Показать", callback_data=EditCb(action="photo_show").pack()))
+    b.row(InlineKeyboardButton(text="⬅️ К приёму", callback_data=EditCb(action="back").pack()))
+    return b.as_markup()
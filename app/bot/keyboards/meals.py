@@ -13,7 +13,7 @@ from app.db.models import Meal
 
 class MealActionCb(CallbackData, prefix="mealact"):
     meal_id: str
-    action: str  # "delete" | "delete_confirm" | "edit" | "show" | "photos"
+    action: str  # "delete" | "delete_confirm" | "edit" | "show" | "photos" | "repeat" | "save_tpl"
 
 
 def build_day_meals_kb(day: date, meals: Iterable[Meal], back_cb: str = "menu:back") -> InlineKeyboardMarkup:
@@ -23,6 +23,7 @@ def build_day_meals_kb(day: date, meals: Iterable[Meal], back_cb: str = "menu:ba
         b.button(text=label, callback_data=MealActionCb(meal_id=str(m.id), action="show").pack())
 
     b.button(text="➕ Добавить прием пищи", callback_data=f"day:add:{day.isoformat()}")
+    b.button(text="📋 Из шаблона", callback_data=f"day:tpl:{day.isoformat()}")
     b.button(text="⬅️ Назад", callback_data=back_cb)
     b.adjust(1)
     return b.as_markup()
@@ -32,6 +33,8 @@ def build_meal_actions_kb(meal_id: uuid.UUID, back_to_day_cb: str, photos_count:
     b = InlineKeyboardBuilder()
     if photos_count > 0:
         b.button(text=f"📷 Показать фото ({photos_count})", callback_data=MealActionCb(meal_id=str(meal_id), action="photos").pack())
+    b.button(text="🔁 Повторить приём", callback_data=MealActionCb(meal_id=str(meal_id), action="repeat").pack())
+    b.button(text="💾 В шаблоны", callback_data=MealActionCb(meal_id=str(meal_id), action="save_tpl").pack())
     b.button(text="✏️ Редактировать", callback_data=MealActionCb(meal_id=str(meal_id), action="edit").pack())
     b.button(text="🗑 Удалить", callback_data=MealActionCb(meal_id=str(meal_id), action="delete").pack())
     b.button(text="⬅️ Назад", callback_data=back_to_day_cb)
@@ -8,17 +8,19 @@ from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from app.bot.utils.ids import uuid_to_short
-from app.db.repo_products import RankedCandidate
+from app.db.repo_frequent import FrequentProduct
+from app.db.repo_products import BUCKET_USER, RankedCandidate
 
 
 class ProductPickCb(CallbackData, prefix="pp"):
     item: str   # short uuid
     prod: str   # short uuid
+    src: str = "r"  # "r" — справочник, "u" — свой продукт пользователя
 
 
 class ProductActionCb(CallbackData, prefix="pa"):
     item: str
-    action: str  # "skip" | "back"
+    action: str  # "skip" | "back" | "own"
 
 
 class ProductPageCb(CallbackData, prefix="pg"):
@@ -26,6 +28,14 @@ class ProductPageCb(CallbackData, prefix="pg"):
     page: int
 
 
+class FrequentPickCb(CallbackData, prefix="fq"):
+    prod: str   # short uuid
+
+
+class ItemReviewCb(CallbackData, prefix="ir"):
+    item: str   # short uuid позиции черновика
+
+
 def build_product_candidates_kb(
     *,
     item_id: uuid.UUID,
@@ -41,14 +51,23 @@ def build_product_candidates_kb(
     for c in candidates:
         c_short = uuid_to_short(c.product_id)
 
-        # bucket: 0 exact, 1 name, 2 synonym
-        bucket_prefix = "🎯 " if c.bucket == 0 else ("🔎 " if c.bucket == 1 else "🔁 ")
+        # bucket: -2 свой продукт, -1 history, 0 exact, 1 name, 2 synonym
+        if c.bucket == BUCKET_USER:
+            bucket_prefix = "👤 "
+        elif c.bucket < 0:
+            bucket_prefix = "⭐ "
+        else:
+            bucket_prefix = "🎯 " if c.bucket == 0 else ("🔎 " if c.bucket == 1 else "🔁 ")
         chosen_prefix = "✅ " if (selected_short and c_short == selected_short) else ""
         label = (chosen_prefix + bucket_prefix + c.name)[:60]
 
         b.button(
             text=label,
-            callback_data=ProductPickCb(item=item_short, prod=c_short).pack(),
+            callback_data=ProductPickCb(
+                item=item_short,
+                prod=c_short,
+                src="u" if c.bucket == BUCKET_USER else "r",
+            ).pack(),
         )
 
     # Навигация страниц
@@ -59,7 +78,53 @@ def build_product_candidates_kb(
         nav.button(text="▶️", callback_data=ProductPageCb(item=item_short, page=min(total_pages, page + 1)).pack())
         b.row(*nav.as_markup().inline_keyboard[0])
 
+    b.button(text="➕ Свой продукт (ккал на 100 г)", callback_data=ProductActionCb(item=item_short, action="own").pack())
     b.button(text="🚫 Без привязки", callback_data=ProductActionCb(item=item_short, action="skip").pack())
     b.button(text="⬅️ Назад", callback_data=ProductActionCb(item=item_short, action="back").pack())
     b.adjust(1)
     return b.as_markup()
+
+
+def _review_label(it: dict) -> str:
+    grams = f"{float(it['grams']):g} г" if it.get("grams") is not None else "— г"
+    if it.get("product_ref_id") or it.get("user_product_id"):
+        mark = "✅ auto" if it.get("auto_selected") else "✅"
+        name = it.get("product_name") or it["raw_name"]
+    else:
+        mark, name = "❔", it["raw_name"]
+    return f"{mark} {name} · {grams}"[:60]
+
+
+def build_items_review_kb(items: list[dict]) -> InlineKeyboardMarkup:
+    """
+    Сводка позиций после ввода: одна кнопка на позицию (нажатие — шаг маппинга этой позиции).
+    """
+    b = InlineKeyboardBuilder()
+    for it in items:
+        b.button(
+            text=_review_label(it),
+            callback_data=ItemReviewCb(item=uuid_to_short(uuid.UUID(it["id"]))).pack(),
+        )
+    b.button(text="✅ Всё верно", callback_data="items:confirm")
+    b.button(text="⬅️ В меню", callback_data="menu:back")
+    b.adjust(1)
+    return b.as_markup()
+
+
+def build_frequent_products_kb(
+    *,
+    products: List[FrequentProduct],
+    can_finish: bool,
+) -> InlineKeyboardMarkup:
+    b = InlineKeyboardBuilder()
+    for p in products:
+        b.button(
+            text=f"⭐ {p.name} · {p.usual_grams:g} г"[:60],
+            callback_data=FrequentPickCb(prod=uuid_to_short(p.product_id)).pack(),
+        )
+
+    if can_finish:
+        b.button(text="✅ Готово — к фото", callback_data="items:done")
+    b.button(text="⬅️ В меню", callback_data="menu:back")
+    b.adjust(1)
+    return b.as_markup()
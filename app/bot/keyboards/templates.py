@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from app.bot.utils.ids import uuid_to_short
+from app.db.repo_templates import MealTemplateView
+
+
+class TplCb(CallbackData, prefix="tpl"):
+    tpl: str     # short uuid
+    action: str  # "use" | "del"
+
+
+def build_templates_kb(day: date, templates: Iterable[MealTemplateView]) -> InlineKeyboardMarkup:
+    b = InlineKeyboardBuilder()
+    rows = 0
+    for t in templates:
+        short = uuid_to_short(t.id)
+        b.button(text=f"📋 {t.name} ({t.items_count} поз.)", callback_data=TplCb(tpl=short, action="use").pack())
+        b.button(text="🗑", callback_data=TplCb(tpl=short, action="del").pack())
+        rows += 1
+
+    b.button(text="⬅️ Назад", callback_data=f"day:view:{day.isoformat()}")
+    b.adjust(*([2] * rows), 1)
+    return b.as_markup()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    EditMessageCaption,
+    EditMessageMedia,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    GetUpdates,
+    SendMediaGroup,
+    TelegramMethod,
+)
+from aiogram.methods.base import Response, TelegramType
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+logger = logging.getLogger(__name__)
+
+# сколько бакетов чатов держим до чистки простаивающих
+_MAX_CHAT_BUCKETS = 10_000
+
+
+class _TokenBucket:
+    """
+    Token bucket без блокировок: reserve() синхронный (в asyncio атомарен) и возвращает,
+    сколько ждать до отправки. Уход в минус = очередь: каждый следующий ждёт дольше (FIFO).
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float, cost: float = 1.0) -> float:
+        # ждём, пока погасится долг предыдущих запросов; свою стоимость запрос списывает
+        # целиком (альбом из 10 фото уходит сразу, а следующие за ним ждут дольше)
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        self.tokens -= cost
+        return wait
+
+    def penalize(self, seconds: float, now: float) -> None:
+        # flood control от Telegram: ближайший reserve() получит ожидание не меньше seconds
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+# правки сообщений (inline-панели) и ответы на callback не считаются новыми сообщениями в чат:
+# по-чатовый лимит к ним не применяем, только глобальный
+_CHAT_EXEMPT = (
+    EditMessageText,
+    EditMessageReplyMarkup,
+    EditMessageCaption,
+    EditMessageMedia,
+    AnswerCallbackQuery,
+)
+
+
+def _cost(method: TelegramMethod) -> float:
+    # альбом — отдельное сообщение на каждое фото
+    if isinstance(method, SendMediaGroup):
+        return float(max(1, len(method.media)))
+    return 1.0
+
+
+class OutboundRateLimiter(BaseRequestMiddleware):
+    """
+    Единый исходящий путь к Bot API: запросы с chat_id и ответы на callback проходят через
+    глобальный token bucket, новые сообщения — ещё и через по-чатовый (лимиты Telegram
+    ~30 сообщений/с на бота, ~1/с в личку, ~20/мин в группу); альбом стоит по числу фото.
+    На 429 (TelegramRetryAfter) бакет «замораживается» на retry_after, запрос повторяется
+    до settings.tg_retry_after_attempts раз.
+    """
+
+    def __init__(self) -> None:
+        self._global = _TokenBucket(settings.tg_global_rate_per_sec, settings.tg_global_rate_per_sec)
+        self._chats: Dict[int | str, _TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int | str, now: float) -> _TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= _MAX_CHAT_BUCKETS:
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = settings.tg_group_rate_per_min / 60 if is_group else settings.tg_chat_rate_per_sec
+            bucket = _TokenBucket(rate, settings.tg_chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id: Optional[int | str] = getattr(method, "chat_id", None)
+        if isinstance(method, GetUpdates) or (chat_id is None and not isinstance(method, AnswerCallbackQuery)):
+            return await make_request(bot, method)
+        per_chat = chat_id is not None and not isinstance(method, _CHAT_EXEMPT)
+        cost = _cost(method)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            now = time.monotonic()
+            bucket = self._chat_bucket(chat_id, now) if per_chat else None
+            wait = self._global.reserve(now, cost)
+            if bucket is not None:
+                wait = max(wait, bucket.reserve(now, cost))
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= settings.tg_retry_after_attempts:
+                    raise
+                logger.warning(
+                    "flood control on %s (chat %s): retry after %ss", type(method).__name__, chat_id, e.retry_after
+                )
+                if bucket is not None:
+                    bucket.penalize(float(e.retry_after), time.monotonic())
+                else:
+                    # правка/ответ на callback: ждём сами, не замораживая чужие чаты глобальным бакетом
+                    await asyncio.sleep(float(e.retry_after))
@@ -9,8 +9,28 @@ class AddMealFlow(StatesGroup):
     typing_custom_time = State()
 
     typing_items = State()
+    reviewing_items = State()
 
     mapping_item = State()
+    typing_own_product = State()
     typing_grams = State()
 
     waiting_photo = State()
+
+
+class CloneMealFlow(StatesGroup):
+    # копия приёма пищи / приём из шаблона: нужно только время
+    picking_time = State()
+    typing_custom_time = State()
+
+
+class EditMealFlow(StatesGroup):
+    # правка существующего приёма: изменения копятся в FSM, в БД — diff по «Сохранить»
+    reviewing = State()
+    picking_time = State()
+    typing_custom_time = State()
+    typing_items = State()
+    mapping_item = State()
+    typing_own_product = State()
+    typing_grams = State()
+    photos = State()
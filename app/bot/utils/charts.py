@@ -1,21 +1,254 @@
+"""
+Графики ккал для статистики.
+
+Бэкенд задаётся настройкой chart_backend:
+- "pillow" (по умолчанию) — небольшой рендер линий/столбцов на Pillow;
+- "matplotlib" — импортируется лениво, при первом графике (в процессе бота
+  без статистики не тянет ни время старта, ни десятки МБ памяти).
+
+Рендер — синхронный и CPU-bound: из хэндлеров вызывать через asyncio.to_thread.
+"""
 from __future__ import annotations
 
-from io import BytesIO
+import os
+from dataclasses import dataclass
 from datetime import date
-
-import matplotlib
-# matplotlib.use("Agg")  # важно для серверов без GUI
-import matplotlib.pyplot as plt  # noqa
+from functools import lru_cache
+from io import BytesIO
 
 from aiogram.types import BufferedInputFile
 
+from app.config import settings
+
+
+WIDTH, HEIGHT = 960, 640
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 90, 30, 70, 70
+
+COLOR_BG = (255, 255, 255)
+COLOR_AXIS = (60, 60, 60)
+COLOR_GRID = (225, 225, 225)
+COLOR_TEXT = (30, 30, 30)
+COLOR_SERIES = (31, 119, 180)
+COLOR_MACROS = ((214, 39, 40), (255, 127, 14), (44, 160, 44))
+
+# шрифт с кириллицей; если не найден — встроенный шрифт Pillow
+_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+MAX_X_LABELS = 8
+
 
 def kcal_line_chart(dates: list[date], values: list[float], title: str) -> BufferedInputFile:
-    fig = plt.figure()
+    return BufferedInputFile(_render("line", dates, values, title), filename="chart.png")
+
+
+def kcal_bar_chart(dates: list[date], values: list[float], title: str) -> BufferedInputFile:
+    return BufferedInputFile(_render("bar", dates, values, title), filename="chart.png")
+
+
+@dataclass(frozen=True)
+class ReportData:
+    """
+    Данные сводного отчёта: ккал и приёмы по дням/bucket + суммарные БЖУ.
+    """
+    dates: list[date]
+    kcal: list[float]
+    kcal_title: str
+    meals: list[float]
+    meals_title: str
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+    kcal_kind: str = "line"
+
+
+def stats_report_image(r: ReportData) -> BufferedInputFile:
+    """
+    Одна картинка из трёх панелей: ккал, приёмы в день, доли БЖУ.
+    """
+    if settings.chart_backend == "matplotlib":
+        data = _matplotlib_report_png(r)
+    else:
+        data = _pillow_report_png(r)
+    return BufferedInputFile(data, filename="report.png")
+
+
+def _render(kind: str, dates: list[date], values: list[float], title: str) -> bytes:
+    if settings.chart_backend == "matplotlib":
+        return _matplotlib_png(kind, dates, values, title)
+    return _pillow_png(kind, dates, values, title)
+
+
+# ---------------------------------------------------------------------------
+# Pillow
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=4)
+def _font(size: int):
+    from PIL import ImageFont
+
+    paths = [settings.chart_font_path] if settings.chart_font_path else []
+    for path in [*paths, *_FONT_CANDIDATES]:
+        if path and os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size=size)
+
+
+def _nice_step(max_value: float, ticks: int = 5) -> float:
+    """
+    Шаг сетки по Y вида 1/2/5 * 10^k.
+    """
+    raw = max(max_value, 1.0) / ticks
+    mag = 10 ** (len(str(int(raw))) - 1)
+    for m in (1, 2, 5, 10):
+        if raw <= m * mag:
+            return float(m * mag)
+    return float(10 * mag)
+
+
+def _x_label(d: date, long_span: bool) -> str:
+    return d.strftime("%m.%y") if long_span else d.strftime("%d.%m")
+
+
+def _draw_series(draw, box: tuple[int, int, int, int], kind: str, dates: list[date], values: list[float],
+                 title: str, ylabel: str) -> None:
+    """
+    Одна панель (линия или столбцы) в прямоугольнике box = (x0, y0, x1, y1).
+    """
+    font, font_title = _font(16), _font(20)
+    x0, y0, x1, y1 = box
+    left, top = x0 + MARGIN_LEFT, y0 + MARGIN_TOP
+    right, bottom = x1 - MARGIN_RIGHT, y1 - MARGIN_BOTTOM
+    plot_w, plot_h = right - left, bottom - top
+
+    draw.text(((x0 + x1) // 2, y0 + 28), title, fill=COLOR_TEXT, font=font_title, anchor="mm")
+    draw.text((left, top - 14), ylabel, fill=COLOR_TEXT, font=font, anchor="lb")
+
+    # сетка и подписи по Y
+    step = _nice_step(max(values, default=0.0))
+    y_max = step * max(1, -(-max(values, default=0.0) // step))
+    v = 0.0
+    while v <= y_max + 1e-9:
+        y = bottom - v / y_max * plot_h
+        draw.line([(left, y), (right, y)], fill=COLOR_GRID, width=1)
+        draw.text((left - 8, y), f"{v:.0f}", fill=COLOR_TEXT, font=font, anchor="rm")
+        v += step
+
+    draw.line([(left, top), (left, bottom), (right, bottom)], fill=COLOR_AXIS, width=2)
+
+    n = len(values)
+    if n == 0:
+        draw.text((left + plot_w // 2, top + plot_h // 2), "Нет данных", fill=COLOR_TEXT, font=font, anchor="mm")
+        return
+
+    # точки/столбцы по центрам равных слотов
+    slot = plot_w / n
+    xs = [left + slot * (i + 0.5) for i in range(n)]
+    ys = [bottom - val / y_max * plot_h for val in values]
+
+    if kind == "bar":
+        half = max(1.0, slot * 0.35)
+        for x, y in zip(xs, ys):
+            if y < bottom - 1:
+                draw.rectangle([(x - half, y), (x + half, bottom - 1)], fill=COLOR_SERIES)
+    else:
+        if n > 1:
+            draw.line(list(zip(xs, ys)), fill=COLOR_SERIES, width=3, joint="curve")
+        if n <= 62:
+            for x, y in zip(xs, ys):
+                draw.ellipse([(x - 4, y - 4), (x + 4, y + 4)], fill=COLOR_SERIES)
+
+    long_span = n > 1 and (dates[-1] - dates[0]).days > 180
+    max_labels = max(2, MAX_X_LABELS * plot_w // (WIDTH - MARGIN_LEFT - MARGIN_RIGHT))
+    every = max(1, -(-n // max_labels))
+    for i in range(0, n, every):
+        draw.line([(xs[i], bottom), (xs[i], bottom + 5)], fill=COLOR_AXIS, width=1)
+        draw.text((xs[i], bottom + 10), _x_label(dates[i], long_span), fill=COLOR_TEXT, font=font, anchor="ma")
+
+
+def _draw_macros(draw, box: tuple[int, int, int, int], protein_g: float, fat_g: float, carbs_g: float) -> None:
+    """
+    Круговая диаграмма БЖУ по доле калорий (4/9/4 ккал на грамм) с легендой.
+    """
+    font, font_title = _font(16), _font(20)
+    x0, y0, x1, y1 = box
+    draw.text(((x0 + x1) // 2, y0 + 28), "Б/Ж/У (доля ккал)", fill=COLOR_TEXT, font=font_title, anchor="mm")
+
+    parts = [("Белки", protein_g, protein_g * 4), ("Жиры", fat_g, fat_g * 9), ("Углеводы", carbs_g, carbs_g * 4)]
+    total = sum(k for _, _, k in parts)
+
+    size = min(x1 - x0 - 60, y1 - y0 - 190)
+    cx, top = (x0 + x1) // 2, y0 + 60
+    pie = [(cx - size // 2, top), (cx + size // 2, top + size)]
+    if total <= 0:
+        draw.ellipse(pie, outline=COLOR_GRID, width=3)
+        draw.text((cx, top + size // 2), "Нет данных", fill=COLOR_TEXT, font=font, anchor="mm")
+        return
+
+    angle = -90.0
+    for (_, _, kcal), color in zip(parts, COLOR_MACROS):
+        sweep = kcal / total * 360
+        if sweep > 0:
+            draw.pieslice(pie, angle, angle + sweep, fill=color)
+        angle += sweep
+
+    y = top + size + 20
+    for (name, grams, kcal), color in zip(parts, COLOR_MACROS):
+        draw.rectangle([(x0 + 40, y + 3), (x0 + 56, y + 19)], fill=color)
+        draw.text((x0 + 66, y), f"{name}: {grams:.0f} г ({kcal / total * 100:.0f}%)", fill=COLOR_TEXT, font=font)
+        y += 30
+
+
+def _pillow_png(kind: str, dates: list[date], values: list[float], title: str) -> bytes:
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (WIDTH, HEIGHT), COLOR_BG)
+    _draw_series(ImageDraw.Draw(img), (0, 0, WIDTH, HEIGHT), kind, dates, values, title, "Ккал")
+    return _png_bytes(img)
+
+
+def _pillow_report_png(r: ReportData) -> bytes:
+    from PIL import Image, ImageDraw
+
+    bottom_h = 460
+    img = Image.new("RGB", (WIDTH, HEIGHT + bottom_h), COLOR_BG)
+    draw = ImageDraw.Draw(img)
+    _draw_series(draw, (0, 0, WIDTH, HEIGHT), r.kcal_kind, r.dates, r.kcal, r.kcal_title, "Ккал")
+    draw.line([(20, HEIGHT), (WIDTH - 20, HEIGHT)], fill=COLOR_GRID, width=1)
+    half = WIDTH * 3 // 5
+    _draw_series(draw, (0, HEIGHT, half, HEIGHT + bottom_h), "bar", r.dates, r.meals, r.meals_title, "Приемов")
+    _draw_macros(draw, (half, HEIGHT, WIDTH, HEIGHT + bottom_h), r.protein_g, r.fat_g, r.carbs_g)
+    return _png_bytes(img)
+
+
+def _png_bytes(img) -> bytes:
+    buf = BytesIO()
+    img.save(buf, format="PNG", optimize=False)
+    return buf.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# matplotlib (ленивый импорт; объектный API без pyplot — безопасен в потоках)
+# ---------------------------------------------------------------------------
+
+def _matplotlib_png(kind: str, dates: list[date], values: list[float], title: str) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
     ax = fig.add_subplot(1, 1, 1)
 
     # matplotlib сам выберет цвета (мы не задаём)
-    ax.plot(dates, values, marker="o")
+    if kind == "bar":
+        ax.bar(dates, values)
+    else:
+        ax.plot(dates, values, marker="o")
     ax.set_title(title)
     ax.set_ylabel("Ккал")
     ax.set_xlabel("День")
@@ -25,7 +258,43 @@ def kcal_line_chart(dates: list[date], values: list[float], title: str) -> Buffe
 
     buf = BytesIO()
     fig.savefig(buf, format="png", dpi=150)
-    plt.close(fig)
-    buf.seek(0)
+    return buf.getvalue()
+
+
+def _matplotlib_report_png(r: ReportData) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6.4, 8.0))
+    FigureCanvasAgg(fig)
+    gs = fig.add_gridspec(2, 5, height_ratios=[3, 2])
 
-    return BufferedInputFile(buf.read(), filename="chart.png")
+    ax = fig.add_subplot(gs[0, :])
+    if r.kcal_kind == "bar":
+        ax.bar(r.dates, r.kcal)
+    else:
+        ax.plot(r.dates, r.kcal, marker="o")
+    ax.set_title(r.kcal_title)
+    ax.set_ylabel("Ккал")
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment("right")
+
+    ax_m = fig.add_subplot(gs[1, :3])
+    ax_m.bar(r.dates, r.meals)
+    ax_m.set_title(r.meals_title)
+    for label in ax_m.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment("right")
+
+    ax_p = fig.add_subplot(gs[1, 3:])
+    kcal = [r.protein_g * 4, r.fat_g * 9, r.carbs_g * 4]
+    if sum(kcal) > 0:
+        ax_p.pie(kcal, labels=["Б", "Ж", "У"], autopct="%.0f%%")
+    ax_p.set_title("Б/Ж/У")
+
+    fig.tight_layout()
+
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=150)
+    return buf.getvalue()
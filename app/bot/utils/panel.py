@@ -52,7 +52,11 @@ async def edit_panel_from_callback(
     reply_markup: Optional[InlineKeyboardMarkup] = None,
 ) -> None:
     try:
-        await cq.message.edit_text(text=text, reply_markup=reply_markup)
+        if cq.message.text is None:
+            # кнопка под фото/отчётом: картинку не трогаем, панель — новым сообщением
+            await cq.message.answer(text=text, reply_markup=reply_markup)
+        else:
+            await cq.message.edit_text(text=text, reply_markup=reply_markup)
     except Exception as e:
         if not _is_not_modified(e):
             raise
@@ -5,15 +5,119 @@ from datetime import time
 
 
 _TIME_RE = re.compile(r"^\s*(\d{1,2})\s*:\s*(\d{2})\s*$")
+_LEADING_TIME_RE = re.compile(r"^\s*(\d{1,2}:\d{2})(?:\s+|$)")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
 
+# количество в позиции: "150г", "200 g", "0,5 кг", "1 л", "2 шт по 90", "2 куска по 120г", "2x90 г"
+# (мл/л считаем ≈ граммами)
+_NUM = r"(\d+(?:[.,]\d+)?)"
+_UNIT = r"(кг|kg|гр(?:амм(?:а|ов)?)?|g|г|мл|ml|л|l)\.?"
+_UNIT_FACTOR = {"кг": 1000.0, "kg": 1000.0, "л": 1000.0, "l": 1000.0}
+_PCS = r"(?:шт\.?|штук[аи]?)"
+# "2 шт по 90", "2 куска по 120г", "2x90": штуки (любым словом) и вес одной штуки
+_PIECE = r"(шт\.?|штук[аи]?|[^\W\d_]+)?"
+_PIECES_RE = re.compile(rf"(?:^|\s){_NUM}\s*{_PIECE}\s*(?:по|[xх×*])\s*{_NUM}\s*(?:{_UNIT})?\s*$", re.I)
+_PIECES_HEAD_RE = re.compile(rf"^\s*{_NUM}\s*{_PIECE}\s*(?:по|[xх×*])\s*{_NUM}\s*(?:{_UNIT})?(?:\s+|$)", re.I)
+_WEIGHT_TAIL_RE = re.compile(rf"(?:^|\s){_NUM}\s*{_UNIT}\s*$", re.I)
+_WEIGHT_HEAD_RE = re.compile(rf"^\s*{_NUM}\s*{_UNIT}\s+", re.I)
+# штуки без веса одной штуки ("яйца 2 шт"): из названия убираем, граммы спросим отдельно
+_COUNT_TAIL_RE = re.compile(rf"(?:^|\s){_NUM}\s*{_PCS}\s*$", re.I)
+_COUNT_HEAD_RE = re.compile(rf"^\s*{_NUM}\s*{_PCS}\s+", re.I)
+# остаток количества, которое не разобрали целиком ("... 2 ломтя по"): такое название — мусор
+_DANGLING_RE = re.compile(r"(?:^|\s)(?:по|[xх×*])$", re.I)
+# запятая разделяет позиции, но не дробную часть ("0,5 кг")
+_ITEMS_SPLIT_RE = re.compile(r"(?<!\d),|,(?!\d)")
 
-def parse_items_csv(text: str) -> list[str]:
-    parts = [p.strip() for p in text.split(",")]
-    items = [p for p in parts if p]
-    # MVP: ограничим разумно
+
+def _num(v: str) -> float:
+    return float(v.replace(",", "."))
+
+
+def _grams(value: str, unit: str | None) -> float:
+    return _num(value) * _UNIT_FACTOR.get((unit or "").lower(), 1.0)
+
+
+def _split_quantity(part: str) -> tuple[str, float | None]:
+    """
+    Отделяет количество от названия; название может оказаться пустым ("200г").
+    """
+    for rx, calc in (
+        (_PIECES_RE, lambda m: _num(m.group(1)) * _grams(m.group(3), m.group(4))),
+        (_PIECES_HEAD_RE, lambda m: _num(m.group(1)) * _grams(m.group(3), m.group(4))),
+        (_WEIGHT_TAIL_RE, lambda m: _grams(m.group(1), m.group(2))),
+        (_WEIGHT_HEAD_RE, lambda m: _grams(m.group(1), m.group(2))),
+        (_COUNT_TAIL_RE, None),
+        (_COUNT_HEAD_RE, None),
+    ):
+        m = rx.search(part)
+        if m is None:
+            continue
+        name = (part[: m.start()] + " " + part[m.end():]).strip()
+        if _DANGLING_RE.search(name):
+            break
+        if calc is None:
+            return name, None
+        grams = round(calc(m), 2)
+        if grams > 0:
+            piece = m.group(2) if rx in (_PIECES_RE, _PIECES_HEAD_RE) else None
+            if not name and piece and not re.fullmatch(_PCS, piece, re.I):
+                # "2 яйца по 60" — штуки названы самим продуктом
+                name = piece
+            return name, grams
+    return part, None
+
+
+def parse_item_grams(part: str) -> tuple[str, float | None]:
+    """
+    Название и граммы одной позиции: "котлета 2 шт по 90" -> ("котлета", 180.0).
+    Без распознанного количества — (исходный текст, None).
+    """
+    part = " ".join(part.split())
+    name, grams = _split_quantity(part)
+    if not name:
+        return part, None
+    return name, grams
+
+
+def parse_items(text: str) -> list[tuple[str, float | None]]:
+    """
+    Позиции через запятую с необязательным количеством в каждой:
+    "макароны 150г, котлета 2 шт по 90, салат 200 g".
+    Отдельный сегмент с одним весом ("творог 5%, 200г") — граммы предыдущей позиции;
+    если приписать их некуда, сегмент отбрасывается.
+    """
+    items: list[tuple[str, float | None]] = []
+    for part in _ITEMS_SPLIT_RE.split(text):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        name, grams = _split_quantity(part)
+        if not name:
+            if grams is not None and items and items[-1][1] is None:
+                items[-1] = (items[-1][0], grams)
+            continue
+        items.append((name, grams))
     return items[:30]
 
 
+def parse_nutrition(text: str) -> tuple[float, float | None, float | None, float | None] | None:
+    """
+    Пищевая ценность своего продукта на 100 г: "250" (только ккал) или "250 12 8 30" (ккал Б Ж У).
+    """
+    rest = _NUMBER_RE.sub(" ", text or "")
+    if rest.strip(" /;"):
+        return None
+    nums = [_num(n) for n in _NUMBER_RE.findall(text or "")]
+    if len(nums) == 1:
+        return nums[0], None, None, None
+    if len(nums) == 4:
+        kcal, protein, fat, carbs = nums
+        if protein + fat + carbs > 100:
+            return None
+        return kcal, protein, fat, carbs
+    return None
+
+
 def parse_time_hhmm(text: str) -> time | None:
     m = _TIME_RE.match(text or "")
     if not m:
@@ -25,6 +129,19 @@ def parse_time_hhmm(text: str) -> time | None:
     return time(hour=hh, minute=mm)
 
 
+def split_leading_time(text: str) -> tuple[time | None, str]:
+    """
+    "08:30 овсянка 60г" -> (08:30, "овсянка 60г"); без времени в начале — (None, text).
+    """
+    m = _LEADING_TIME_RE.match(text or "")
+    if not m:
+        return None, (text or "").strip()
+    t = parse_time_hhmm(m.group(1))
+    if t is None:
+        return None, (text or "").strip()
+    return t, text[m.end():].strip()
+
+
 def snap_to_15(t: time) -> time:
     """
     Округление к ближайшим 15 минутам.
@@ -0,0 +1,125 @@
+"""
+Доставка фото приёмов в чат.
+
+Фото уходят альбомами по 10 (одиночное — send_photo: альбом требует 2–10 элементов)
+через общий исходящий путь с лимитами (OutboundRateLimiter). Если tg_file_id больше
+не принимается Telegram, альбом перезаливается из хранилища фото (storage_uri: локальный
+файл, байты из S3 или presigned URL), а новые file_id записываются в meal_photos —
+следующий показ снова пойдёт без хранилища.
+
+Вызывать в фоне (spawn_job): ответ на callback не ждёт отправки альбомов.
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, FSInputFile, InputMediaPhoto, Message
+
+from app.config import settings
+from app.db.repo_meals import MealRepo
+from app.db.session import SessionMaker
+from app.storage.base import StorageError
+from app.storage.registry import storage_for_uri
+
+
+logger = logging.getLogger(__name__)
+
+MEDIA_GROUP_MAX = 10
+
+
+@dataclass(frozen=True)
+class PhotoRef:
+    tg_file_id: str
+    storage_uri: Optional[str] = None
+    # id в meal_photos — чтобы сохранить новый file_id после перезаливки (у фото черновика его нет)
+    photo_id: Optional[uuid.UUID] = None
+    caption: Optional[str] = None
+
+
+async def _send(bot: Bot, chat_id: int, chunk: List[tuple[PhotoRef, object]]) -> List[Message]:
+    if len(chunk) == 1:
+        p, media = chunk[0]
+        return [await bot.send_photo(chat_id=chat_id, photo=media, caption=p.caption)]
+    return list(await bot.send_media_group(
+        chat_id=chat_id,
+        media=[InputMediaPhoto(media=media, caption=p.caption) for p, media in chunk],
+    ))
+
+
+async def _stored_media(p: PhotoRef) -> Optional[object]:
+    """
+    Фото из хранилища для повторной загрузки в Telegram; None — копии нет.
+    """
+    if not p.storage_uri:
+        return None
+    try:
+        storage = storage_for_uri(p.storage_uri)
+        path = storage.local_path(p.storage_uri)
+        if path is not None:
+            return FSInputFile(path)
+        if settings.storage_public_reads:
+            url = await storage.presigned_url(p.storage_uri, expires_seconds=settings.storage_presign_seconds)
+            if url:
+                return url
+        return BufferedInputFile(await storage.read(p.storage_uri), filename="photo.jpg")
+    except StorageError:
+        logger.info("stored copy unavailable: %s", p.storage_uri, exc_info=True)
+    except ValueError:
+        # file:// не этого бэкенда и т.п. — копии считаем недоступной
+        logger.info("bad storage uri: %s", p.storage_uri)
+    return None
+
+
+async def _send_chunk(bot: Bot, chat_id: int, chunk: List[PhotoRef]) -> List[tuple[uuid.UUID, str, Optional[str]]]:
+    """
+    Один альбом: file_id → (при ошибке) копии из хранилища, где они есть → только копии из хранилища.
+    Возвращает обновлённые file_id перезалитых фото.
+    """
+    try:
+        await _send(bot, chat_id, [(p, p.tg_file_id) for p in chunk])
+        return []
+    except TelegramBadRequest as e:
+        logger.info("file_id rejected for chat %s (%s), re-uploading from storage", chat_id, e.message)
+
+    stored = {id(p): m for p in chunk if (m := await _stored_media(p)) is not None}
+    if not stored:
+        logger.warning("could not deliver %s photo(s) to chat %s: no valid file_id or stored copy", len(chunk), chat_id)
+        return []
+
+    mixed = [(p, stored.get(id(p), p.tg_file_id)) for p in chunk]
+    only_stored = [(p, stored[id(p)]) for p in chunk if id(p) in stored]
+    attempts = [mixed] if len(only_stored) == len(chunk) else [mixed, only_stored]
+    for items in attempts:
+        try:
+            messages = await _send(bot, chat_id, items)
+        except TelegramBadRequest as e:
+            logger.info("fallback upload failed for chat %s (%s)", chat_id, e.message)
+            continue
+        return [
+            (p.photo_id, m.photo[-1].file_id, m.photo[-1].file_unique_id)
+            for (p, _), m in zip(items, messages)
+            if p.photo_id is not None and id(p) in stored and m.photo
+        ]
+
+    logger.warning("could not deliver %s photo(s) to chat %s", len(chunk), chat_id)
+    return []
+
+
+async def deliver_photos(bot: Bot, chat_id: int, photos: List[PhotoRef]) -> None:
+    """
+    Альбомы одного чата — по порядку (иначе в чате перемешаются); параллельность —
+    между чатами/хэндлерами, общий темп держит OutboundRateLimiter.
+    """
+    refreshed: List[tuple[uuid.UUID, str, Optional[str]]] = []
+    for start in range(0, len(photos), MEDIA_GROUP_MAX):
+        refreshed += await _send_chunk(bot, chat_id, photos[start:start + MEDIA_GROUP_MAX])
+
+    if refreshed:
+        async with SessionMaker() as session:
+            await MealRepo(session).update_photo_file_ids(refreshed)
+            await session.commit()
@@ -1,25 +1,46 @@
 from __future__ import annotations
 
-import os
+import asyncio
 import uuid
-from dataclasses import dataclass
+import weakref
+from dataclasses import asdict, dataclass
 from datetime import date
-from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator
 
 import aiofiles
 from aiogram import Bot
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
 from aiogram.types import PhotoSize
 
-from app.config import settings
+from app.db.repo_meals import DraftPhoto
+from app.storage.registry import get_storage
+
+
+CHUNK_SIZE = 64 * 1024
+
+# чат/пользователь -> lock на список draft_photos в FSM (фото альбома обрабатываются параллельно)
+_draft_photo_locks: "weakref.WeakValueDictionary[StorageKey, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
 @dataclass(frozen=True)
 class SavedPhoto:
-    local_path: str
+    storage_uri: str
+
 
+async def _telegram_file_chunks(bot: Bot, file_path: str) -> AsyncIterator[bytes]:
+    if bot.session.api.is_local:
+        # локальный Bot API server отдаёт путь на своём диске
+        async with aiofiles.open(file_path, "rb") as f:
+            while chunk := await f.read(CHUNK_SIZE):
+                yield chunk
+        return
+    url = bot.session.api.file_url(bot.token, file_path)
+    async for chunk in bot.session.stream_content(url=url, chunk_size=CHUNK_SIZE):
+        yield chunk
 
-async def save_telegram_photo_locally(
+
+async def store_telegram_photo(
     bot: Bot,
     tg_user_id: int,
     day: date,
@@ -27,20 +48,33 @@ async def save_telegram_photo_locally(
     photo: PhotoSize,
 ) -> SavedPhoto:
     """
-    Скачиваем фото в PHOTO_DIR/<tg_user_id>/<YYYY-MM-DD>/<meal_id>/<file_unique_id>.jpg
+    Потоково копируем фото из Telegram в хранилище (settings.storage_backend)
+    под ключом <tg_user_id>/<YYYY-MM-DD>/<meal_id>/<file_unique_id>.jpg
     """
-    base = Path(settings.photo_dir) / str(tg_user_id) / day.isoformat() / str(meal_id)
-    base.mkdir(parents=True, exist_ok=True)
-
     # file_unique_id стабильнее, но на всякий случай fallback
     name = (photo.file_unique_id or photo.file_id).replace("/", "_")
-    filepath = base / f"{name}.jpg"
+    key = f"{tg_user_id}/{day.isoformat()}/{meal_id}/{name}.jpg"
 
     f = await bot.get_file(photo.file_id)
-    # bot.download_file — в aiogram можно получать bytes и писать самим
-    file_bytes = await bot.download_file(f.file_path)
+    uri = await get_storage().put_stream(key, _telegram_file_chunks(bot, f.file_path), content_type="image/jpeg")
+    return SavedPhoto(storage_uri=uri)
 
-    async with aiofiles.open(filepath, "wb") as out:
-        await out.write(file_bytes.read())
 
-    return SavedPhoto(local_path=str(filepath))
+async def append_draft_photo(state: FSMContext, photo: DraftPhoto) -> int:
+    """
+    Добавляет фото в draft_photos черновика и возвращает их число. Чтение и запись списка —
+    под lock на чат: иначе фото альбома перезаписывают друг друга. Фото с уже известным
+    tg_file_unique_id (повтор) не добавляется.
+    """
+    lock = _draft_photo_locks.get(state.key)
+    if lock is None:
+        lock = _draft_photo_locks[state.key] = asyncio.Lock()
+    async with lock:
+        st = await state.get_data()
+        draft_photos = list(st.get("draft_photos", []))
+        if photo.tg_file_unique_id is None or all(
+            ph.get("tg_file_unique_id") != photo.tg_file_unique_id for ph in draft_photos
+        ):
+            draft_photos.append(asdict(photo))
+            await state.update_data(draft_photos=draft_photos)
+        return len(draft_photos)
@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import date, time
 from typing import Iterable, Optional
 
+from app.analytics.meal_timing import MealTiming
 from app.db.models import Meal, MealItem, MealPhoto
 from app.db.repo_meals import MealItemView
 
@@ -36,8 +37,76 @@ def enter_custom_time_text() -> str:
 def enter_items_text(day: date, t: time) -> str:
     return (
         f"День: {day.isoformat()}  Время: {t.strftime('%H:%M')}\n\n"
-        "Напиши, что ел (через запятую).\n"
-        "Пример: макароны, котлеты, салат"
+        "Напиши, что ел (через запятую). Граммы можно указать сразу — тогда их не спросим.\n"
+        "Пример: макароны 150г, котлета 2 шт по 90, салат"
+    )
+
+
+def quick_items_text(items: list[dict]) -> str:
+    lines = ["Уже добавлено:"]
+    for it in items:
+        lines.append(f"• ✅ {it['name']} — {it['grams']:g} г — {it['kcal']:g} ккал")
+    return "\n".join(lines)
+
+
+def frequent_hint_text() -> str:
+    return "⭐ Частые продукты — одно нажатие добавит продукт с обычной порцией."
+
+
+def templates_text(day: date, has_templates: bool) -> str:
+    s = f"День: {day.isoformat()}\n\n"
+    if not has_templates:
+        return s + "Шаблонов пока нет.\nСохрани приём пищи кнопкой «💾 В шаблоны» в его карточке."
+    return s + "Выбери шаблон — приём пищи будет создан с теми же продуктами и граммами."
+
+
+def template_name(meal: Meal, items: list[MealItemView]) -> str:
+    names = ", ".join((it.product_name or it.raw_name) for it in items[:3])
+    if len(items) > 3:
+        names += ", …"
+    name = f"{meal.meal_time.strftime('%H:%M')} · {names}" if names else meal.meal_time.strftime("%H:%M")
+    return name[:60]
+
+
+def edit_meal_text(day: date, t: time, items: list[dict], photos_count: int) -> str:
+    lines = [
+        f"Редактирование: {day.isoformat()} {t.strftime('%H:%M')}",
+        "",
+    ]
+    lines.append(f"Позиций: {len(items)}" if items else "Позиций нет.")
+    lines.append(f"Фото: {photos_count}")
+    lines.append("")
+    lines.append("Нажми на позицию, чтобы изменить продукт, граммы или порядок.")
+    if any(it.get("auto_selected") for it in items):
+        lines.append("✅ auto — продукт выбран автоматически, нажми, чтобы изменить.")
+    lines.append("Изменения применятся по кнопке «Сохранить».")
+    return "\n".join(lines)
+
+
+def items_review_text(items: list[dict]) -> str:
+    lines = ["Проверь продукты:", "", "Нажми на позицию, чтобы изменить продукт, или «Всё верно»."]
+    if any(it.get("auto_selected") for it in items):
+        lines.append("✅ auto — выбрано автоматически по совпадению названия.")
+    if any(not (it.get("product_ref_id") or it.get("user_product_id")) or it.get("grams") is None for it in items):
+        lines.append("❔ и позиции без граммов уточним по одной после «Всё верно».")
+    return "\n".join(lines)
+
+
+def edit_item_text(item: dict) -> str:
+    if (item.get("product_ref_id") or item.get("user_product_id")) and item.get("product_name"):
+        name = f"✅ {item['product_name']} (ввели: {item['raw_name']})"
+    else:
+        name = f"❔ {item['raw_name']}"
+    grams = f"{float(item['grams']):g} г" if item.get("grams") is not None else "—"
+    return f"Позиция {item['position']}: {name}\nГраммы: {grams}"
+
+
+def own_product_text(raw_name: str) -> str:
+    return (
+        f"Свой продукт «{raw_name}»\n\n"
+        "Введи ккал на 100 г (например 250)\n"
+        "или ккал и БЖУ на 100 г через пробел: 250 12 8 30\n\n"
+        "Продукт сохранится у тебя и будет находиться при следующем вводе."
     )
 
 
@@ -69,10 +138,67 @@ def start_intro_text() -> str:
         "• Прикреплять фото к приему пищи\n"
         "• Показывать статистику по дням + сводки по неделе/месяцу\n"
         "• Админ-режим: редактирование справочника продуктов\n\n"
-        "Команда: /menu — открыть меню в любой момент."
+        "Команда: /menu — открыть меню в любой момент.\n"
+        "Быстрая запись: /log 08:30 овсянка 60г, молоко 200г"
     )
 
 
+def quick_log_help_text() -> str:
+    return (
+        "Быстрая запись приёма пищи одним сообщением:\n"
+        "/log 08:30 овсянка 60г, молоко 200г\n\n"
+        "Время можно не писать — возьмём текущее. Продукты, которые не удалось\n"
+        "однозначно определить или без граммов, уточню по одному."
+    )
+
+
+def macros_text(protein_g: float, fat_g: float, carbs_g: float) -> str:
+    """
+    "Б/Ж/У: 80/60/250 г (20/30/50% ккал)" — доли по калориям (4/9/4 ккал на грамм).
+    """
+    grams = f"Б/Ж/У: {protein_g:.0f}/{fat_g:.0f}/{carbs_g:.0f} г"
+    kcal = protein_g * 4 + fat_g * 9 + carbs_g * 4
+    if kcal <= 0:
+        return grams
+    p, f = round(protein_g * 4 / kcal * 100), round(fat_g * 9 / kcal * 100)
+    return f"{grams} ({p}/{f}/{100 - p - f}% ккал)"
+
+
+def _hm(minutes: Optional[int]) -> str:
+    if minutes is None:
+        return "—"
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _duration(minutes: Optional[int]) -> str:
+    if minutes is None:
+        return "—"
+    return f"{minutes // 60} ч {minutes % 60:02d} мин"
+
+
+def meal_timing_text(t: MealTiming) -> str:
+    if t.meals == 0:
+        return "⏱ Режим питания\n\nЗаписей пока нет."
+
+    lines = [
+        "⏱ Режим питания (вся история)",
+        "",
+        f"Приемов: {t.meals}, дней с записями: {t.days}",
+        "Чаще всего ем в: " + (", ".join(f"{h:02d}:00" for h in t.typical_hours) or "—"),
+        f"Медианное время приема: {_hm(t.meal_time_median)}",
+        f"Пищевое окно: медиана {_duration(t.window_median)}, среднее {_duration(t.window_mean)}",
+        f"Ккал поздно вечером/ночью (21:00–05:00): {t.late_kcal_share * 100:.0f}%",
+    ]
+    for title, d in (("Будни", t.weekday), ("Выходные", t.weekend)):
+        if d.days == 0:
+            continue
+        lines.append("")
+        lines.append(f"{title} ({d.days} дн.):")
+        lines.append(f"  в среднем {d.avg_kcal:.0f} ккал, {d.avg_meals:.1f} приема/день")
+        lines.append(f"  первый прием ~{_hm(d.first_meal_median)}, последний ~{_hm(d.last_meal_median)}")
+    return "\n".join(lines)
+
+
 def day_view_text(day: date, meals: Iterable[Meal]) -> str:
     lines = [f"День: {day.isoformat()}", ""]
     meals_list = list(meals)
@@ -100,7 +226,7 @@ def meal_details_text(meal: Meal, items: list[MealItem], photos: list[MealPhoto]
         for it in items:
             grams = f"{float(it.grams):g} г" if it.grams is not None else "—"
             kcal = f"{float(it.kcal_total):g} ккал" if it.kcal_total is not None else "—"
-            mapped = "✅" if it.product_ref_id else "❔"
+            mapped = "✅" if it.product_ref_id or it.user_product_id else "❔"
             lines.append(f"• {mapped} {it.raw_name} — {grams} — {kcal}")
         lines.append("")
     lines.append(f"Фото: {len(photos)}")
@@ -122,7 +248,7 @@ def meal_details_text_view(meal: Meal, items: list[MealItemView], photos: list[M
             grams = f"{it.grams:g} г" if it.grams is not None else "—"
             kcal = f"{it.kcal_total:g} ккал" if it.kcal_total is not None else "—"
 
-            if it.product_ref_id and it.product_name:
+            if (it.product_ref_id or it.user_product_id) and it.product_name:
                 if it.product_name.casefold() == it.raw_name.casefold():
                     name_line = f"✅ {it.product_name}"
                 else:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,10 +11,95 @@ class Settings(BaseSettings):
     bot_token: str
     database_dsn: str
 
+    # хранилище фото: "local" (photo_dir, шардированные каталоги) или "s3" (S3-совместимое, нужен aiobotocore)
+    storage_backend: str = "local"
     photo_dir: str = "./data/photos"
+    storage_max_concurrency: int = 8
+    storage_multipart_part_mb: int = 8
+    storage_presign_seconds: int = 3600
+    # отдавать фото в Telegram ссылкой (presigned URL), а не загрузкой байтов — хранилище должно быть доступно из интернета
+    storage_public_reads: bool = False
+    s3_endpoint_url: str = ""          # MinIO и т.п.; пусто — AWS
+    s3_region: str = "us-east-1"
+    s3_bucket: str = ""
+    s3_prefix: str = "photos/"
+    s3_access_key: str = ""
+    s3_secret_key: str = ""
     default_timezone: str = "Europe/Moscow"
     default_utc_offset_minutes: int = 180
 
+    # кэш ранжированного поиска продуктов (страницы 2..N и возвраты на шаг маппинга)
+    search_cache_ttl_seconds: int = 120
+    search_cache_size: int = 512
+    # факты продукта (имя, ккал/БЖУ на 100 г) по id: сбрасываются при правке в админке,
+    # правки из других процессов (импорт справочника) видны через TTL
+    product_facts_cache_size: int = 20000
+    product_facts_cache_ttl_seconds: int = 3600
+
+    # движок поиска кандидатов: "trgm" (фильтр % + сортировка всех совпадений)
+    # или "knn" (top-K на bucket из GiST-индексов по расстоянию <-> / <<->)
+    search_engine: str = "trgm"
+    search_knn_per_bucket: int = 50
+    # вес полнотекстового (russian) совпадения в гибридном score внутри bucket
+    search_fts_weight: float = 0.4
+
+    # персональная история выбора продуктов (кэш активных пользователей)
+    usage_cache_ttl_seconds: int = 1800
+    usage_cache_users: int = 1000
+    # свои продукты пользователя (весь список в памяти, поиск по нему без запроса к БД)
+    user_products_cache_ttl_seconds: int = 1800
+    user_products_cache_users: int = 1000
+    # авто-выбор: raw_name всегда маппился в один продукт, минимум N раз
+    usage_autoselect_min_count: int = 2
+
+    # авто-выбор по уверенности поиска: лучший кандидат справочника принимается без шага
+    # маппинга, если score >= min_score, отрыв от следующего >= min_gap и bucket <= max_bucket
+    # (0 — exact, 1 — по названию, 2 — по синониму); показывается как "✅ auto" в сводке
+    auto_accept_enabled: bool = True
+    auto_accept_min_score: float = 0.5
+    auto_accept_min_gap: float = 0.25
+    auto_accept_max_bucket: int = 1
+
+    # "⭐ Частые продукты": периодическая агрегация истории meal_items
+    frequent_refresh_seconds: int = 3600
+    frequent_window_days: int = 90
+    frequent_top_n: int = 8
+
+    # уборка "брошенных" черновиков старого flow (приёмы без фото и без граммов в позициях).
+    # Только для приёмов, созданных до orphan_meals_created_before — момента выкладки черновиков
+    # в FSM (ISO, например 2026-10-19T12:00:00+00:00); новые приёмы с такими позициями —
+    # сохранённые пользователем, их не трогаем. Пусто — уборка не запускается.
+    orphan_meals_sweep_seconds: int = 6 * 3600
+    orphan_meals_created_before: Optional[datetime] = None
+
+    # удаление файлов фото из хранилища: очередь photo_delete_queue разбирается пачками
+    photo_gc_seconds: int = 300
+    photo_gc_batch: int = 200
+    photo_gc_max_attempts: int = 10
+    # скан хранилища на файлы без строки в meal_photos: за прогон — photo_orphan_scan_batch объектов;
+    # моложе photo_orphan_min_age_hours не трогаем (фото черновика ещё не сохранено в БД).
+    # "report" — только лог, "delete" — поставить в очередь удаления
+    photo_orphan_scan_seconds: int = 900
+    photo_orphan_scan_batch: int = 2000
+    photo_orphan_min_age_hours: int = 48
+    photo_orphan_action: str = "report"
+
+    # пересчёт ккал позиций после правки продукта в справочнике (батчи по id)
+    kcal_recompute_batch: int = 500
+    kcal_recompute_pause_ms: int = 50
+
+    # исходящие запросы к Bot API (лимиты Telegram): глобально, в личный чат, в группу
+    tg_global_rate_per_sec: float = 25.0
+    tg_chat_rate_per_sec: float = 1.0
+    tg_chat_burst: float = 3.0
+    tg_group_rate_per_min: float = 20.0
+    tg_retry_after_attempts: int = 3
+
+    # графики статистики: "pillow" (лёгкий, по умолчанию) или "matplotlib" (импорт лениво)
+    chart_backend: str = "pillow"
+    # TTF-шрифт с кириллицей для pillow-графиков (пусто — поиск DejaVuSans в системе)
+    chart_font_path: str = ""
+
     # пример: ADMIN_IDS=12345,67890
     admin_ids_raw: str = "6175512444,787641710,555776404"
 
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import logging
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+_AFTER_COMMIT = "after_commit_hooks"
+_AFTER_TRANSACTION = "after_transaction_hooks"
+
+
+def after_commit(session: AsyncSession, fn: Callable[[], object]) -> None:
+    """
+    fn выполнится после успешного коммита транзакции session (при откате — отбрасывается).
+    Для действий, которые должны видеть записанное: фоновые задачи по новым данным.
+    """
+    session.info.setdefault(_AFTER_COMMIT, []).append(fn)
+
+
+def after_transaction(session: AsyncSession, fn: Callable[[], object]) -> None:
+    """
+    fn выполнится по окончании транзакции session — и после коммита, и после отката.
+    Для сброса кэшей: до конца транзакции их мог заполнить конкурентный читатель старыми
+    данными или эта же сессия — ещё не зафиксированными.
+    """
+    session.info.setdefault(_AFTER_TRANSACTION, []).append(fn)
+
+
+def _run(hooks: list[Callable[[], object]]) -> None:
+    for fn in hooks:
+        try:
+            fn()
+        except Exception:
+            logger.exception("after-transaction hook failed")
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    _run(session.info.pop(_AFTER_COMMIT, []) + session.info.pop(_AFTER_TRANSACTION, []))
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    session.info.pop(_AFTER_COMMIT, None)
+    _run(session.info.pop(_AFTER_TRANSACTION, []))
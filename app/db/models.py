@@ -14,10 +14,11 @@ from sqlalchemy import (
     BigInteger,
     UniqueConstraint,
     CheckConstraint,
+    Computed,
     func,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID, CITEXT
+from sqlalchemy.dialects.postgresql import UUID, CITEXT, TSVECTOR
 
 
 SCHEMA = "nutrition_bot"
@@ -79,6 +80,13 @@ class ProductRef(Base):
     fat_100g: Mapped[Optional[float]] = mapped_column(Numeric(8, 2))
     carbs_100g: Mapped[Optional[float]] = mapped_column(Numeric(8, 2))
 
+    # generated column (russian FTS), в ORM только для запросов — не загружаем по умолчанию
+    name_tsv: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('russian'::regconfig, nutrition_bot.fts_normalize(name::text))", persisted=True),
+        deferred=True,
+    )
+
     created_at: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
 
@@ -93,6 +101,11 @@ class ProductSynonym(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
     product_ref_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey(f"{SCHEMA}.products_ref.id", ondelete="CASCADE"), nullable=False)
     synonym: Mapped[str] = mapped_column(CITEXT, nullable=False)
+    synonym_tsv: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('russian'::regconfig, nutrition_bot.fts_normalize(synonym::text))", persisted=True),
+        deferred=True,
+    )
     created_at: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
 
 
@@ -113,10 +126,27 @@ class ProductUser(Base):
         nullable=True,
     )
 
+    kcal_per_100g: Mapped[Optional[float]] = mapped_column(Numeric(8, 2))
+    protein_100g: Mapped[Optional[float]] = mapped_column(Numeric(8, 2))
+    fat_100g: Mapped[Optional[float]] = mapped_column(Numeric(8, 2))
+    carbs_100g: Mapped[Optional[float]] = mapped_column(Numeric(8, 2))
+
     created_at: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
 
 
+class ProductUsage(Base):
+    __tablename__ = "product_usage"
+    __table_args__ = {"schema": SCHEMA}
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey(f"{SCHEMA}.users.id", ondelete="CASCADE"), primary_key=True)
+    raw_name_normalized: Mapped[str] = mapped_column(Text, primary_key=True)
+    product_ref_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey(f"{SCHEMA}.products_ref.id", ondelete="CASCADE"), primary_key=True)
+
+    count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+    last_used: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
+
+
 class Meal(Base):
     __tablename__ = "meals"
     __table_args__ = {"schema": SCHEMA}
@@ -154,6 +184,9 @@ class MealItem(Base):
 
     grams: Mapped[Optional[float]] = mapped_column(Numeric(10, 2))
     kcal_total: Mapped[Optional[float]] = mapped_column(Numeric(12, 2))
+    protein_g: Mapped[Optional[float]] = mapped_column(Numeric(10, 2))
+    fat_g: Mapped[Optional[float]] = mapped_column(Numeric(10, 2))
+    carbs_g: Mapped[Optional[float]] = mapped_column(Numeric(10, 2))
 
     created_at: Mapped[datetime] = mapped_column(server_default=func.now(), nullable=False)
 
@@ -170,7 +203,7 @@ class MealPhoto(Base):
     tg_file_id: Mapped[str] = mapped_column(Text, nullable=False)
     tg_file_unique_id: Mapped[Optional[str]] = mapped_column(Text)
 
-    local_path: Mapped[Optional[str]] = mapped_column(Text)
+    storage_uri: Mapped[Optional[str]] = mapped_column(Text)  # file://… или s3://bucket/key
     mime_type: Mapped[Optional[str]] = mapped_column(Text)
     width: Mapped[Optional[int]] = mapped_column(Integer)
     height: Mapped[Optional[int]] = mapped_column(Integer)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class FrequentProduct:
+    product_id: uuid.UUID
+    name: str
+    usual_grams: float
+    kcal_per_100g: float
+    uses: int
+
+
+# user_id -> top-N частых продуктов (сбрасывается после каждой агрегации)
+_frequent_cache: TTLCache[uuid.UUID, List[FrequentProduct]] = TTLCache(
+    maxsize=settings.usage_cache_users,
+    ttl=settings.frequent_refresh_seconds,
+)
+
+
+def invalidate_frequent_cache() -> None:
+    _frequent_cache.clear()
+
+
+class FrequentRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def refresh_all(self) -> int:
+        """
+        Полный пересчёт user_frequent_products по истории meal_items за окно
+        frequent_window_days: top-N продуктов на пользователя + медиана граммов.
+        Возвращает число записанных строк.
+        """
+        await self.session.execute(text("DELETE FROM nutrition_bot.user_frequent_products"))
+        res = await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.user_frequent_products
+                  (user_id, product_ref_id, rank, uses, usual_grams, last_used_date)
+                SELECT user_id, product_ref_id, rank, uses, usual_grams, last_used_date
+                FROM (
+                  SELECT
+                    agg.*,
+                    row_number() OVER (PARTITION BY agg.user_id ORDER BY agg.uses DESC, agg.last_used_date DESC) AS rank
+                  FROM (
+                    SELECT
+                      m.user_id,
+                      i.product_ref_id,
+                      count(*) AS uses,
+                      percentile_disc(0.5) WITHIN GROUP (ORDER BY i.grams) AS usual_grams,
+                      max(m.meal_date) AS last_used_date
+                    FROM nutrition_bot.meal_items i
+                    JOIN nutrition_bot.meals m ON m.id = i.meal_id
+                    WHERE i.product_ref_id IS NOT NULL
+                      AND i.grams IS NOT NULL
+                      AND m.meal_date >= current_date - CAST(:window_days AS integer)
+                    GROUP BY m.user_id, i.product_ref_id
+                  ) AS agg
+                ) AS ranked
+                WHERE rank <= :top_n
+                """
+            ),
+            {"window_days": settings.frequent_window_days, "top_n": settings.frequent_top_n},
+        )
+        return int(res.rowcount or 0)
+
+    async def list_for_user(self, user_id: uuid.UUID) -> List[FrequentProduct]:
+        cached = _frequent_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT f.product_ref_id, p.name, f.usual_grams, p.kcal_per_100g, f.uses
+                    FROM nutrition_bot.user_frequent_products f
+                    JOIN nutrition_bot.products_ref p ON p.id = f.product_ref_id
+                    WHERE f.user_id = :user_id
+                    ORDER BY f.rank ASC
+                    """
+                ),
+                {"user_id": user_id},
+            )
+        ).all()
+        result = [
+            FrequentProduct(
+                product_id=r.product_ref_id,
+                name=str(r.name),
+                usual_grams=float(r.usual_grams),
+                kcal_per_100g=float(r.kcal_per_100g),
+                uses=int(r.uses),
+            )
+            for r in rows
+        ]
+        _frequent_cache.set(user_id, result)
+        return result
@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import uuid
 from dataclasses import dataclass
-from datetime import date, time, timedelta
-from typing import Dict, List, Optional
+from datetime import date, datetime, time
+from typing import Dict, Iterable, List, Optional
 
-from sqlalchemy import select, delete, and_, text, func, outerjoin
+from sqlalchemy import select, insert, update, delete, and_, text, func, outerjoin
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Meal, MealItem, MealPhoto, ProductRef
+from app.db.models import Meal, MealItem, MealPhoto, ProductRef, ProductUser
+from app.db.repo_usage import UsageRepo
 
 
 @dataclass(frozen=True)
@@ -16,6 +18,9 @@ class DayMark:
     meals_count: int
     photos_count: int
     kcal_total: float
+    protein_g: float = 0.0
+    fat_g: float = 0.0
+    carbs_g: float = 0.0
 
 
 @dataclass(frozen=True)
@@ -27,20 +32,430 @@ class MealItemView:
     kcal_total: float | None
     product_ref_id: uuid.UUID | None
     product_name: str | None
+    user_product_id: uuid.UUID | None = None
+
+
+@dataclass(frozen=True)
+class DraftItem:
+    """
+    Позиция черновика приёма пищи (черновик живёт в FSM до сохранения).
+    record_usage — продукт выбран пользователем вручную (учитываем в истории выбора).
+    user_product_id — вместо продукта справочника выбран свой продукт пользователя (products_user).
+    """
+    id: str
+    position: int
+    raw_name: str
+    product_ref_id: Optional[str] = None
+    user_product_id: Optional[str] = None
+    grams: Optional[float] = None
+    record_usage: bool = False
+    # только для отображения (в БД не пишется)
+    product_name: Optional[str] = None
+    auto_selected: bool = False     # продукт выбран авто-выбором по уверенности поиска
+
+
+@dataclass(frozen=True)
+class DraftPhoto:
+    tg_file_id: str
+    tg_file_unique_id: Optional[str]
+    storage_uri: Optional[str]
+    mime_type: Optional[str]
+    width: Optional[int]
+    height: Optional[int]
+    file_size_bytes: Optional[int]
 
 
 class MealRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create_meal(self, user_id: uuid.UUID, meal_date: date, meal_time: time, note: Optional[str] = None) -> Meal:
-        meal = Meal(user_id=user_id, meal_date=meal_date, meal_time=meal_time, note=note)
-        self.session.add(meal)
-        await self.session.flush()
-        return meal
+    async def save_draft(
+        self,
+        meal_id: uuid.UUID,
+        *,
+        user_id: uuid.UUID,
+        meal_date: date,
+        meal_time: time,
+        note: Optional[str],
+        items: List[DraftItem],
+        photos: List[DraftPhoto],
+    ) -> bool:
+        """
+        Сохраняет черновик целиком в текущей транзакции: приём пищи, позиции одним
+        INSERT ... SELECT FROM unnest (ккал и БЖУ считаются в SQL), фото одним multi-VALUES,
+        история выбора продуктов и дневной rollup.
+        Возвращает False, если приём с meal_id уже сохранён (повторное нажатие «Готово»).
+        """
+        created = (
+            await self.session.execute(
+                pg_insert(Meal)
+                .values(id=meal_id, user_id=user_id, meal_date=meal_date, meal_time=meal_time, note=note)
+                .on_conflict_do_nothing(index_elements=[Meal.id])
+                .returning(Meal.id)
+            )
+        ).scalar_one_or_none()
+        if created is None:
+            return False
+
+        await self._insert_items(meal_id, items, user_id=user_id)
+        await self._insert_photos(meal_id, photos)
+
+        picks = [(it.raw_name, uuid.UUID(it.product_ref_id)) for it in items if it.record_usage and it.product_ref_id]
+        if picks:
+            await UsageRepo(self.session).record_many(user_id=user_id, picks=picks)
+
+        await self.refresh_day_stats(user_id, [meal_date])
+        return True
+
+    async def apply_edit(
+        self,
+        meal_id: uuid.UUID,
+        *,
+        user_id: uuid.UUID,
+        meal_time: time,
+        items: List[DraftItem],
+        removed_photo_ids: List[uuid.UUID],
+        new_photos: List[DraftPhoto],
+    ) -> bool:
+        """
+        Применяет правку приёма пищи как diff к текущему состоянию в БД:
+        UPDATE только изменённых позиций (одним UPDATE ... FROM unnest), INSERT новых,
+        DELETE убранных; оставшиеся фото не трогаются. Всё — в текущей транзакции.
+        Возвращает False, если приём не найден / чужой.
+        """
+        meal = (
+            await self.session.execute(
+                select(Meal.meal_date, Meal.meal_time).where(and_(Meal.id == meal_id, Meal.user_id == user_id))
+            )
+        ).first()
+        if meal is None:
+            return False
+
+        if meal.meal_time != meal_time:
+            await self.session.execute(update(Meal).where(Meal.id == meal_id).values(meal_time=meal_time))
+
+        current = {
+            str(r.id): r
+            for r in (
+                await self.session.execute(
+                    select(
+                        MealItem.id,
+                        MealItem.position,
+                        MealItem.raw_name,
+                        MealItem.product_ref_id,
+                        MealItem.user_product_id,
+                        MealItem.grams,
+                    )
+                    .where(MealItem.meal_id == meal_id)
+                )
+            ).all()
+        }
+
+        def _changed(it: DraftItem) -> bool:
+            r = current[it.id]
+            return (
+                r.position != it.position
+                or r.raw_name != it.raw_name
+                or (str(r.product_ref_id) if r.product_ref_id else None) != it.product_ref_id
+                or (str(r.user_product_id) if r.user_product_id else None) != it.user_product_id
+                or (round(float(r.grams), 2) if r.grams is not None else None)
+                != (round(float(it.grams), 2) if it.grams is not None else None)
+            )
+
+        keep_ids = {it.id for it in items}
+        removed = [uuid.UUID(i) for i in current if i not in keep_ids]
+        added = [it for it in items if it.id not in current]
+        changed = [it for it in items if it.id in current and _changed(it)]
+
+        if removed:
+            await self.session.execute(delete(MealItem).where(MealItem.id.in_(removed)))
+
+        if changed:
+            await self.session.execute(
+                text(
+                    """
+                    UPDATE nutrition_bot.meal_items AS i
+                    SET position = x.position,
+                        raw_name = x.raw_name,
+                        product_ref_id = p.id,
+                        user_product_id = up.id,
+                        grams = x.grams,
+                        kcal_total = round(x.grams * coalesce(p.kcal_per_100g, up.kcal_per_100g) / 100, 2),
+                        protein_g = round(x.grams * coalesce(p.protein_100g, up.protein_100g) / 100, 2),
+                        fat_g = round(x.grams * coalesce(p.fat_100g, up.fat_100g) / 100, 2),
+                        carbs_g = round(x.grams * coalesce(p.carbs_100g, up.carbs_100g) / 100, 2)
+                    FROM unnest(
+                      CAST(:ids AS uuid[]),
+                      CAST(:positions AS integer[]),
+                      CAST(:raw_names AS text[]),
+                      CAST(:product_ids AS uuid[]),
+                      CAST(:user_product_ids AS uuid[]),
+                      CAST(:grams AS numeric[])
+                    ) AS x(id, position, raw_name, product_ref_id, user_product_id, grams)
+                    LEFT JOIN nutrition_bot.products_ref p ON p.id = x.product_ref_id
+                    LEFT JOIN nutrition_bot.products_user up
+                      ON up.id = x.user_product_id AND up.user_id = :user_id AND x.product_ref_id IS NULL
+                    WHERE i.id = x.id AND i.meal_id = :meal_id
+                    """
+                ),
+                {"meal_id": meal_id, "user_id": user_id, **self._items_params(changed)},
+            )
+
+        await self._insert_items(meal_id, added, user_id=user_id)
+
+        if removed_photo_ids:
+            await self.session.execute(
+                delete(MealPhoto).where(and_(MealPhoto.meal_id == meal_id, MealPhoto.id.in_(removed_photo_ids)))
+            )
+        await self._insert_photos(meal_id, new_photos)
+
+        picks = [
+            (it.raw_name, uuid.UUID(it.product_ref_id))
+            for it in added + changed
+            if it.record_usage and it.product_ref_id
+        ]
+        if picks:
+            await UsageRepo(self.session).record_many(user_id=user_id, picks=picks)
+
+        await self.refresh_day_stats(user_id, [meal.meal_date])
+        return True
+
+    @staticmethod
+    def _items_params(items: List[DraftItem]) -> dict:
+        return {
+            "ids": [uuid.UUID(it.id) for it in items],
+            "positions": [it.position for it in items],
+            "raw_names": [it.raw_name for it in items],
+            "product_ids": [uuid.UUID(it.product_ref_id) if it.product_ref_id else None for it in items],
+            "user_product_ids": [uuid.UUID(it.user_product_id) if it.user_product_id else None for it in items],
+            "grams": [it.grams for it in items],
+        }
+
+    async def _insert_items(self, meal_id: uuid.UUID, items: List[DraftItem], *, user_id: uuid.UUID) -> None:
+        """
+        Пищевая ценность — из справочника или из своего продукта пользователя
+        (чужой user_product_id не привяжется: join только по продуктам user_id).
+        """
+        if not items:
+            return
+        await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.meal_items
+                  (id, meal_id, position, raw_name, product_ref_id, user_product_id, grams,
+                   kcal_total, protein_g, fat_g, carbs_g)
+                SELECT
+                  x.id, :meal_id, x.position, x.raw_name, p.id, up.id, x.grams,
+                  round(x.grams * coalesce(p.kcal_per_100g, up.kcal_per_100g) / 100, 2),
+                  round(x.grams * coalesce(p.protein_100g, up.protein_100g) / 100, 2),
+                  round(x.grams * coalesce(p.fat_100g, up.fat_100g) / 100, 2),
+                  round(x.grams * coalesce(p.carbs_100g, up.carbs_100g) / 100, 2)
+                FROM unnest(
+                  CAST(:ids AS uuid[]),
+                  CAST(:positions AS integer[]),
+                  CAST(:raw_names AS text[]),
+                  CAST(:product_ids AS uuid[]),
+                  CAST(:user_product_ids AS uuid[]),
+                  CAST(:grams AS numeric[])
+                ) AS x(id, position, raw_name, product_ref_id, user_product_id, grams)
+                LEFT JOIN nutrition_bot.products_ref p ON p.id = x.product_ref_id
+                LEFT JOIN nutrition_bot.products_user up
+                  ON up.id = x.user_product_id AND up.user_id = :user_id AND x.product_ref_id IS NULL
+                """
+            ),
+            {"meal_id": meal_id, "user_id": user_id, **self._items_params(items)},
+        )
+
+    async def _insert_photos(self, meal_id: uuid.UUID, photos: List[DraftPhoto]) -> None:
+        if not photos:
+            return
+        await self.session.execute(
+            insert(MealPhoto).values(
+                [
+                    dict(
+                        meal_id=meal_id,
+                        tg_file_id=ph.tg_file_id,
+                        tg_file_unique_id=ph.tg_file_unique_id,
+                        storage_uri=ph.storage_uri,
+                        mime_type=ph.mime_type,
+                        width=ph.width,
+                        height=ph.height,
+                        file_size_bytes=ph.file_size_bytes,
+                    )
+                    for ph in photos
+                ]
+            )
+        )
+
+    async def recompute_kcal_batch(
+        self,
+        product_id: uuid.UUID,
+        *,
+        after_id: Optional[uuid.UUID],
+        limit: int,
+    ) -> tuple[Optional[uuid.UUID], int, int]:
+        """
+        Один шаг пересчёта ккал и БЖУ позиций продукта: следующие limit позиций по id (keyset),
+        UPDATE только тех, где значение изменилось, и пересчёт rollup затронутых дней.
+        Возвращает (последний id батча или None, если позиций больше нет; просмотрено; обновлено).
+        """
+        cond = MealItem.product_ref_id == product_id
+        if after_id is not None:
+            cond = and_(cond, MealItem.id > after_id)
+        ids = list(
+            (
+                await self.session.execute(
+                    select(MealItem.id)
+                    .where(cond)
+                    .order_by(MealItem.id.asc())
+                    .limit(limit)
+                )
+            ).scalars().all()
+        )
+        if not ids:
+            return None, 0, 0
+
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    WITH upd AS (
+                      UPDATE nutrition_bot.meal_items AS i
+                      SET kcal_total = round(i.grams * p.kcal_per_100g / 100, 2),
+                          protein_g = round(i.grams * p.protein_100g / 100, 2),
+                          fat_g = round(i.grams * p.fat_100g / 100, 2),
+                          carbs_g = round(i.grams * p.carbs_100g / 100, 2)
+                      FROM nutrition_bot.products_ref p
+                      WHERE i.id = ANY (CAST(:ids AS uuid[]))
+                        AND p.id = i.product_ref_id
+                        AND (i.kcal_total, i.protein_g, i.fat_g, i.carbs_g) IS DISTINCT FROM (
+                          round(i.grams * p.kcal_per_100g / 100, 2),
+                          round(i.grams * p.protein_100g / 100, 2),
+                          round(i.grams * p.fat_100g / 100, 2),
+                          round(i.grams * p.carbs_100g / 100, 2)
+                        )
+                      RETURNING i.meal_id
+                    )
+                    SELECT m.user_id, array_agg(DISTINCT m.meal_date) AS days, count(*) AS cnt
+                    FROM upd
+                    JOIN nutrition_bot.meals m ON m.id = upd.meal_id
+                    GROUP BY m.user_id
+                    """
+                ),
+                {"ids": ids},
+            )
+        ).all()
+
+        updated = 0
+        for r in rows:
+            await self.refresh_day_stats(r.user_id, r.days)
+            updated += int(r.cnt)
+        return ids[-1], len(ids), updated
+
+    async def delete_orphan_meals(self, *, created_before: datetime) -> int:
+        """
+        Удаляет "брошенные" черновики старого flow: приёмы без фото, у которых ни одной
+        позиции не дошли граммы (включая приёмы без позиций). created_before — фиксированная
+        граница (выкладка черновиков в FSM), не скользящая: новые приёмы без граммов — настоящие.
+        Rollup затронутых дней пересчитывается.
+        """
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    WITH deleted AS (
+                      DELETE FROM nutrition_bot.meals m
+                      WHERE m.created_at < :created_before
+                        AND NOT EXISTS (
+                          SELECT 1 FROM nutrition_bot.meal_items i WHERE i.meal_id = m.id AND i.grams IS NOT NULL
+                        )
+                        AND NOT EXISTS (SELECT 1 FROM nutrition_bot.meal_photos p WHERE p.meal_id = m.id)
+                      RETURNING m.user_id, m.meal_date
+                    )
+                    SELECT user_id, array_agg(DISTINCT meal_date) AS days, count(*) AS cnt
+                    FROM deleted
+                    GROUP BY user_id
+                    """
+                ),
+                {"created_before": created_before},
+            )
+        ).all()
+
+        total = 0
+        for r in rows:
+            await self.refresh_day_stats(r.user_id, r.days)
+            total += int(r.cnt)
+        return total
 
     async def delete_meal(self, meal_id: uuid.UUID) -> None:
-        await self.session.execute(delete(Meal).where(Meal.id == meal_id))
+        row = (
+            await self.session.execute(
+                delete(Meal).where(Meal.id == meal_id).returning(Meal.user_id, Meal.meal_date)
+            )
+        ).first()
+        if row is not None:
+            await self.refresh_day_stats(row.user_id, [row.meal_date])
+
+    async def refresh_day_stats(self, user_id: uuid.UUID, days: Iterable[date]) -> None:
+        """
+        Пересчёт дневного rollup (nutrition_bot.day_stats) в текущей транзакции.
+        """
+        day_list = sorted(set(days))
+        if not day_list:
+            return
+        await self.session.execute(
+            text("SELECT nutrition_bot.refresh_day_stats(:user_id, CAST(:days AS date[]))"),
+            {"user_id": user_id, "days": day_list},
+        )
+
+    async def clone_meal(
+        self,
+        src_meal_id: uuid.UUID,
+        *,
+        user_id: uuid.UUID,
+        meal_date: date,
+        meal_time: time,
+    ) -> Optional[uuid.UUID]:
+        """
+        Копия приёма пищи (позиции с продуктами и граммами, без фото) на другую дату/время.
+        Один INSERT ... SELECT: ккал и БЖУ пересчитываются в SQL по текущему справочнику.
+        Возвращает id нового приёма или None, если исходный не найден / чужой.
+        """
+        new_id = (
+            await self.session.execute(
+                text(
+                    """
+                    WITH new_meal AS (
+                      INSERT INTO nutrition_bot.meals (user_id, meal_date, meal_time, note)
+                      SELECT m.user_id, :meal_date, :meal_time, m.note
+                      FROM nutrition_bot.meals m
+                      WHERE m.id = :src_id AND m.user_id = :user_id
+                      RETURNING id
+                    ), new_items AS (
+                      INSERT INTO nutrition_bot.meal_items
+                        (meal_id, position, raw_name, product_ref_id, user_product_id, grams,
+                         kcal_total, protein_g, fat_g, carbs_g)
+                      SELECT
+                        nm.id, i.position, i.raw_name, i.product_ref_id, i.user_product_id, i.grams,
+                        round(i.grams * coalesce(p.kcal_per_100g, up.kcal_per_100g) / 100, 2),
+                        round(i.grams * coalesce(p.protein_100g, up.protein_100g) / 100, 2),
+                        round(i.grams * coalesce(p.fat_100g, up.fat_100g) / 100, 2),
+                        round(i.grams * coalesce(p.carbs_100g, up.carbs_100g) / 100, 2)
+                      FROM new_meal nm
+                      CROSS JOIN nutrition_bot.meal_items i
+                      LEFT JOIN nutrition_bot.products_ref p ON p.id = i.product_ref_id
+                      LEFT JOIN nutrition_bot.products_user up ON up.id = i.user_product_id
+                      WHERE i.meal_id = :src_id
+                    )
+                    SELECT id FROM new_meal
+                    """
+                ),
+                {"src_id": src_meal_id, "user_id": user_id, "meal_date": meal_date, "meal_time": meal_time},
+            )
+        ).scalar_one_or_none()
+        if new_id is not None:
+            await self.refresh_day_stats(user_id, [meal_date])
+        return new_id
 
     async def get_meal(self, meal_id: uuid.UUID) -> Optional[Meal]:
         q = select(Meal).where(Meal.id == meal_id)
@@ -54,24 +469,13 @@ class MealRepo:
         )
         return list((await self.session.execute(q)).scalars().all())
 
-    async def create_items_for_meal(self, meal_id: uuid.UUID, raw_items: list[str]) -> List[MealItem]:
-        items: list[MealItem] = []
-        for idx, raw in enumerate(raw_items, start=1):
-            item = MealItem(meal_id=meal_id, position=idx, raw_name=raw)
-            self.session.add(item)
-            items.append(item)
-        await self.session.flush()
-        return items
-
-    async def list_items(self, meal_id: uuid.UUID) -> List[MealItem]:
-        q = select(MealItem).where(MealItem.meal_id == meal_id).order_by(MealItem.position.asc())
-        return list((await self.session.execute(q)).scalars().all())
-    
     async def list_items_view(self, meal_id: uuid.UUID) -> list[MealItemView]:
         """
-        Возвращает позиции приёма пищи + имя продукта из справочника (если выбрано).
+        Возвращает позиции приёма пищи + имя продукта из справочника или своего продукта (если выбрано).
         """
-        j = outerjoin(MealItem, ProductRef, MealItem.product_ref_id == ProductRef.id)
+        j = outerjoin(MealItem, ProductRef, MealItem.product_ref_id == ProductRef.id).outerjoin(
+            ProductUser, MealItem.user_product_id == ProductUser.id
+        )
         q = (
             select(
                 MealItem.id,
@@ -80,7 +484,8 @@ class MealRepo:
                 MealItem.grams,
                 MealItem.kcal_total,
                 MealItem.product_ref_id,
-                ProductRef.name.label("product_name"),
+                MealItem.user_product_id,
+                func.coalesce(ProductRef.name, ProductUser.name).label("product_name"),
             )
             .select_from(j)
             .where(MealItem.meal_id == meal_id)
@@ -96,72 +501,48 @@ class MealRepo:
                 kcal_total=float(r.kcal_total) if r.kcal_total is not None else None,
                 product_ref_id=r.product_ref_id,
                 product_name=str(r.product_name) if r.product_name is not None else None,
+                user_product_id=r.user_product_id,
             )
             for r in rows
         ]
 
-    async def get_item(self, item_id: uuid.UUID) -> Optional[MealItem]:
-        q = select(MealItem).where(MealItem.id == item_id)
-        return (await self.session.execute(q)).scalars().first()
-
-    async def set_item_product(self, item_id: uuid.UUID, product_ref_id: Optional[uuid.UUID]) -> None:
-        item = await self.get_item(item_id)
-        if item is None:
-            raise ValueError(f"MealItem not found: {item_id}")
-        item.product_ref_id = product_ref_id
-        item.user_product_id = None
-
-    async def set_item_grams_and_kcal(self, item_id: uuid.UUID, grams: float) -> None:
-        item = await self.get_item(item_id)
-        if item is None:
-            return
-        item.grams = grams
-
-        kcal_total = None
-        if item.product_ref_id is not None:
-            prod = (await self.session.execute(select(ProductRef).where(ProductRef.id == item.product_ref_id))).scalars().first()
-            if prod is not None:
-                kcal_total = float(prod.kcal_per_100g) * float(grams) / 100.0
-
-        item.kcal_total = kcal_total
-
-    async def add_photo(
-        self,
-        meal_id: uuid.UUID,
-        tg_file_id: str,
-        tg_file_unique_id: Optional[str],
-        local_path: Optional[str],
-        mime_type: Optional[str],
-        width: Optional[int],
-        height: Optional[int],
-        file_size_bytes: Optional[int],
-    ) -> MealPhoto:
-        ph = MealPhoto(
-            meal_id=meal_id,
-            tg_file_id=tg_file_id,
-            tg_file_unique_id=tg_file_unique_id,
-            local_path=local_path,
-            mime_type=mime_type,
-            width=width,
-            height=height,
-            file_size_bytes=file_size_bytes,
-        )
-        self.session.add(ph)
-        await self.session.flush()
-        return ph
-
     async def list_photos(self, meal_id: uuid.UUID) -> List[MealPhoto]:
         q = select(MealPhoto).where(MealPhoto.meal_id == meal_id).order_by(MealPhoto.created_at.asc())
         return list((await self.session.execute(q)).scalars().all())
 
+    async def update_photo_file_ids(self, rows: List[tuple[uuid.UUID, str, Optional[str]]]) -> None:
+        """
+        Обновление tg_file_id после перезаливки фото из локального хранилища.
+        rows: (photo_id, tg_file_id, tg_file_unique_id).
+        """
+        if not rows:
+            return
+        await self.session.execute(
+            text(
+                """
+                UPDATE nutrition_bot.meal_photos p
+                SET tg_file_id = v.file_id,
+                    tg_file_unique_id = COALESCE(v.file_unique_id, p.tg_file_unique_id)
+                FROM unnest(CAST(:ids AS uuid[]), CAST(:file_ids AS text[]), CAST(:unique_ids AS text[]))
+                  AS v(id, file_id, file_unique_id)
+                WHERE p.id = v.id
+                """
+            ),
+            {
+                "ids": [r[0] for r in rows],
+                "file_ids": [r[1] for r in rows],
+                "unique_ids": [r[2] for r in rows],
+            },
+        )
+
     async def month_marks(self, user_id: uuid.UUID, start: date, end: date) -> Dict[date, DayMark]:
         """
-        Берем агрегаты из nutrition_bot.v_day_stats (view создан в SQL).
+        Берем агрегаты из дневного rollup nutrition_bot.day_stats.
         """
         q = text(
             """
-            SELECT meal_date, meals_count, kcal_total, photos_count
-            FROM nutrition_bot.v_day_stats
+            SELECT meal_date, meals_count, kcal_total, photos_count, protein_g, fat_g, carbs_g
+            FROM nutrition_bot.day_stats
             WHERE user_id = :user_id
               AND meal_date >= :start_date
               AND meal_date <= :end_date
@@ -175,38 +556,8 @@ class MealRepo:
                 meals_count=int(r.meals_count or 0),
                 photos_count=int(r.photos_count or 0),
                 kcal_total=float(r.kcal_total or 0.0),
+                protein_g=float(r.protein_g or 0.0),
+                fat_g=float(r.fat_g or 0.0),
+                carbs_g=float(r.carbs_g or 0.0),
             )
         return result
-    
-    async def range_summary(self, user_id: uuid.UUID, start: date, end: date) -> tuple[list[date], list[float], float, int, int]:
-        """
-        Возвращает:
-        - dates (все дни диапазона)
-        - kcal_values по дням (0 если нет)
-        - total_kcal
-        - total_meals
-        - total_photos
-        """
-        marks = await self.month_marks(user_id, start, end)
-
-        days = []
-        kcal_vals = []
-        total_kcal = 0.0
-        total_meals = 0
-        total_photos = 0
-
-        d = start
-        while d <= end:
-            days.append(d)
-            m = marks.get(d)
-            kcal = float(m.kcal_total) if m else 0.0
-            meals = int(m.meals_count) if m else 0
-            photos = int(m.photos_count) if m else 0
-
-            kcal_vals.append(kcal)
-            total_kcal += kcal
-            total_meals += meals
-            total_photos += photos
-            d += timedelta(days=1)
-
-        return days, kcal_vals, total_kcal, total_meals, total_photos
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass(frozen=True)
+class QueuedPhoto:
+    id: int
+    storage_uri: str
+    referenced: bool      # на объект снова ссылается meal_photos (фото добавили заново) — не удаляем
+
+
+class PhotoGcRepo:
+    """
+    Очередь удаления файлов фото (photo_delete_queue) и состояние orphan-скана хранилища.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def claim_batch(self, *, limit: int, max_attempts: int) -> List[QueuedPhoto]:
+        """
+        Пачка из очереди под FOR UPDATE SKIP LOCKED: несколько процессов бота разбирают
+        очередь параллельно, не мешая друг другу. Блокировка держится до commit.
+        """
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT
+                      q.id,
+                      q.storage_uri,
+                      EXISTS (
+                        SELECT 1 FROM nutrition_bot.meal_photos p WHERE p.storage_uri = q.storage_uri
+                      ) AS referenced
+                    FROM nutrition_bot.photo_delete_queue q
+                    WHERE q.attempts < :max_attempts
+                    ORDER BY q.id
+                    LIMIT :limit
+                    FOR UPDATE OF q SKIP LOCKED
+                    """
+                ),
+                {"limit": limit, "max_attempts": max_attempts},
+            )
+        ).all()
+        return [QueuedPhoto(id=r.id, storage_uri=r.storage_uri, referenced=r.referenced) for r in rows]
+
+    async def finish_batch(self, done_ids: List[int], failed: List[tuple[int, str]]) -> None:
+        """
+        Удалённые (и пропущенные) — из очереди; неудачные остаются с attempts + 1 и текстом ошибки.
+        """
+        if done_ids:
+            await self.session.execute(
+                text("DELETE FROM nutrition_bot.photo_delete_queue WHERE id = ANY(CAST(:ids AS bigint[]))"),
+                {"ids": done_ids},
+            )
+        if failed:
+            await self.session.execute(
+                text(
+                    """
+                    UPDATE nutrition_bot.photo_delete_queue q
+                    SET attempts = q.attempts + 1,
+                        last_error = f.err
+                    FROM unnest(CAST(:ids AS bigint[]), CAST(:errs AS text[])) AS f(id, err)
+                    WHERE q.id = f.id
+                    """
+                ),
+                {"ids": [f[0] for f in failed], "errs": [f[1] for f in failed]},
+            )
+
+    async def unreferenced_uris(self, uris: List[str]) -> Set[str]:
+        """
+        URI из списка, на которые нет строки в meal_photos и которые ещё не стоят в очереди.
+        """
+        if not uris:
+            return set()
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT u.uri
+                    FROM unnest(CAST(:uris AS text[])) AS u(uri)
+                    WHERE NOT EXISTS (SELECT 1 FROM nutrition_bot.meal_photos p WHERE p.storage_uri = u.uri)
+                      AND NOT EXISTS (SELECT 1 FROM nutrition_bot.photo_delete_queue q WHERE q.storage_uri = u.uri)
+                    """
+                ),
+                {"uris": uris},
+            )
+        ).all()
+        return {r.uri for r in rows}
+
+    async def enqueue(self, uris: List[str]) -> None:
+        if not uris:
+            return
+        await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.photo_delete_queue (storage_uri)
+                SELECT u FROM unnest(CAST(:uris AS text[])) AS u
+                """
+            ),
+            {"uris": uris},
+        )
+
+    async def get_scan_cursor(self, scheme: str) -> Optional[str]:
+        return (
+            await self.session.execute(
+                text("SELECT cursor FROM nutrition_bot.photo_scan_state WHERE scheme = :scheme"),
+                {"scheme": scheme},
+            )
+        ).scalar_one_or_none()
+
+    async def set_scan_cursor(self, scheme: str, cursor: Optional[str]) -> None:
+        await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.photo_scan_state (scheme, cursor, updated_at)
+                VALUES (:scheme, :cursor, now())
+                ON CONFLICT (scheme) DO UPDATE
+                  SET cursor = excluded.cursor,
+                      updated_at = excluded.updated_at
+                """
+            ),
+            {"scheme": scheme, "cursor": cursor},
+        )
@@ -2,14 +2,113 @@ from __future__ import annotations
 
 import uuid
 from dataclasses import dataclass
-from typing import List, Optional, Sequence
+from typing import List, Mapping, Optional, Sequence
 
-from sqlalchemy import select, func, literal, union_all, delete
+from sqlalchemy import Float, Select, case, select, func, literal, literal_column, or_, union_all, delete, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.db.cache import TTLCache
+from app.db.hooks import after_transaction
 from app.db.models import ProductRef, ProductSynonym
 
 
+# сколько кандидатов одного запроса держим в кэше (10 страниц по 10)
+RANKED_PREFETCH = 100
+
+# normalized query -> (кандидаты, total)
+_ranked_cache: TTLCache[str, tuple[tuple["RankedCandidate", ...], int]] = TTLCache(
+    maxsize=settings.search_cache_size,
+    ttl=settings.search_cache_ttl_seconds,
+)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Нормализация пользовательского ввода для поиска и ключей кэша:
+    схлопываем пробелы и приводим регистр (citext/pg_trgm регистр всё равно не учитывают).
+    """
+    return " ".join((text or "").split()).casefold()
+
+
+def similarity_threshold(q: str) -> float:
+    """
+    Адаптивный порог pg_trgm: у коротких запросов мало триграмм, и одна случайная
+    общая триграмма даёт большой similarity — поэтому порог выше. У длинных
+    названий similarity естественно ниже — порог мягче.
+    """
+    n = len(q)
+    if n <= 3:
+        return 0.5
+    if n <= 6:
+        return 0.4
+    if n <= 12:
+        return 0.3
+    return 0.25
+
+
+def _fts_query(q: str):
+    """
+    tsquery для русского полнотекстового поиска; нормализация та же, что у
+    generated-колонок name_tsv/synonym_tsv (unaccent + ё→е).
+    """
+    return func.plainto_tsquery(literal_column("'russian'::regconfig"), func.nutrition_bot.fts_normalize(q))
+
+
+def _hybrid_score(similarity_expr, tsv_col, tsq):
+    """
+    Гибридный score внутри bucket: триграммная похожесть + бонус за совпадение
+    по словоформам (FTS ловит "котлеты" ↔ "котлета", которых триграммы ранжируют низко).
+    """
+    w = float(settings.search_fts_weight)
+    fts_hit = case((tsv_col.op("@@")(tsq), 1.0), else_=0.0)
+    return (1.0 - w) * similarity_expr + w * fts_hit
+
+
+@dataclass(frozen=True)
+class ProductFacts:
+    product_id: uuid.UUID
+    name: str
+    kcal_per_100g: float
+    protein_100g: Optional[float]
+    fat_100g: Optional[float]
+    carbs_100g: Optional[float]
+
+
+# product_ref_id -> факты; читается на каждом шаге ввода (имя выбранного, ккал на 100 г)
+_facts_cache: TTLCache[uuid.UUID, ProductFacts] = TTLCache(
+    maxsize=settings.product_facts_cache_size,
+    ttl=settings.product_facts_cache_ttl_seconds,
+)
+
+
+def invalidate_product_facts(product_id: Optional[uuid.UUID] = None) -> None:
+    if product_id is None:
+        _facts_cache.clear()
+    else:
+        _facts_cache.pop(product_id)
+
+
+def _clean_synonyms(synonyms: Sequence[str]) -> list[str]:
+    # без пустых и повторов (без учёта регистра, как citext); порядок ввода сохраняется
+    cleaned = []
+    seen = set()
+    for s in synonyms:
+        ss = s.strip()
+        if not ss:
+            continue
+        key = ss.casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        cleaned.append(ss)
+    return cleaned
+
+
+def invalidate_search_cache() -> None:
+    _ranked_cache.clear()
+
+
 @dataclass(frozen=True)
 class ProductCandidate:
     product_id: uuid.UUID
@@ -28,7 +127,50 @@ class RankedCandidate:
     product_id: uuid.UUID
     name: str
     score: float
-    bucket: int     # 0 exact, 1 name, 2 synonym
+    bucket: int     # -2 свой продукт, -1 history, 0 exact, 1 name, 2 synonym
+    gap: Optional[float] = None     # отрыв score от следующего кандидата выдачи (None — закреплённые)
+
+
+def is_confident(c: RankedCandidate) -> bool:
+    """
+    Политика авто-выбора лучшего кандидата поиска без шага маппинга (settings.auto_accept_*):
+    достаточно высокий score, заметный отрыв от следующего и "надёжный" bucket.
+    """
+    return (
+        settings.auto_accept_enabled
+        and c.gap is not None
+        and 0 <= c.bucket <= settings.auto_accept_max_bucket
+        and c.score >= settings.auto_accept_min_score
+        and c.gap >= settings.auto_accept_min_gap
+    )
+
+
+@dataclass(frozen=True)
+class NewProduct:
+    name: str
+    kcal_per_100g: float
+    protein_100g: float | None = None
+    fat_100g: float | None = None
+    carbs_100g: float | None = None
+    brand: str | None = None
+    synonyms: Sequence[str] = ()
+
+
+@dataclass(frozen=True)
+class CreatedProduct:
+    product_id: uuid.UUID
+    name: str
+    brand: Optional[str]
+
+
+@dataclass(frozen=True)
+class BulkCreateResult:
+    created: list[CreatedProduct]
+    skipped: list[str]      # имена, которые уже были в справочнике (или повторялись во входе)
+
+
+BUCKET_USER = -2       # свой продукт пользователя (products_user), product_id — его id
+BUCKET_HISTORY = -1
 
 class ProductRepo:
     def __init__(self, session: AsyncSession):
@@ -93,33 +235,135 @@ class ProductRepo:
         *,
         limit: int,
         offset: int,
+        pinned: Sequence[RankedCandidate] = (),
     ) -> tuple[list[RankedCandidate], int]:
         """
         Возвращает кандидатов в порядке:
+        bucket -2/-1: закреплённые (свои продукты пользователя, персональная история выбора),
+                   если переданы в pinned — в переданном порядке
         bucket 0: точное совпадение products_ref.name == query
-        bucket 1: частичное совпадение по названию (trgm)
-        bucket 2: частичное совпадение по синонимам (trgm)
+        bucket 1: частичное совпадение по названию (trgm + FTS по словоформам)
+        bucket 2: частичное совпадение по синонимам (trgm + FTS по словоформам)
 
         Уникальность по product_id (если совпал и по name и по synonym — берём bucket=min, score=max).
+
+        Первые RANKED_PREFETCH кандидатов запроса кэшируются (TTL короткий),
+        поэтому листание страниц и возврат на шаг маппинга — просто срез без БД.
         """
-        q = (query or "").strip()
+        q = normalize_query(query)
         if not q:
-            return [], 0
+            return list(pinned)[offset:offset + limit], len(pinned)
+
+        cached = _ranked_cache.get(q)
+        if cached is None:
+            items, total = await self._fetch_ranked(q, limit=RANKED_PREFETCH, offset=0)
+            cached = (tuple(items), total)
+            _ranked_cache.set(q, cached)
+
+        items, total = cached
+
+        pinned_ids = {c.product_id for c in pinned}
+        rest = [c for c in items if c.product_id not in pinned_ids]
+        shadowed = len(items) - len(rest)
+        merged = list(pinned) + rest
+        merged_total = total + len(pinned) - shadowed
+
+        if offset + limit <= len(merged) or len(items) >= total:
+            return merged[offset:offset + limit], merged_total
+
+        # глубже кэша — одна выборка страницы. Закреплённые исключаются в самом запросе:
+        # смещение в выдаче без них точное, страница не выходит короче limit, а total учитывает
+        # и закреплённые, которые в выдаче глубже кэша
+        page, rest_total = await self._fetch_ranked(
+            q, limit=limit, offset=max(0, offset - len(pinned)), exclude=list(pinned_ids)
+        )
+        return page, len(pinned) + rest_total if page else merged_total
+
+    async def _fetch_ranked(
+        self,
+        q: str,
+        *,
+        limit: int,
+        offset: int,
+        exclude: Sequence[uuid.UUID] = (),
+    ) -> tuple[list[RankedCandidate], int]:
+        """
+        Один запрос: страница + общее число кандидатов через COUNT(*) OVER ().
+        exclude — product_id, которых в выдаче не должно быть (total и gap считаются без них).
+        """
+        if settings.search_engine == "knn":
+            await self._set_trgm_thresholds(q)
+        page_q = self._ranked_query(q, limit=limit, offset=offset, exclude=exclude)
+        rows = (await self.session.execute(page_q)).all()
+        total = int(rows[0].total) if rows else 0
+        return (
+            [
+                RankedCandidate(
+                    product_id=r.product_id,
+                    name=str(r.name),
+                    score=float(r.score or 0.0),
+                    bucket=int(r.bucket),
+                    gap=float(r.gap or 0.0),
+                )
+                for r in rows
+            ],
+            total,
+        )
 
-        exact = select(
+    def _ranked_query(self, q: str, *, limit: int, offset: int, exclude: Sequence[uuid.UUID] = ()) -> Select:
+        if settings.search_engine == "knn":
+            arms = self._knn_arms(q, per_bucket=settings.search_knn_per_bucket)
+        else:
+            arms = self._trgm_arms(q)
+
+        merged = union_all(*arms).subquery()
+
+        # Схлопываем дубли по product_id:
+        # bucket = min(bucket), score = max(score); total считается окном после GROUP BY,
+        # gap (отрыв от следующего кандидата для авто-выбора) — окном lead() в том же порядке
+        score = func.max(merged.c.score)
+        bucket = func.min(merged.c.bucket)
+        order = (bucket.asc(), score.desc(), merged.c.name.asc())
+        stmt = select(
+            merged.c.product_id,
+            merged.c.name,
+            score.label("score"),
+            bucket.label("bucket"),
+            func.count().over().label("total"),
+            (score - func.coalesce(func.lead(score).over(order_by=order), 0.0)).label("gap"),
+        )
+        if exclude:
+            stmt = stmt.where(merged.c.product_id.not_in(list(exclude)))
+        return (
+            stmt
+            .group_by(merged.c.product_id, merged.c.name)
+            .order_by(*order)
+            .offset(offset)
+            .limit(limit)
+        )
+
+    def _exact_arm(self, q: str) -> Select:
+        return select(
             ProductRef.id.label("product_id"),
             ProductRef.name.label("name"),
             literal(1.0).label("score"),
             literal(0).label("bucket"),
         ).where(ProductRef.name == q)
 
+    def _trgm_arms(self, q: str) -> list[Select]:
+        """
+        Режим "trgm": фильтр оператором % (GIN trgm) или совпадением полнотекстового
+        запроса (GIN tsvector), score — гибрид similarity и FTS.
+        """
+        tsq = _fts_query(q)
+
         by_name = select(
             ProductRef.id.label("product_id"),
             ProductRef.name.label("name"),
-            func.similarity(ProductRef.name, q).label("score"),
+            _hybrid_score(func.similarity(ProductRef.name, q), ProductRef.name_tsv, tsq).label("score"),
             literal(1).label("bucket"),
         ).where(
-            ProductRef.name.op("%")(q)
+            or_(ProductRef.name.op("%")(q), ProductRef.name_tsv.op("@@")(tsq))
         ).where(
             ProductRef.name != q
         )
@@ -127,61 +371,155 @@ class ProductRepo:
         by_syn = select(
             ProductRef.id.label("product_id"),
             ProductRef.name.label("name"),
-            func.similarity(ProductSynonym.synonym, q).label("score"),
+            _hybrid_score(func.similarity(ProductSynonym.synonym, q), ProductSynonym.synonym_tsv, tsq).label("score"),
             literal(2).label("bucket"),
         ).select_from(ProductSynonym).join(
             ProductRef, ProductRef.id == ProductSynonym.product_ref_id
         ).where(
-            ProductSynonym.synonym.op("%")(q)
+            or_(ProductSynonym.synonym.op("%")(q), ProductSynonym.synonym_tsv.op("@@")(tsq))
         )
 
-        merged = union_all(exact, by_name, by_syn).subquery()
+        return [self._exact_arm(q), by_name, by_syn]
 
-        # Схлопываем дубли по product_id:
-        # bucket = min(bucket), score = max(score)
-        grouped = (
+    def _knn_arms(self, q: str, *, per_bucket: int) -> list[Select]:
+        """
+        Режим "knn": каждый bucket берёт только top-K прямо из GiST-индекса
+        (ORDER BY <расстояние> LIMIT k), без сортировки всего множества совпадений.
+        Одно слово — similarity и <->, несколько слов — word_similarity и <<->
+        (запрос ищется как "подстрока по словам" в названии).
+        Морфологические варианты, которых нет в top-K по триграммам, добирают
+        отдельные FTS-ветки (тоже top-K).
+        """
+        multi_word = " " in q
+        tsq = _fts_query(q)
+
+        def distance(col):
+            if multi_word:
+                return literal(q).op("<<->", return_type=Float)(col)
+            return col.op("<->", return_type=Float)(q)
+
+        def matches(col):
+            return literal(q).op("<%")(col) if multi_word else col.op("%")(q)
+
+        name_dist = distance(ProductRef.name)
+        by_name = (
             select(
-                merged.c.product_id,
-                merged.c.name,
-                func.max(merged.c.score).label("score"),
-                func.min(merged.c.bucket).label("bucket"),
+                ProductRef.id.label("product_id"),
+                ProductRef.name.label("name"),
+                _hybrid_score(1 - name_dist, ProductRef.name_tsv, tsq).label("score"),
+                literal(1).label("bucket"),
             )
-            .group_by(merged.c.product_id, merged.c.name)
+            .where(matches(ProductRef.name))
+            .where(ProductRef.name != q)
+            .order_by(name_dist)
+            .limit(per_bucket)
             .subquery()
         )
 
-        total_q = select(func.count()).select_from(grouped)
-        total = int((await self.session.execute(total_q)).scalar_one())
+        name_fts = (
+            select(
+                ProductRef.id.label("product_id"),
+                ProductRef.name.label("name"),
+                _hybrid_score(func.similarity(ProductRef.name, q), ProductRef.name_tsv, tsq).label("score"),
+                literal(1).label("bucket"),
+            )
+            .where(ProductRef.name_tsv.op("@@")(tsq))
+            .where(ProductRef.name != q)
+            .order_by(func.ts_rank(ProductRef.name_tsv, tsq).desc())
+            .limit(per_bucket)
+            .subquery()
+        )
 
-        page_q = (
-            select(grouped.c.product_id, grouped.c.name, grouped.c.score, grouped.c.bucket)
-            .order_by(
-                grouped.c.bucket.asc(),
-                grouped.c.score.desc(),
-                grouped.c.name.asc(),
+        # сначала top-K синонимов по индексу, потом join к справочнику
+        syn_dist = distance(ProductSynonym.synonym)
+        top_syn = (
+            select(
+                ProductSynonym.product_ref_id.label("product_ref_id"),
+                _hybrid_score(1 - syn_dist, ProductSynonym.synonym_tsv, tsq).label("score"),
             )
-            .offset(offset)
-            .limit(limit)
+            .where(matches(ProductSynonym.synonym))
+            .order_by(syn_dist)
+            .limit(per_bucket)
+        )
+        syn_fts = (
+            select(
+                ProductSynonym.product_ref_id.label("product_ref_id"),
+                _hybrid_score(func.similarity(ProductSynonym.synonym, q), ProductSynonym.synonym_tsv, tsq).label("score"),
+            )
+            .where(ProductSynonym.synonym_tsv.op("@@")(tsq))
+            .order_by(func.ts_rank(ProductSynonym.synonym_tsv, tsq).desc())
+            .limit(per_bucket)
         )
+        syn_top = union_all(top_syn.subquery().select(), syn_fts.subquery().select()).subquery()
+        by_syn = select(
+            ProductRef.id.label("product_id"),
+            ProductRef.name.label("name"),
+            syn_top.c.score,
+            literal(2).label("bucket"),
+        ).select_from(syn_top).join(ProductRef, ProductRef.id == syn_top.c.product_ref_id)
 
-        rows = (await self.session.execute(page_q)).all()
-        return (
-            [
-                RankedCandidate(
-                    product_id=r.product_id,
-                    name=str(r.name),
-                    score=float(r.score or 0.0),
-                    bucket=int(r.bucket),
-                )
-                for r in rows
-            ],
-            total,
+        return [self._exact_arm(q), select(by_name), select(name_fts), by_syn]
+
+    async def _set_trgm_thresholds(self, q: str) -> None:
+        """
+        Порог для % / <% зависит от длины запроса (действует до конца транзакции).
+        """
+        t = str(similarity_threshold(q))
+        await self.session.execute(
+            text(
+                "SELECT set_config('pg_trgm.similarity_threshold', :t, true), "
+                "set_config('pg_trgm.word_similarity_threshold', :t, true)"
+            ),
+            {"t": t},
         )
 
     async def get_product(self, product_id: uuid.UUID) -> ProductRef | None:
         q = select(ProductRef).where(ProductRef.id == product_id)
         return (await self.session.execute(q)).scalars().first()
 
+    async def get_facts(self, product_id: uuid.UUID) -> Optional[ProductFacts]:
+        return (await self.get_facts_many([product_id])).get(product_id)
+
+    async def get_facts_many(self, product_ids: Sequence[uuid.UUID]) -> dict[uuid.UUID, ProductFacts]:
+        """
+        Имя и пищевая ценность продуктов из кэша; промахи — одним SELECT узких колонок.
+        """
+        result: dict[uuid.UUID, ProductFacts] = {}
+        missing: list[uuid.UUID] = []
+        for pid in dict.fromkeys(product_ids):
+            facts = _facts_cache.get(pid)
+            if facts is None:
+                missing.append(pid)
+            else:
+                result[pid] = facts
+        if not missing:
+            return result
+
+        q = select(
+            ProductRef.id,
+            ProductRef.name,
+            ProductRef.kcal_per_100g,
+            ProductRef.protein_100g,
+            ProductRef.fat_100g,
+            ProductRef.carbs_100g,
+        ).where(ProductRef.id.in_(missing))
+
+        def _num(v) -> Optional[float]:
+            return float(v) if v is not None else None
+
+        for r in (await self.session.execute(q)).all():
+            facts = ProductFacts(
+                product_id=r.id,
+                name=str(r.name),
+                kcal_per_100g=float(r.kcal_per_100g),
+                protein_100g=_num(r.protein_100g),
+                fat_100g=_num(r.fat_100g),
+                carbs_100g=_num(r.carbs_100g),
+            )
+            _facts_cache.set(r.id, facts)
+            result[r.id] = facts
+        return result
+
     # --- admin / reference management ---
     async def count_ref(self) -> int:
         q = select(func.count(ProductRef.id))
@@ -229,6 +567,69 @@ class ProductRepo:
         await self.replace_synonyms(prod.id, synonyms)
         return prod
 
+    async def create_refs_bulk(self, products: Sequence[NewProduct]) -> BulkCreateResult:
+        """
+        Создание продуктов одним INSERT ... SELECT unnest(...): уже существующие
+        (name, brand) без учёта регистра пропускаются. NULL brand по UNIQUE не
+        конфликтует, поэтому существование проверяется явно (IS NOT DISTINCT FROM),
+        а ON CONFLICT страхует от параллельной вставки. Синонимы созданных — одним
+        bulk-запросом, кэш поиска сбрасывается один раз.
+        """
+        rows = [p for p in products if p.name.strip()]
+        if not rows:
+            return BulkCreateResult(created=[], skipped=[])
+
+        res = await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.products_ref (name, brand, kcal_per_100g, protein_100g, fat_100g, carbs_100g)
+                SELECT DISTINCT ON (n.name, n.brand) n.name, n.brand, n.kcal, n.protein, n.fat, n.carbs
+                FROM unnest(
+                  CAST(:names AS citext[]),
+                  CAST(:brands AS citext[]),
+                  CAST(:kcal AS numeric[]),
+                  CAST(:protein AS numeric[]),
+                  CAST(:fat AS numeric[]),
+                  CAST(:carbs AS numeric[])
+                ) WITH ORDINALITY AS n(name, brand, kcal, protein, fat, carbs, ord)
+                WHERE NOT EXISTS (
+                  SELECT 1 FROM nutrition_bot.products_ref p
+                  WHERE p.name = n.name AND p.brand IS NOT DISTINCT FROM n.brand
+                )
+                ORDER BY n.name, n.brand, n.ord
+                ON CONFLICT ON CONSTRAINT uq_products_ref_name_brand DO NOTHING
+                RETURNING id, name, brand
+                """
+            ),
+            {
+                "names": [p.name.strip() for p in rows],
+                "brands": [(p.brand or "").strip() or None for p in rows],
+                "kcal": [p.kcal_per_100g for p in rows],
+                "protein": [p.protein_100g for p in rows],
+                "fat": [p.fat_100g for p in rows],
+                "carbs": [p.carbs_100g for p in rows],
+            },
+        )
+        created = [CreatedProduct(product_id=r.id, name=str(r.name), brand=r.brand) for r in res.all()]
+
+        def _key(name: str, brand: Optional[str]) -> tuple[str, str]:
+            return name.strip().lower(), (brand or "").strip().lower()
+
+        by_key = {_key(c.name, c.brand): c for c in created}
+        synonyms: dict[uuid.UUID, Sequence[str]] = {}
+        skipped: list[str] = []
+        for p in rows:
+            c = by_key.pop(_key(p.name, p.brand), None)
+            if c is None:
+                skipped.append(p.name.strip())
+            elif p.synonyms:
+                synonyms[c.product_id] = p.synonyms
+
+        await self.replace_synonyms_bulk(synonyms)
+        if created:
+            self._invalidate_caches()
+        return BulkCreateResult(created=created, skipped=skipped)
+
     async def update_ref(
         self,
         product_id: uuid.UUID,
@@ -240,10 +641,23 @@ class ProductRepo:
         carbs_100g: float | None = None,
         brand: str | None = None,
         synonyms: Sequence[str] = (),
-    ) -> None:
+    ) -> bool:
+        """
+        Возвращает True, если изменилась пищевая ценность (ккал/БЖУ) — нужен пересчёт meal_items.
+        """
         prod = await self.get_product(product_id)
         if not prod:
-            return
+            return False
+
+        def _num(v) -> float | None:
+            return float(v) if v is not None else None
+
+        nutrients_changed = (
+            _num(prod.kcal_per_100g),
+            _num(prod.protein_100g),
+            _num(prod.fat_100g),
+            _num(prod.carbs_100g),
+        ) != (_num(kcal_per_100g), _num(protein_100g), _num(fat_100g), _num(carbs_100g))
         prod.name = name
         prod.brand = brand
         prod.kcal_per_100g = kcal_per_100g
@@ -252,32 +666,83 @@ class ProductRepo:
         prod.carbs_100g = carbs_100g
 
         await self.replace_synonyms(product_id, synonyms)
+        self._invalidate_caches(product_id)
+        return nutrients_changed
 
     async def delete_ref(self, product_id: uuid.UUID) -> None:
         # синонимы каскадно удалятся, но можно и явно
         await self.session.execute(delete(ProductRef).where(ProductRef.id == product_id))
+        self._invalidate_caches(product_id)
 
-    async def replace_synonyms(self, product_id: uuid.UUID, synonyms: Sequence[str]) -> None:
-        # удаляем старые
-        await self.session.execute(delete(ProductSynonym).where(ProductSynonym.product_ref_id == product_id))
-
-        # вставляем новые
-        cleaned = []
-        seen = set()
-        for s in synonyms:
-            ss = s.strip()
-            if not ss:
-                continue
-            key = ss.casefold()
-            if key in seen:
-                continue
-            seen.add(key)
-            cleaned.append(ss)
-
-        for s in cleaned:
-            self.session.add(ProductSynonym(product_ref_id=product_id, synonym=s))
+    def _invalidate_caches(self, product_id: Optional[uuid.UUID] = None) -> None:
+        """
+        Сброс кэша поиска (и фактов продукта с историей выбора, если задан product_id) сейчас
+        и ещё раз по окончании транзакции: до коммита конкурентный читатель может заново
+        заполнить кэш старой зафиксированной строкой, и она прожила бы весь TTL.
+        """
+        def drop() -> None:
+            invalidate_search_cache()
+            if product_id is not None:
+                invalidate_product_facts(product_id)
 
-        await self.session.flush()
+                from app.db.repo_usage import invalidate_usage_cache
+                invalidate_usage_cache()
+
+        drop()
+        after_transaction(self.session, drop)
+
+    async def replace_synonyms(self, product_id: uuid.UUID, synonyms: Sequence[str]) -> bool:
+        return await self.replace_synonyms_bulk({product_id: synonyms})
+
+    async def replace_synonyms_bulk(self, items: Mapping[uuid.UUID, Sequence[str]]) -> bool:
+        """
+        Приводит синонимы продуктов к заданным спискам по разнице: удаляются только
+        исчезнувшие (и сменившие регистр), добавляются только новые — одним INSERT
+        на все продукты. Неизменные строки не трогаем: каждая запись в
+        product_synonyms — это обновление GIN-индексов (trgm, tsv).
+        Возвращает True, если что-то изменилось.
+        """
+        if not items:
+            return False
+
+        pids: list[uuid.UUID] = []
+        syns: list[str] = []
+        for product_id, synonyms in items.items():
+            for syn in _clean_synonyms(synonyms):
+                pids.append(product_id)
+                syns.append(syn)
+
+        params = {"product_ids": list(items.keys()), "pids": pids, "syns": syns}
+        deleted = await self.session.execute(
+            text(
+                """
+                DELETE FROM nutrition_bot.product_synonyms s
+                WHERE s.product_ref_id = ANY(CAST(:product_ids AS uuid[]))
+                  AND NOT EXISTS (
+                    SELECT 1
+                    FROM unnest(CAST(:pids AS uuid[]), CAST(:syns AS text[])) AS n(pid, syn)
+                    WHERE n.pid = s.product_ref_id AND n.syn = s.synonym::text
+                  )
+                """
+            ),
+            params,
+        )
+        inserted = await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.product_synonyms (product_ref_id, synonym)
+                SELECT n.pid, n.syn
+                FROM unnest(CAST(:pids AS uuid[]), CAST(:syns AS text[])) AS n(pid, syn)
+                ON CONFLICT ON CONSTRAINT uq_product_synonyms DO NOTHING
+                """
+            ),
+            params,
+        )
+
+        changed = bool(deleted.rowcount or inserted.rowcount)
+        if changed:
+            self._invalidate_caches()
+        return changed
 
     async def exists_by_names_exact(self, names: Sequence[str]) -> set[str]:
         """
@@ -293,6 +758,44 @@ class ProductRepo:
         # rows будут в “каноническом” виде из БД
         return set(rows)
     
+    async def find_exact_products(self, names: Sequence[str]) -> dict[str, uuid.UUID]:
+        """
+        find_exact_product для списка имён одним запросом: имя -> id продукта
+        (exact по name, иначе по synonym). Ненайденных имён в ответе нет.
+        """
+        cleaned = sorted({n.strip() for n in names if n and n.strip()})
+        if not cleaned:
+            return {}
+
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT q.name AS query, m.id
+                    FROM unnest(CAST(:names AS text[])) AS q(name)
+                    CROSS JOIN LATERAL (
+                      SELECT x.id
+                      FROM (
+                        SELECT p.id, p.name, 0 AS prio
+                        FROM nutrition_bot.products_ref p
+                        WHERE p.name = CAST(q.name AS citext)
+                        UNION ALL
+                        SELECT p.id, p.name, 1 AS prio
+                        FROM nutrition_bot.product_synonyms s
+                        JOIN nutrition_bot.products_ref p ON p.id = s.product_ref_id
+                        WHERE s.synonym = CAST(q.name AS citext)
+                      ) x
+                      ORDER BY x.prio, x.name
+                      LIMIT 1
+                    ) m
+                    """
+                ),
+                {"names": cleaned},
+            )
+        ).all()
+        found = {r.query: r.id for r in rows}
+        return {n: found[n.strip()] for n in names if n and n.strip() in found}
+
     async def find_exact_product(self, text: str) -> ProductRef | None:
         """
         1) exact match по products_ref.name (CITEXT -> case-insensitive)
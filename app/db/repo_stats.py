@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+BUCKETS = ("day", "week", "month")
+
+
+def auto_bucket(start: date, end: date) -> str:
+    """
+    Гранулярность графика по длине диапазона: до ~2 месяцев — дни, до ~полугода — недели, дальше — месяцы.
+    """
+    days = (end - start).days + 1
+    if days <= 62:
+        return "day"
+    if days <= 200:
+        return "week"
+    return "month"
+
+
+@dataclass(frozen=True)
+class RangeStats:
+    start: date
+    end: date
+    bucket: str
+
+    # компактные ряды по bucket (day/week/month, начало bucket = date_trunc)
+    bucket_starts: List[date]
+    bucket_days: List[int]        # дней диапазона в bucket (крайние могут быть неполными)
+    bucket_kcal: List[float]      # сумма ккал за bucket
+    bucket_meals: List[int]
+
+    days: int
+    days_with_records: int
+    total_kcal: float
+    total_meals: int
+    total_photos: int
+    protein_g: float
+    fat_g: float
+    carbs_g: float
+
+    avg_kcal: float               # среднее по всем дням диапазона
+    avg_kcal_recorded: float      # среднее по дням с записями
+    p50_kcal: float               # перцентили по дням с записями
+    p90_kcal: float
+    max_day: Optional[date]
+    max_kcal: float
+
+    longest_streak: int           # дней подряд с записями
+    current_streak: int           # серия, заканчивающаяся в последний день диапазона
+
+    def bucket_avg_kcal(self) -> List[float]:
+        """
+        Среднее ккал/день по каждому bucket (для графиков недель/месяцев).
+        """
+        return [k / d if d else 0.0 for k, d in zip(self.bucket_kcal, self.bucket_days)]
+
+    def bucket_avg_meals(self) -> List[float]:
+        return [m / d if d else 0.0 for m, d in zip(self.bucket_meals, self.bucket_days)]
+
+
+class StatsRepo:
+    """
+    Статистика за произвольный диапазон: один запрос к дневному rollup (day_stats),
+    дни диапазона — generate_series, группировка — date_trunc, агрегаты и серии — в SQL.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def range_stats(self, user_id: uuid.UUID, start: date, end: date, *, bucket: str = "day") -> RangeStats:
+        if bucket not in BUCKETS:
+            raise ValueError(f"unknown bucket: {bucket}")
+        if end < start:
+            start, end = end, start
+
+        r = (
+            await self.session.execute(
+                text(
+                    """
+                    WITH daily AS (
+                      SELECT
+                        g.day::date AS day,
+                        COALESCE(s.kcal_total, 0) AS kcal,
+                        COALESCE(s.meals_count, 0) AS meals,
+                        COALESCE(s.photos_count, 0) AS photos,
+                        COALESCE(s.protein_g, 0) AS protein,
+                        COALESCE(s.fat_g, 0) AS fat,
+                        COALESCE(s.carbs_g, 0) AS carbs
+                      FROM generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day') AS g(day)
+                      LEFT JOIN nutrition_bot.day_stats s
+                        ON s.user_id = :user_id AND s.meal_date = g.day::date
+                    ), buckets AS (
+                      SELECT
+                        date_trunc(CAST(:bucket AS text), day)::date AS bucket_start,
+                        count(*) AS days,
+                        sum(kcal) AS kcal,
+                        sum(meals) AS meals
+                      FROM daily
+                      GROUP BY 1
+                    ), runs AS (
+                      -- серии дней подряд: у дней одной серии day - row_number одинаков
+                      SELECT max(day) AS last_day, count(*) AS len
+                      FROM (
+                        SELECT day, day - CAST(row_number() OVER (ORDER BY day) AS integer) AS grp
+                        FROM daily
+                        WHERE meals > 0
+                      ) t
+                      GROUP BY grp
+                    ), top AS (
+                      SELECT day, kcal FROM daily WHERE meals > 0 ORDER BY kcal DESC, day ASC LIMIT 1
+                    )
+                    SELECT
+                      (SELECT array_agg(bucket_start ORDER BY bucket_start) FROM buckets) AS bucket_starts,
+                      (SELECT array_agg(days ORDER BY bucket_start) FROM buckets) AS bucket_days,
+                      (SELECT array_agg(kcal ORDER BY bucket_start) FROM buckets) AS bucket_kcal,
+                      (SELECT array_agg(meals ORDER BY bucket_start) FROM buckets) AS bucket_meals,
+                      count(*) AS days,
+                      count(*) FILTER (WHERE meals > 0) AS days_with_records,
+                      sum(kcal) AS total_kcal,
+                      sum(meals) AS total_meals,
+                      sum(photos) AS total_photos,
+                      sum(protein) AS protein_g,
+                      sum(fat) AS fat_g,
+                      sum(carbs) AS carbs_g,
+                      avg(kcal) AS avg_kcal,
+                      avg(kcal) FILTER (WHERE meals > 0) AS avg_kcal_recorded,
+                      percentile_cont(0.5) WITHIN GROUP (ORDER BY kcal) FILTER (WHERE meals > 0) AS p50_kcal,
+                      percentile_cont(0.9) WITHIN GROUP (ORDER BY kcal) FILTER (WHERE meals > 0) AS p90_kcal,
+                      (SELECT day FROM top) AS max_day,
+                      (SELECT kcal FROM top) AS max_kcal,
+                      (SELECT max(len) FROM runs) AS longest_streak,
+                      (SELECT len FROM runs WHERE last_day = CAST(:end AS date)) AS current_streak
+                    FROM daily
+                    """
+                ),
+                {"user_id": user_id, "start": start, "end": end, "bucket": bucket},
+            )
+        ).one()
+
+        return RangeStats(
+            start=start,
+            end=end,
+            bucket=bucket,
+            bucket_starts=list(r.bucket_starts or []),
+            bucket_days=[int(x) for x in (r.bucket_days or [])],
+            bucket_kcal=[float(x) for x in (r.bucket_kcal or [])],
+            bucket_meals=[int(x) for x in (r.bucket_meals or [])],
+            days=int(r.days),
+            days_with_records=int(r.days_with_records),
+            total_kcal=float(r.total_kcal or 0.0),
+            total_meals=int(r.total_meals or 0),
+            total_photos=int(r.total_photos or 0),
+            protein_g=float(r.protein_g or 0.0),
+            fat_g=float(r.fat_g or 0.0),
+            carbs_g=float(r.carbs_g or 0.0),
+            avg_kcal=float(r.avg_kcal or 0.0),
+            avg_kcal_recorded=float(r.avg_kcal_recorded or 0.0),
+            p50_kcal=float(r.p50_kcal or 0.0),
+            p90_kcal=float(r.p90_kcal or 0.0),
+            max_day=r.max_day,
+            max_kcal=float(r.max_kcal or 0.0),
+            longest_streak=int(r.longest_streak or 0),
+            current_streak=int(r.current_streak or 0),
+        )
+
+    async def meal_timing_columns(self, user_id: uuid.UUID) -> tuple[list[int], list[int], list[float]]:
+        """
+        Вся история приёмов колонками (одна строка с массивами), отсортировано по (день, время):
+        день от 1970-01-01, минуты от полуночи, ккал приёма.
+        """
+        r = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT
+                      array_agg(m.meal_date - DATE '1970-01-01' ORDER BY m.meal_date, m.meal_time) AS days,
+                      array_agg(
+                        CAST(extract(hour FROM m.meal_time) * 60 + extract(minute FROM m.meal_time) AS integer)
+                        ORDER BY m.meal_date, m.meal_time
+                      ) AS minutes,
+                      array_agg(CAST(COALESCE(it.kcal, 0) AS float8) ORDER BY m.meal_date, m.meal_time) AS kcal
+                    FROM nutrition_bot.meals m
+                    LEFT JOIN LATERAL (
+                      SELECT SUM(mi.kcal_total) AS kcal FROM nutrition_bot.meal_items mi WHERE mi.meal_id = m.id
+                    ) it ON true
+                    WHERE m.user_id = :user_id
+                    """
+                ),
+                {"user_id": user_id},
+            )
+        ).one()
+        return list(r.days or []), list(r.minutes or []), list(r.kcal or [])
+
+    async def get_timing_summary(self, user_id: uuid.UUID) -> Optional[dict]:
+        raw = (
+            await self.session.execute(
+                text("SELECT payload FROM nutrition_bot.meal_timing_summary WHERE user_id = :user_id"),
+                {"user_id": user_id},
+            )
+        ).scalar_one_or_none()
+        if raw is None:
+            return None
+        return raw if isinstance(raw, dict) else json.loads(raw)
+
+    async def put_timing_summary(self, user_id: uuid.UUID, payload: dict) -> None:
+        await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.meal_timing_summary (user_id, payload, computed_at)
+                VALUES (:user_id, CAST(:payload AS jsonb), now())
+                ON CONFLICT (user_id) DO UPDATE
+                  SET payload = excluded.payload,
+                      computed_at = excluded.computed_at
+                """
+            ),
+            {"user_id": user_id, "payload": json.dumps(payload)},
+        )
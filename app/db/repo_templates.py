@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import date, time
+from enum import StrEnum
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.repo_meals import MealRepo
+
+
+# сколько шаблонов показываем/храним на пользователя
+TEMPLATES_LIMIT = 20
+
+
+class TemplateSaveResult(StrEnum):
+    SAVED = "saved"
+    DUPLICATE = "duplicate"     # шаблон с теми же позициями уже есть
+    LIMIT = "limit"             # у пользователя уже TEMPLATES_LIMIT шаблонов
+    NOT_FOUND = "not_found"
+
+
+@dataclass(frozen=True)
+class MealTemplateView:
+    id: uuid.UUID
+    name: str
+    items_count: int
+
+
+class TemplateRepo:
+    """
+    Шаблоны приёмов пищи: сохранение из существующего приёма и развёртывание
+    в новый приём. Обе операции — один INSERT ... SELECT (без ORM по позициям).
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def save_from_meal(self, meal_id: uuid.UUID, *, user_id: uuid.UUID, name: str) -> TemplateSaveResult:
+        """
+        Шаблон из приёма пищи. Не сохраняет, если шаблонов уже TEMPLATES_LIMIT или шаблон
+        с теми же позициями (название, продукт, граммы по порядку) уже есть.
+        Шаблоны пользователя сериализуются advisory-локом: повторные нажатия не дают дублей.
+        """
+        await self.session.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext('meal_templates:' || CAST(:user_id AS text)))"),
+            {"user_id": user_id},
+        )
+        row = (
+            await self.session.execute(
+                text(
+                    """
+                    WITH src AS (
+                      SELECT i.position, i.raw_name, i.product_ref_id, i.user_product_id, i.grams
+                      FROM nutrition_bot.meals m
+                      JOIN nutrition_bot.meal_items i ON i.meal_id = m.id
+                      WHERE m.id = :meal_id AND m.user_id = :user_id
+                    ), existing AS (
+                      SELECT (
+                        SELECT jsonb_agg(
+                          jsonb_build_array(i.raw_name, i.product_ref_id, i.user_product_id, i.grams)
+                          ORDER BY i.position
+                        )
+                        FROM nutrition_bot.meal_template_items i
+                        WHERE i.template_id = t.id
+                      ) AS items_sig
+                      FROM nutrition_bot.meal_templates t
+                      WHERE t.user_id = :user_id
+                    ), chk AS (
+                      SELECT
+                        EXISTS (SELECT 1 FROM src) AS found,
+                        (SELECT count(*) FROM existing) AS templates_count,
+                        EXISTS (
+                          SELECT 1 FROM existing
+                          WHERE items_sig = (
+                            SELECT jsonb_agg(
+                              jsonb_build_array(raw_name, product_ref_id, user_product_id, grams)
+                              ORDER BY position
+                            )
+                            FROM src
+                          )
+                        ) AS duplicate
+                    ), tpl AS (
+                      INSERT INTO nutrition_bot.meal_templates (user_id, name)
+                      SELECT :user_id, :name
+                      FROM chk
+                      WHERE chk.found AND NOT chk.duplicate AND chk.templates_count < :limit
+                      RETURNING id
+                    ), tpl_items AS (
+                      INSERT INTO nutrition_bot.meal_template_items
+                        (template_id, position, raw_name, product_ref_id, user_product_id, grams)
+                      SELECT tpl.id, src.position, src.raw_name, src.product_ref_id, src.user_product_id, src.grams
+                      FROM tpl
+                      CROSS JOIN src
+                    )
+                    SELECT chk.found, chk.duplicate, chk.templates_count
+                    FROM chk
+                    """
+                ),
+                {"meal_id": meal_id, "user_id": user_id, "name": name, "limit": TEMPLATES_LIMIT},
+            )
+        ).one()
+        if not row.found:
+            return TemplateSaveResult.NOT_FOUND
+        if row.duplicate:
+            return TemplateSaveResult.DUPLICATE
+        if row.templates_count >= TEMPLATES_LIMIT:
+            return TemplateSaveResult.LIMIT
+        return TemplateSaveResult.SAVED
+
+    async def list_for_user(self, user_id: uuid.UUID) -> List[MealTemplateView]:
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT t.id, t.name, count(i.id) AS items_count
+                    FROM nutrition_bot.meal_templates t
+                    LEFT JOIN nutrition_bot.meal_template_items i ON i.template_id = t.id
+                    WHERE t.user_id = :user_id
+                    GROUP BY t.id, t.name, t.created_at
+                    ORDER BY t.created_at DESC
+                    LIMIT :limit
+                    """
+                ),
+                {"user_id": user_id, "limit": TEMPLATES_LIMIT},
+            )
+        ).all()
+        return [MealTemplateView(id=r.id, name=str(r.name), items_count=int(r.items_count)) for r in rows]
+
+    async def delete(self, template_id: uuid.UUID, *, user_id: uuid.UUID) -> None:
+        await self.session.execute(
+            text("DELETE FROM nutrition_bot.meal_templates WHERE id = :id AND user_id = :user_id"),
+            {"id": template_id, "user_id": user_id},
+        )
+
+    async def instantiate(
+        self,
+        template_id: uuid.UUID,
+        *,
+        user_id: uuid.UUID,
+        meal_date: date,
+        meal_time: time,
+    ) -> Optional[uuid.UUID]:
+        """
+        Новый приём пищи из шаблона; ккал и БЖУ считаются в SQL по текущему справочнику.
+        """
+        new_id = (
+            await self.session.execute(
+                text(
+                    """
+                    WITH new_meal AS (
+                      INSERT INTO nutrition_bot.meals (user_id, meal_date, meal_time)
+                      SELECT t.user_id, :meal_date, :meal_time
+                      FROM nutrition_bot.meal_templates t
+                      WHERE t.id = :template_id AND t.user_id = :user_id
+                      RETURNING id
+                    ), new_items AS (
+                      INSERT INTO nutrition_bot.meal_items
+                        (meal_id, position, raw_name, product_ref_id, user_product_id, grams,
+                         kcal_total, protein_g, fat_g, carbs_g)
+                      SELECT
+                        nm.id, i.position, i.raw_name, i.product_ref_id, i.user_product_id, i.grams,
+                        round(i.grams * coalesce(p.kcal_per_100g, up.kcal_per_100g) / 100, 2),
+                        round(i.grams * coalesce(p.protein_100g, up.protein_100g) / 100, 2),
+                        round(i.grams * coalesce(p.fat_100g, up.fat_100g) / 100, 2),
+                        round(i.grams * coalesce(p.carbs_100g, up.carbs_100g) / 100, 2)
+                      FROM new_meal nm
+                      CROSS JOIN nutrition_bot.meal_template_items i
+                      LEFT JOIN nutrition_bot.products_ref p ON p.id = i.product_ref_id
+                      LEFT JOIN nutrition_bot.products_user up ON up.id = i.user_product_id
+                      WHERE i.template_id = :template_id
+                    )
+                    SELECT id FROM new_meal
+                    """
+                ),
+                {"template_id": template_id, "user_id": user_id, "meal_date": meal_date, "meal_time": meal_time},
+            )
+        ).scalar_one_or_none()
+        if new_id is not None:
+            await MealRepo(self.session).refresh_day_stats(user_id, [meal_date])
+        return new_id
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.cache import TTLCache
+from app.db.repo_products import normalize_query
+
+
+@dataclass(frozen=True)
+class UsagePick:
+    product_id: uuid.UUID
+    name: str
+    count: int
+    last_used: datetime
+
+
+# сколько последних записей истории держим в памяти на пользователя
+USAGE_LOAD_LIMIT = 2000
+
+# user_id -> {raw_name_normalized: [UsagePick, ...]} (по убыванию count, затем last_used)
+_usage_cache: TTLCache[uuid.UUID, Dict[str, List[UsagePick]]] = TTLCache(
+    maxsize=settings.usage_cache_users,
+    ttl=settings.usage_cache_ttl_seconds,
+)
+
+
+def _sort_picks(picks: List[UsagePick]) -> None:
+    picks.sort(key=lambda p: (p.count, p.last_used), reverse=True)
+
+
+class UsageRepo:
+    """
+    Персональная история маппинга raw_name -> продукт (nutrition_bot.product_usage).
+    Для активных пользователей история целиком лежит в памяти; запись сбрасывает кэш пользователя.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def record_many(self, *, user_id: uuid.UUID, picks: Iterable[Tuple[str, uuid.UUID]]) -> None:
+        """
+        +1 к выбору продукта для raw_name по каждой позиции пакета (сохранение черновика) —
+        одна вставка на все позиции.
+        Повторы одной пары raw_name/продукт внутри пакета суммируются.
+        """
+        counts: Dict[Tuple[str, uuid.UUID], int] = {}
+        for raw_name, product_id in picks:
+            key = normalize_query(raw_name)
+            if key:
+                counts[(key, product_id)] = counts.get((key, product_id), 0) + 1
+        if not counts:
+            return
+
+        await self.session.execute(
+            text(
+                """
+                INSERT INTO nutrition_bot.product_usage AS u
+                  (user_id, raw_name_normalized, product_ref_id, count, last_used)
+                SELECT :user_id, x.raw, x.product_id, x.cnt, now()
+                FROM unnest(
+                  CAST(:raws AS text[]),
+                  CAST(:product_ids AS uuid[]),
+                  CAST(:cnts AS integer[])
+                ) AS x(raw, product_id, cnt)
+                ON CONFLICT (user_id, raw_name_normalized, product_ref_id)
+                DO UPDATE SET count = u.count + excluded.count, last_used = excluded.last_used
+                """
+            ),
+            {
+                "user_id": user_id,
+                "raws": [k[0] for k in counts],
+                "product_ids": [k[1] for k in counts],
+                "cnts": list(counts.values()),
+            },
+        )
+
+        # транзакция ещё может откатиться — кэш не дополняем, а сбрасываем:
+        # следующий load перечитает историю из БД
+        _usage_cache.pop(user_id)
+
+    async def load(self, user_id: uuid.UUID) -> Dict[str, List[UsagePick]]:
+        cached = _usage_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT u.raw_name_normalized, u.product_ref_id, p.name, u.count, u.last_used
+                    FROM nutrition_bot.product_usage u
+                    JOIN nutrition_bot.products_ref p ON p.id = u.product_ref_id
+                    WHERE u.user_id = :user_id
+                    ORDER BY u.last_used DESC
+                    LIMIT :limit
+                    """
+                ),
+                {"user_id": user_id, "limit": USAGE_LOAD_LIMIT},
+            )
+        ).all()
+
+        result: Dict[str, List[UsagePick]] = {}
+        for r in rows:
+            result.setdefault(r.raw_name_normalized, []).append(
+                UsagePick(product_id=r.product_ref_id, name=str(r.name), count=int(r.count), last_used=r.last_used)
+            )
+        for picks in result.values():
+            _sort_picks(picks)
+
+        _usage_cache.set(user_id, result)
+        return result
+
+    async def picks_for(self, user_id: uuid.UUID, raw_name: str) -> List[UsagePick]:
+        usage = await self.load(user_id)
+        return list(usage.get(normalize_query(raw_name), []))
+
+    async def auto_pick(self, user_id: uuid.UUID, raw_name: str) -> Optional[UsagePick]:
+        """
+        Продукт, в который этот raw_name пользователя маппился всегда (и не один раз).
+        """
+        picks = await self.picks_for(user_id, raw_name)
+        if len(picks) == 1 and picks[0].count >= settings.usage_autoselect_min_count:
+            return picks[0]
+        return None
+
+
+def invalidate_usage_cache() -> None:
+    _usage_cache.clear()
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.cache import TTLCache
+from app.db.hooks import after_transaction
+from app.db.repo_products import BUCKET_USER, ProductFacts, RankedCandidate, normalize_query
+
+
+# сколько своих продуктов пользователя показываем над кандидатами справочника
+USER_CANDIDATES_LIMIT = 5
+# минимальная похожесть (difflib ratio) для неточного совпадения
+USER_MATCH_MIN_SCORE = 0.55
+
+
+@dataclass(frozen=True)
+class UserProduct:
+    id: uuid.UUID
+    name: str
+    name_normalized: str
+    kcal_per_100g: Optional[float]
+    protein_100g: Optional[float]
+    fat_100g: Optional[float]
+    carbs_100g: Optional[float]
+
+    def facts(self) -> ProductFacts:
+        return ProductFacts(
+            product_id=self.id,
+            name=self.name,
+            kcal_per_100g=self.kcal_per_100g or 0.0,
+            protein_100g=self.protein_100g,
+            fat_100g=self.fat_100g,
+            carbs_100g=self.carbs_100g,
+        )
+
+
+# user_id -> все свои продукты пользователя (их единицы-десятки — поиск в памяти)
+_user_products_cache: TTLCache[uuid.UUID, Tuple[UserProduct, ...]] = TTLCache(
+    maxsize=settings.user_products_cache_users,
+    ttl=settings.user_products_cache_ttl_seconds,
+)
+
+
+def _num(v) -> Optional[float]:
+    return float(v) if v is not None else None
+
+
+def _row_to_product(r) -> UserProduct:
+    return UserProduct(
+        id=r.id,
+        name=str(r.name),
+        name_normalized=normalize_query(str(r.name)),
+        kcal_per_100g=_num(r.kcal_per_100g),
+        protein_100g=_num(r.protein_100g),
+        fat_100g=_num(r.fat_100g),
+        carbs_100g=_num(r.carbs_100g),
+    )
+
+
+class UserProductRepo:
+    """
+    Свои продукты пользователя (nutrition_bot.products_user) — то, чего нет в справочнике,
+    со своей пищевой ценностью. Список пользователя целиком кэшируется в памяти;
+    запись сбрасывает кэш пользователя.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def list_for_user(self, user_id: uuid.UUID) -> Tuple[UserProduct, ...]:
+        cached = _user_products_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        rows = (
+            await self.session.execute(
+                text(
+                    """
+                    SELECT id, name, kcal_per_100g, protein_100g, fat_100g, carbs_100g
+                    FROM nutrition_bot.products_user
+                    WHERE user_id = :user_id
+                    ORDER BY name
+                    """
+                ),
+                {"user_id": user_id},
+            )
+        ).all()
+        products = tuple(_row_to_product(r) for r in rows)
+        _user_products_cache.set(user_id, products)
+        return products
+
+    async def get(self, user_id: uuid.UUID, product_id: uuid.UUID) -> Optional[UserProduct]:
+        return next((p for p in await self.list_for_user(user_id) if p.id == product_id), None)
+
+    async def find_exact(self, user_id: uuid.UUID, raw_name: str) -> Optional[UserProduct]:
+        q = normalize_query(raw_name)
+        if not q:
+            return None
+        return next((p for p in await self.list_for_user(user_id) if p.name_normalized == q), None)
+
+    async def search(self, user_id: uuid.UUID, raw_name: str) -> List[RankedCandidate]:
+        """
+        Кандидаты из своих продуктов для шага маппинга: точное совпадение, вхождение
+        или похожее написание. Без запроса к БД, пока список пользователя в кэше.
+        """
+        q = normalize_query(raw_name)
+        if not q:
+            return []
+
+        scored: list[tuple[float, UserProduct]] = []
+        for p in await self.list_for_user(user_id):
+            if p.name_normalized == q:
+                score = 1.0
+            else:
+                score = SequenceMatcher(None, q, p.name_normalized).ratio()
+                if q in p.name_normalized or p.name_normalized in q:
+                    score = max(score, 0.75)
+                # точное совпадение всегда первым
+                score = min(score, 0.99)
+            if score >= USER_MATCH_MIN_SCORE:
+                scored.append((score, p))
+
+        scored.sort(key=lambda x: (-x[0], x[1].name_normalized))
+        return [
+            RankedCandidate(product_id=p.id, name=p.name, score=score, bucket=BUCKET_USER)
+            for score, p in scored[:USER_CANDIDATES_LIMIT]
+        ]
+
+    async def upsert(
+        self,
+        user_id: uuid.UUID,
+        *,
+        name: str,
+        kcal_per_100g: float,
+        protein_100g: Optional[float] = None,
+        fat_100g: Optional[float] = None,
+        carbs_100g: Optional[float] = None,
+    ) -> UserProduct:
+        """
+        Создаёт свой продукт или переопределяет пищевую ценность существующего (по имени,
+        без учёта регистра). При переопределении ккал/БЖУ уже записанных позиций
+        с этим продуктом пересчитываются вместе с дневным rollup.
+        """
+        row = (
+            await self.session.execute(
+                text(
+                    """
+                    INSERT INTO nutrition_bot.products_user AS pu
+                      (user_id, name, kcal_per_100g, protein_100g, fat_100g, carbs_100g)
+                    VALUES (:user_id, :name, :kcal, :protein, :fat, :carbs)
+                    ON CONFLICT ON CONSTRAINT uq_products_user DO UPDATE
+                      SET kcal_per_100g = excluded.kcal_per_100g,
+                          protein_100g = excluded.protein_100g,
+                          fat_100g = excluded.fat_100g,
+                          carbs_100g = excluded.carbs_100g
+                    RETURNING pu.id, pu.name, pu.kcal_per_100g, pu.protein_100g, pu.fat_100g, pu.carbs_100g,
+                              (pu.xmax = 0) AS inserted
+                    """
+                ),
+                {
+                    "user_id": user_id,
+                    "name": " ".join(name.split()),
+                    "kcal": kcal_per_100g,
+                    "protein": protein_100g,
+                    "fat": fat_100g,
+                    "carbs": carbs_100g,
+                },
+            )
+        ).one()
+        product = _row_to_product(row)
+
+        if not row.inserted:
+            await self._recompute_items(user_id, product)
+
+        # транзакция ещё может откатиться — кэш не дополняем, а сбрасываем: сейчас (эта сессия
+        # перечитает список со своей записью) и по окончании транзакции (прочитанное до коммита
+        # или отката не должно пережить её)
+        _user_products_cache.pop(user_id)
+        after_transaction(self.session, lambda: _user_products_cache.pop(user_id))
+        return product
+
+    async def _recompute_items(self, user_id: uuid.UUID, product: UserProduct) -> None:
+        from app.db.repo_meals import MealRepo
+
+        days = (
+            await self.session.execute(
+                text(
+                    """
+                    WITH upd AS (
+                      UPDATE nutrition_bot.meal_items i
+                      SET kcal_total = round(i.grams * pu.kcal_per_100g / 100, 2),
+                          protein_g = round(i.grams * pu.protein_100g / 100, 2),
+                          fat_g = round(i.grams * pu.fat_100g / 100, 2),
+                          carbs_g = round(i.grams * pu.carbs_100g / 100, 2)
+                      FROM nutrition_bot.products_user pu, nutrition_bot.meals m
+                      WHERE pu.id = :product_id
+                        AND i.user_product_id = pu.id
+                        AND m.id = i.meal_id
+                        AND m.user_id = :user_id
+                      RETURNING m.meal_date
+                    )
+                    SELECT DISTINCT meal_date FROM upd
+                    """
+                ),
+                {"product_id": product.id, "user_id": user_id},
+            )
+        ).scalars().all()
+        if days:
+            await MealRepo(self.session).refresh_day_stats(user_id, list(days))
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import logging
+
+from app.db.repo_frequent import FrequentRepo, invalidate_frequent_cache
+from app.db.session import SessionMaker
+
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_frequent_products() -> None:
+    async with SessionMaker() as session:
+        rows = await FrequentRepo(session).refresh_all()
+        await session.commit()
+    invalidate_frequent_cache()
+    logger.info("frequent products refreshed: %s rows", rows)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import logging
+
+from app.config import settings
+from app.db.repo_meals import MealRepo
+from app.db.session import SessionMaker
+
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_orphan_meals() -> None:
+    """
+    Удаляет приёмы пищи без фото и без граммов в позициях, оставшиеся от старого flow
+    (meal создавался сразу после выбора времени и не удалялся при брошенном вводе).
+    Смотрит только приёмы старше orphan_meals_created_before: после перехода на черновики
+    в FSM такие приёмы сохраняет сам пользователь (правка без граммов), это не мусор.
+    """
+    created_before = settings.orphan_meals_created_before
+    if created_before is None:
+        return
+    async with SessionMaker() as session:
+        deleted = await MealRepo(session).delete_orphan_meals(created_before=created_before)
+        await session.commit()
+    if deleted:
+        logger.info("orphan meals removed: %s", deleted)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from app.config import settings
+from app.db.repo_photo_gc import PhotoGcRepo, QueuedPhoto
+from app.db.session import SessionMaker
+from app.storage.registry import get_storage, storage_for_uri
+
+
+logger = logging.getLogger(__name__)
+
+# размер пачки URI для сверки с meal_photos
+_CHECK_CHUNK = 1000
+
+
+async def _delete_object(item: QueuedPhoto) -> Optional[str]:
+    try:
+        await storage_for_uri(item.storage_uri).delete(item.storage_uri)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"[:500]
+    return None
+
+
+async def _process_batch() -> tuple[int, int]:
+    async with SessionMaker() as session:
+        repo = PhotoGcRepo(session)
+        batch = await repo.claim_batch(limit=settings.photo_gc_batch, max_attempts=settings.photo_gc_max_attempts)
+        if not batch:
+            return 0, 0
+
+        to_delete = [b for b in batch if not b.referenced]
+        # параллелизм ограничен семафором бэкенда (storage_max_concurrency)
+        errors = await asyncio.gather(*(_delete_object(b) for b in to_delete))
+
+        failed = [(b.id, err) for b, err in zip(to_delete, errors) if err is not None]
+        failed_ids = {f[0] for f in failed}
+        await repo.finish_batch([b.id for b in batch if b.id not in failed_ids], failed)
+        await session.commit()
+
+    for item_id, err in failed:
+        logger.warning("photo gc: delete failed (queue id %s): %s", item_id, err)
+    return len(batch), len(failed)
+
+
+async def process_photo_delete_queue() -> None:
+    """
+    Удаляет из хранилища объекты, поставленные в photo_delete_queue (триггер на meal_photos
+    и orphan-скан). Пачки по photo_gc_batch, каждая в своей транзакции; ошибка объекта не
+    валит пачку — он остаётся в очереди до photo_gc_max_attempts попыток.
+    """
+    total = 0
+    while True:
+        processed, failed = await _process_batch()
+        total += processed - failed
+        # неудачи повторим в следующий прогон, а не в цикле
+        if processed < settings.photo_gc_batch or failed:
+            break
+    if total:
+        logger.info("photo gc: removed %s objects", total)
+
+
+async def scan_orphan_photos() -> None:
+    """
+    Инкрементальный скан хранилища новых фото: за прогон — photo_orphan_scan_batch объектов
+    после сохранённого курсора (photo_scan_state), сверка с meal_photos.storage_uri пачками.
+    Объекты без строки в БД и старше photo_orphan_min_age_hours — "осиротевшие"
+    (брошенные черновики, недописанные .part); по photo_orphan_action они только
+    попадают в лог или ставятся в очередь удаления.
+    """
+    storage = get_storage()
+    async with SessionMaker() as session:
+        cursor = await PhotoGcRepo(session).get_scan_cursor(storage.scheme)
+
+    objects, next_cursor = await storage.list_after(cursor, settings.photo_orphan_scan_batch)
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.photo_orphan_min_age_hours)
+    candidates = {o.uri: o for o in objects if o.modified < cutoff}
+    uris = list(candidates)
+
+    reclaim = settings.photo_orphan_action == "delete"
+    orphans: List[str] = []
+    async with SessionMaker() as session:
+        repo = PhotoGcRepo(session)
+        for i in range(0, len(uris), _CHECK_CHUNK):
+            orphans += sorted(await repo.unreferenced_uris(uris[i : i + _CHECK_CHUNK]))
+        if reclaim:
+            await repo.enqueue(orphans)
+        await repo.set_scan_cursor(storage.scheme, next_cursor)
+        await session.commit()
+
+    if orphans:
+        orphan_bytes = sum(candidates[u].size for u in orphans)
+        logger.info(
+            "photo orphan scan: %s of %s objects orphaned, %.1f MB %s",
+            len(orphans),
+            len(objects),
+            orphan_bytes / (1024 * 1024),
+            "queued for deletion" if reclaim else "reclaimable (PHOTO_ORPHAN_ACTION=report)",
+        )
+    if next_cursor is None:
+        logger.info("photo orphan scan: full pass over %s storage finished", storage.scheme)
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+
+from aiogram import Bot
+
+from app.config import settings
+from app.db.repo_meals import MealRepo
+from app.db.session import SessionMaker
+from app.jobs.runner import spawn_job
+
+
+logger = logging.getLogger(__name__)
+
+# как часто обновлять сообщение с прогрессом (Telegram ограничивает частоту правок)
+PROGRESS_EDIT_SECONDS = 2.0
+
+# продукт -> нужен ли повторный проход (справочник поменяли, пока шёл пересчёт)
+_active: dict[uuid.UUID, bool] = {}
+
+
+class _Progress:
+    """
+    Сообщение админу с прогрессом пересчёта: одно сообщение, правится не чаще PROGRESS_EDIT_SECONDS.
+    """
+
+    def __init__(self, bot: Optional[Bot], chat_id: Optional[int], title: str):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.title = title
+        self.message_id: Optional[int] = None
+        self._last_edit = 0.0
+
+    async def update(self, text: str, *, force: bool = False) -> None:
+        if self.bot is None or self.chat_id is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_edit < PROGRESS_EDIT_SECONDS:
+            return
+        self._last_edit = now
+        full = f"{self.title}\n{text}"
+        try:
+            if self.message_id is None:
+                msg = await self.bot.send_message(chat_id=self.chat_id, text=full)
+                self.message_id = msg.message_id
+            else:
+                await self.bot.edit_message_text(chat_id=self.chat_id, message_id=self.message_id, text=full)
+        except Exception:
+            # прогресс — вспомогательный, пересчёт из-за него не останавливаем
+            logger.warning("kcal recompute progress message failed", exc_info=True)
+
+
+async def recompute_product_kcal(
+    product_id: uuid.UUID,
+    *,
+    product_name: str = "",
+    bot: Optional[Bot] = None,
+    chat_id: Optional[int] = None,
+) -> tuple[int, int]:
+    """
+    Пересчёт kcal_total и БЖУ всех позиций продукта по текущим данным справочника.
+    Каждый батч (settings.kcal_recompute_batch позиций) — отдельная короткая транзакция
+    вместе с пересчётом дневного rollup затронутых дней. Возвращает (просмотрено, обновлено).
+    """
+    progress = _Progress(bot, chat_id, f"⏳ Пересчёт ккал/БЖУ: {product_name or product_id}")
+    await progress.update("Начинаю…", force=True)
+
+    scanned = updated = 0
+    after_id: Optional[uuid.UUID] = None
+    while True:
+        async with SessionMaker() as session:
+            after_id, n_scanned, n_updated = await MealRepo(session).recompute_kcal_batch(
+                product_id, after_id=after_id, limit=settings.kcal_recompute_batch
+            )
+            await session.commit()
+
+        if after_id is None:
+            break
+        scanned += n_scanned
+        updated += n_updated
+        await progress.update(f"Просмотрено позиций: {scanned}, обновлено: {updated}")
+        # пауза между батчами — не держим соединение и не мешаем живому трафику
+        await asyncio.sleep(settings.kcal_recompute_pause_ms / 1000)
+
+    progress.title = f"✅ Пересчёт ккал/БЖУ завершён: {product_name or product_id}"
+    await progress.update(f"Просмотрено позиций: {scanned}, обновлено: {updated}", force=True)
+    logger.info("kcal recompute for %s: scanned=%s updated=%s", product_id, scanned, updated)
+    return scanned, updated
+
+
+def schedule_kcal_recompute(
+    product_id: uuid.UUID,
+    *,
+    product_name: str = "",
+    bot: Optional[Bot] = None,
+    chat_id: Optional[int] = None,
+) -> None:
+    """
+    Запуск пересчёта в фоне. Вызывать ПОСЛЕ коммита правки справочника
+    (из хэндлера — через app.db.hooks.after_commit).
+    Если пересчёт этого продукта уже идёт — он будет повторён после завершения.
+    """
+    if product_id in _active:
+        _active[product_id] = True
+        return
+    _active[product_id] = False
+
+    async def _run() -> None:
+        try:
+            while True:
+                await recompute_product_kcal(product_id, product_name=product_name, bot=bot, chat_id=chat_id)
+                if not _active.get(product_id):
+                    break
+                _active[product_id] = False
+        finally:
+            _active.pop(product_id, None)
+
+    spawn_job(f"kcal_recompute:{product_id}", _run())
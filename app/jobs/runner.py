@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodic(
+    name: str,
+    interval_seconds: float,
+    job: Callable[[], Awaitable[object]],
+    *,
+    initial_delay: float = 0.0,
+) -> None:
+    """
+    Крутит job каждые interval_seconds. Ошибка одного прогона логируется и не
+    останавливает цикл (следующий прогон через обычный интервал).
+    """
+    if initial_delay > 0:
+        await asyncio.sleep(initial_delay)
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("background job %s failed", name)
+        await asyncio.sleep(interval_seconds)
+
+
+# разовые фоновые задачи (запущенные из хэндлеров); держим ссылки, чтобы их не собрал GC
+_spawned: set[asyncio.Task] = set()
+
+
+def spawn_job(name: str, coro: Awaitable[object]) -> asyncio.Task:
+    """
+    Запускает разовую задачу в фоне; ошибка логируется.
+    """
+    async def _run() -> None:
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("background job %s failed", name)
+
+    task = asyncio.create_task(_run(), name=f"job:{name}")
+    _spawned.add(task)
+    task.add_done_callback(_spawned.discard)
+    return task
+
+
+async def stop_background_jobs(tasks: list[asyncio.Task]) -> None:
+    all_tasks = list(tasks) + list(_spawned)
+    for task in all_tasks:
+        task.cancel()
+    await asyncio.gather(*all_tasks, return_exceptions=True)
+
+
+def start_background_jobs() -> list[asyncio.Task]:
+    """
+    Запускает фоновые задачи бота в текущем event loop. Задачи нужно отменить при остановке.
+    """
+    from app.jobs.frequent_products import refresh_frequent_products
+    from app.jobs.orphan_meals import sweep_orphan_meals
+    from app.jobs.photo_gc import process_photo_delete_queue, scan_orphan_photos
+
+    tasks = [
+        asyncio.create_task(
+            run_periodic("frequent_products", settings.frequent_refresh_seconds, refresh_frequent_products, initial_delay=30),
+            name="job:frequent_products",
+        ),
+        asyncio.create_task(
+            run_periodic("photo_gc", settings.photo_gc_seconds, process_photo_delete_queue, initial_delay=45),
+            name="job:photo_gc",
+        ),
+        asyncio.create_task(
+            run_periodic("photo_orphan_scan", settings.photo_orphan_scan_seconds, scan_orphan_photos, initial_delay=120),
+            name="job:photo_orphan_scan",
+        ),
+    ]
+    if settings.orphan_meals_created_before is not None:
+        tasks.append(
+            asyncio.create_task(
+                run_periodic("orphan_meals", settings.orphan_meals_sweep_seconds, sweep_orphan_meals, initial_delay=60),
+                name="job:orphan_meals",
+            )
+        )
+    return tasks
@@ -10,7 +10,10 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from app.config import settings
 from app.bot.handlers import build_router
 from app.bot.middlewares.db import DbSessionMiddleware
+from app.bot.middlewares.outbound import OutboundRateLimiter
 from app.bot.middlewares.user_context import UserContextMiddleware
+from app.jobs.runner import start_background_jobs, stop_background_jobs
+from app.storage.registry import close_storages
 
 
 if os.name == "nt":
@@ -21,6 +24,7 @@ async def main() -> None:
     logging.basicConfig(level=logging.INFO)
 
     bot = Bot(token=settings.bot_token)
+    bot.session.middleware(OutboundRateLimiter())
     dp = Dispatcher(storage=MemoryStorage())
 
     db_mw = DbSessionMiddleware()
@@ -34,9 +38,15 @@ async def main() -> None:
 
     dp.include_router(build_router())
 
-    os.makedirs(settings.photo_dir, exist_ok=True)
+    if settings.storage_backend == "local":
+        os.makedirs(settings.photo_dir, exist_ok=True)
 
-    await dp.start_polling(bot)
+    jobs = start_background_jobs()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await stop_background_jobs(jobs)
+        await close_storages()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+
+class StorageError(Exception):
+    pass
+
+
+class ObjectNotFound(StorageError):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    uri: str
+    key: str              # позиция в порядке листинга (курсор скана)
+    size: int
+    modified: datetime    # aware, UTC
+
+
+class PhotoStorage(ABC):
+    """
+    Хранилище фото. Объект адресуется URI (его и пишем в meal_photos.storage_uri):
+    схема URI определяет бэкенд, так что несколько процессов бота с одинаковыми
+    настройками видят одни и те же объекты.
+    """
+
+    scheme: str
+
+    @abstractmethod
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], *, content_type: str) -> str:
+        """
+        Потоковая запись объекта по логическому ключу; возвращает URI.
+        """
+
+    @abstractmethod
+    async def read(self, uri: str) -> bytes:
+        """
+        Содержимое объекта целиком (фото — сотни КБ). ObjectNotFound, если объекта нет.
+        """
+
+    @abstractmethod
+    async def delete(self, uri: str) -> None:
+        """
+        Удаление; отсутствующий объект — не ошибка.
+        """
+
+    @abstractmethod
+    async def list_after(self, cursor: Optional[str], limit: int) -> Tuple[List[StoredObject], Optional[str]]:
+        """
+        Следующие limit объектов после cursor (None — с начала) в стабильном порядке.
+        Возвращает (объекты, новый курсор); курсор None — хранилище пройдено до конца.
+        """
+
+    async def presigned_url(self, uri: str, *, expires_seconds: int) -> Optional[str]:
+        """
+        Временная ссылка на чтение без учётных данных (None — бэкенд не умеет).
+        """
+        return None
+
+    def local_path(self, uri: str) -> Optional[str]:
+        """
+        Путь на диске, если объект лежит в локальной ФС (можно отдать как FSInputFile).
+        """
+        return None
+
+    async def close(self) -> None:
+        return None
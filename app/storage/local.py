@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+import aiofiles
+
+from app.storage.base import ObjectNotFound, PhotoStorage, StoredObject
+
+
+class LocalStorage(PhotoStorage):
+    """
+    Локальная ФС (или общий сетевой диск), шардированная раскладка:
+    <root>/<h[0:2]>/<h[2:4]>/<key>, h = sha1(key) — в одном каталоге не копятся
+    десятки тысяч файлов. URI: file://<абсолютный путь> (старые записи local_path — тоже file://);
+    корень резолвится при создании, поэтому URI не зависят от рабочего каталога процесса.
+    """
+
+    scheme = "file"
+
+    def __init__(self, root: str, *, max_concurrency: int):
+        self.root = Path(root).resolve()
+        self._sem = asyncio.Semaphore(max_concurrency)
+
+    def _path_for_key(self, key: str) -> Path:
+        h = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.root / h[:2] / h[2:4] / key
+
+    @staticmethod
+    def _path(uri: str) -> str:
+        if not uri.startswith("file://"):
+            raise ValueError(f"not a local storage uri: {uri}")
+        return uri[len("file://"):]
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], *, content_type: str) -> str:
+        path = self._path_for_key(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # пишем во временный файл и переименовываем: читатели не видят недописанный объект
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+        async with self._sem:
+            try:
+                async with aiofiles.open(tmp, "wb") as out:
+                    async for chunk in chunks:
+                        await out.write(chunk)
+                os.replace(tmp, path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+        return f"file://{path}"
+
+    async def read(self, uri: str) -> bytes:
+        async with self._sem:
+            try:
+                async with aiofiles.open(self._path(uri), "rb") as f:
+                    return await f.read()
+            except FileNotFoundError as e:
+                raise ObjectNotFound(uri) from e
+
+    async def delete(self, uri: str) -> None:
+        Path(self._path(uri)).unlink(missing_ok=True)
+
+    def local_path(self, uri: str) -> Optional[str]:
+        path = self._path(uri)
+        return path if os.path.isfile(path) else None
+
+    def _list_after_sync(self, cursor: Optional[str], limit: int) -> List[StoredObject]:
+        # обход в порядке имён по компонентам пути; поддеревья целиком до курсора не читаем
+        after = tuple(cursor.split("/")) if cursor else ()
+        out: List[StoredObject] = []
+
+        def walk(dir_path: Path, rel: Tuple[str, ...]) -> None:
+            try:
+                entries = sorted(os.scandir(dir_path), key=lambda e: e.name)
+            except FileNotFoundError:
+                return
+            for e in entries:
+                if len(out) >= limit:
+                    return
+                r = rel + (e.name,)
+                if e.is_dir(follow_symlinks=False):
+                    if r >= after[: len(r)]:
+                        walk(Path(e.path), r)
+                elif e.is_file(follow_symlinks=False) and r > after:
+                    try:
+                        st = e.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    out.append(
+                        StoredObject(
+                            uri=f"file://{self.root.joinpath(*r)}",
+                            key="/".join(r),
+                            size=st.st_size,
+                            modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+                        )
+                    )
+
+        walk(self.root, ())
+        return out
+
+    async def list_after(self, cursor: Optional[str], limit: int) -> Tuple[List[StoredObject], Optional[str]]:
+        objects = await asyncio.to_thread(self._list_after_sync, cursor, limit)
+        next_cursor = objects[-1].key if len(objects) >= limit else None
+        return objects, next_cursor
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Dict
+
+from app.config import settings
+from app.storage.base import PhotoStorage, StorageError
+
+
+# схема URI -> бэкенд (один экземпляр на процесс: общий семафор и клиент S3)
+_backends: Dict[str, PhotoStorage] = {}
+
+# STORAGE_BACKEND -> схема URI новых объектов
+_BACKEND_SCHEMES = {"local": "file", "s3": "s3"}
+
+
+def _build(scheme: str) -> PhotoStorage:
+    if scheme == "file":
+        from app.storage.local import LocalStorage
+
+        return LocalStorage(settings.photo_dir, max_concurrency=settings.storage_max_concurrency)
+    if scheme == "s3":
+        from app.storage.s3 import S3Storage
+
+        return S3Storage(
+            bucket=settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key=settings.s3_access_key,
+            secret_key=settings.s3_secret_key,
+            part_size=settings.storage_multipart_part_mb * 1024 * 1024,
+            max_concurrency=settings.storage_max_concurrency,
+        )
+    raise StorageError(f"unknown storage scheme: {scheme}")
+
+
+def _backend(scheme: str) -> PhotoStorage:
+    storage = _backends.get(scheme)
+    if storage is None:
+        storage = _backends[scheme] = _build(scheme)
+    return storage
+
+
+def get_storage() -> PhotoStorage:
+    """
+    Хранилище для новых фото (settings.storage_backend).
+    """
+    scheme = _BACKEND_SCHEMES.get(settings.storage_backend)
+    if scheme is None:
+        raise StorageError(f"unknown STORAGE_BACKEND: {settings.storage_backend}")
+    return _backend(scheme)
+
+
+def storage_for_uri(uri: str) -> PhotoStorage:
+    """
+    Хранилище существующего объекта — по схеме его URI (старые file:// читаются и после перехода на S3).
+    """
+    scheme, sep, _ = uri.partition("://")
+    if not sep:
+        raise StorageError(f"bad storage uri: {uri}")
+    return _backend(scheme)
+
+
+async def close_storages() -> None:
+    for storage in list(_backends.values()):
+        await storage.close()
+    _backends.clear()
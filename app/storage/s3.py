@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from app.storage.base import ObjectNotFound, PhotoStorage, StorageError, StoredObject
+
+
+# минимальный размер части multipart в S3 (кроме последней)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3Storage(PhotoStorage):
+    """
+    S3-совместимое хранилище (AWS S3, MinIO, Yandex Object Storage и т.п.) через aiobotocore.
+    Зависимость опциональная: импортируется при первом обращении (STORAGE_BACKEND=s3).
+
+    - запись потоковая: поток меньше части — один PutObject, иначе multipart,
+      части уходят параллельно (не больше max_concurrency частей в памяти);
+    - все запросы к хранилищу ограничены общим семафором max_concurrency;
+    - чтение для внешних клиентов — presigned GET.
+    """
+
+    scheme = "s3"
+
+    def __init__(
+        self,
+        *,
+        bucket: str,
+        prefix: str,
+        endpoint_url: Optional[str],
+        region: str,
+        access_key: Optional[str],
+        secret_key: Optional[str],
+        part_size: int,
+        max_concurrency: int,
+    ):
+        if not bucket:
+            raise StorageError("S3 storage requires S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url or None
+        self.region = region
+        self.access_key = access_key or None
+        self.secret_key = secret_key or None
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_concurrency = max_concurrency
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._client: Any = None
+        self._client_ctx: Any = None
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self) -> Any:
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    from aiobotocore.config import AioConfig
+                    from aiobotocore.session import get_session
+
+                    ctx = get_session().create_client(
+                        "s3",
+                        endpoint_url=self.endpoint_url,
+                        region_name=self.region,
+                        aws_access_key_id=self.access_key,
+                        aws_secret_access_key=self.secret_key,
+                        # path-style и SigV4 — понимают и AWS, и MinIO-подобные хранилища
+                        config=AioConfig(signature_version="s3v4", s3={"addressing_style": "path"}),
+                    )
+                    self._client = await ctx.__aenter__()
+                    self._client_ctx = ctx
+        return self._client
+
+    def _uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    @staticmethod
+    def _split(uri: str) -> tuple[str, str]:
+        if not uri.startswith("s3://"):
+            raise ValueError(f"not an s3 uri: {uri}")
+        bucket, _, key = uri[len("s3://"):].partition("/")
+        return bucket, key
+
+    async def _read_part(self, it: AsyncIterator[bytes]) -> bytes:
+        # часть >= part_size (S3 не требует точного размера); короче — только конец потока
+        buf = bytearray()
+        while len(buf) < self.part_size:
+            try:
+                buf += await it.__anext__()
+            except StopAsyncIteration:
+                break
+        return bytes(buf)
+
+    async def _upload_part(self, client: Any, key: str, upload_id: str, number: int, body: bytes) -> dict:
+        async with self._sem:
+            resp = await client.upload_part(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+        return {"PartNumber": number, "ETag": resp["ETag"]}
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes], *, content_type: str) -> str:
+        client = await self._get_client()
+        full_key = f"{self.prefix}{key}"
+        it = chunks.__aiter__()
+
+        first = await self._read_part(it)
+        if len(first) < self.part_size:
+            async with self._sem:
+                await client.put_object(Bucket=self.bucket, Key=full_key, Body=first, ContentType=content_type)
+            return self._uri(full_key)
+
+        async with self._sem:
+            upload_id = (
+                await client.create_multipart_upload(Bucket=self.bucket, Key=full_key, ContentType=content_type)
+            )["UploadId"]
+
+        pending: List[asyncio.Task] = []
+        parts: List[dict] = []
+        try:
+            number, body = 0, first
+            while body:
+                number += 1
+                pending.append(asyncio.create_task(self._upload_part(client, full_key, upload_id, number, body)))
+                if len(pending) >= self.max_concurrency:
+                    parts.append(await pending.pop(0))
+                body = await self._read_part(it)
+            parts += await asyncio.gather(*pending)
+            pending = []
+
+            async with self._sem:
+                await client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=full_key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
+                )
+        except BaseException:
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            # незавершённые части занимают место в бакете, пока upload не отменён
+            await asyncio.shield(
+                client.abort_multipart_upload(Bucket=self.bucket, Key=full_key, UploadId=upload_id)
+            )
+            raise
+        return self._uri(full_key)
+
+    async def read(self, uri: str) -> bytes:
+        from botocore.exceptions import ClientError
+
+        client = await self._get_client()
+        bucket, key = self._split(uri)
+        async with self._sem:
+            try:
+                resp = await client.get_object(Bucket=bucket, Key=key)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                    raise ObjectNotFound(uri) from e
+                raise
+            async with resp["Body"] as body:
+                return await body.read()
+
+    async def delete(self, uri: str) -> None:
+        client = await self._get_client()
+        bucket, key = self._split(uri)
+        async with self._sem:
+            await client.delete_object(Bucket=bucket, Key=key)
+
+    async def list_after(self, cursor: Optional[str], limit: int) -> Tuple[List[StoredObject], Optional[str]]:
+        client = await self._get_client()
+        out: List[StoredObject] = []
+        params: dict = {"Bucket": self.bucket, "Prefix": self.prefix}
+        if cursor:
+            params["StartAfter"] = cursor
+        while len(out) < limit:
+            async with self._sem:
+                resp = await client.list_objects_v2(MaxKeys=min(limit - len(out), 1000), **params)
+            for obj in resp.get("Contents", []):
+                out.append(
+                    StoredObject(
+                        uri=self._uri(obj["Key"]),
+                        key=obj["Key"],
+                        size=obj["Size"],
+                        modified=obj["LastModified"],
+                    )
+                )
+            if not resp.get("IsTruncated"):
+                return out, None
+            params["ContinuationToken"] = resp["NextContinuationToken"]
+        return out, out[-1].key
+
+    async def presigned_url(self, uri: str, *, expires_seconds: int) -> Optional[str]:
+        client = await self._get_client()
+        bucket, key = self._split(uri)
+        return await client.generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires_seconds
+        )
+
+    async def close(self) -> None:
+        if self._client_ctx is not None:
+            await self._client_ctx.__aexit__(None, None, None)
+            self._client = self._client_ctx = None
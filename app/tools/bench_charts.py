@@ -0,0 +1,96 @@
+"""
+Сравнение бэкендов графиков: время импорта, первый и повторный рендер, пиковая память (RSS).
+
+    python -m app.tools.bench_charts --points 30 --repeat 20
+
+Каждый вариант меряется в отдельном процессе (чистый импорт); aiogram и настройки
+импортируются до замера, так что import_ms / rss_import_mb — цена именно модуля графиков.
+Вариант "pyplot-at-import" воспроизводит прежнее поведение utils.charts: matplotlib.pyplot
+импортировался при загрузке модуля.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+_PROBE = r"""
+import json, resource, statistics, sys, time
+from datetime import date, timedelta
+
+mode, points, repeat = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+
+# общие для всех вариантов зависимости — вне замера
+import aiogram.types  # noqa: F401
+import app.config  # noqa: F401
+rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+t0 = time.perf_counter()
+if mode == "pyplot-at-import":
+    import matplotlib.pyplot  # noqa: F401
+import app.bot.utils.charts as charts
+t_import = time.perf_counter() - t0
+rss_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+dates = [date(2026, 1, 1) + timedelta(days=i) for i in range(points)]
+values = [1500 + (i * 37) % 900 for i in range(points)]
+
+t0 = time.perf_counter()
+png = charts.kcal_line_chart(dates, values, "bench").data
+t_first = time.perf_counter() - t0
+
+times = []
+for _ in range(repeat):
+    t0 = time.perf_counter()
+    charts.kcal_line_chart(dates, values, "bench")
+    times.append(time.perf_counter() - t0)
+
+print(json.dumps({
+    "import_ms": t_import * 1000,
+    "first_render_ms": t_first * 1000,
+    "render_median_ms": statistics.median(times) * 1000,
+    "rss_import_mb": (rss_import - rss0) / 1024,
+    "rss_peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "png_kb": len(png) / 1024,
+}))
+"""
+
+# вариант -> бэкенд в настройках
+MODES = {
+    "pillow": "pillow",
+    "matplotlib-lazy": "matplotlib",
+    "pyplot-at-import": "matplotlib",
+}
+
+
+def _probe(mode: str, points: int, repeat: int) -> dict:
+    env = dict(os.environ, CHART_BACKEND=MODES[mode])
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE, mode, str(points), str(repeat)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--points", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--modes", default=",".join(MODES))
+    args = ap.parse_args()
+
+    cols = ["import_ms", "first_render_ms", "render_median_ms", "rss_import_mb", "rss_peak_mb", "png_kb"]
+    print(f"{'mode':<18}" + "".join(f"{c:>18}" for c in cols))
+    for mode in args.modes.split(","):
+        r = _probe(mode, args.points, args.repeat)
+        print(f"{mode:<18}" + "".join(f"{r[c]:>18.1f}" for c in cols))
+
+
+if __name__ == "__main__":
+    main()
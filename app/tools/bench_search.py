@@ -0,0 +1,168 @@
+"""
+Бенчмарк поиска кандидатов: режимы "trgm" и "knn" на синтетическом справочнике.
+
+Запускать ТОЛЬКО на отдельной (одноразовой) базе, где уже выполнен create_tables.sql:
+
+    python -m app.tools.bench_search --dsn postgresql+asyncpg://.../bench --products 500000
+
+Скрипт заполняет nutrition_bot.products_ref / product_synonyms синтетическими
+названиями (если справочник пуст), делает ANALYZE и для каждого запроса и режима
+печатает медиану времени и данные EXPLAIN (ANALYZE, BUFFERS): время исполнения,
+прочитанные/попавшие в кэш страницы и узлы плана, по которым шёл поиск.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.config import settings
+from app.db.repo_products import ProductRepo, normalize_query
+
+
+DEFAULT_QUERIES = ["сок", "хлеб", "молоко", "сыр", "куриная грудка", "макароны из твердых сортов"]
+
+_NOUNS = [
+    "сок", "хлеб", "молоко", "сыр", "йогурт", "кефир", "творог", "масло", "макароны", "рис",
+    "гречка", "овсянка", "котлета", "колбаса", "сосиски", "курица", "говядина", "свинина", "рыба", "лосось",
+    "яблоко", "банан", "апельсин", "печенье", "шоколад", "конфеты", "вафли", "пирог", "салат", "суп",
+    "пельмени", "вареники", "блины", "сметана", "майонез", "кетчуп", "чай", "кофе", "морс", "нектар",
+]
+_ADJS = [
+    "яблочный", "томатный", "ржаной", "пшеничный", "цельнозерновой", "обезжиренный", "топлёный", "твердый",
+    "сливочный", "домашний", "куриный", "говяжий", "копчёный", "варёный", "жареный", "запечённый",
+    "молочный", "горький", "сладкий", "солёный", "апельсиновый", "вишнёвый", "классический", "детский",
+    "фермерский", "отборный", "нежный", "хрустящий", "диетический", "премиум",
+]
+_TAILS = ["", "из твердых сортов", "с наполнителем", "без сахара", "2.5%", "3.2%", "в нарезке", "охлаждённый"]
+
+
+def _arr(values: list[str]) -> str:
+    return "ARRAY[" + ",".join("'" + v.replace("'", "''") + "'" for v in values) + "]"
+
+
+async def _populate(session: AsyncSession, n: int) -> None:
+    existing = int((await session.execute(text("SELECT count(*) FROM nutrition_bot.products_ref"))).scalar_one())
+    if existing >= n:
+        print(f"справочник уже содержит {existing} продуктов — генерация пропущена")
+        return
+
+    print(f"генерируем {n} продуктов...")
+    t0 = time.perf_counter()
+    await session.execute(
+        text(
+            f"""
+            INSERT INTO nutrition_bot.products_ref (name, brand, kcal_per_100g)
+            SELECT
+              trim(
+                ({_arr(_NOUNS)})[1 + (i * 7919) % {len(_NOUNS)}] || ' ' ||
+                ({_arr(_ADJS)})[1 + (i * 104729) % {len(_ADJS)}] || ' ' ||
+                ({_arr(_TAILS)})[1 + (i * 31) % {len(_TAILS)}]
+              ),
+              'бренд ' || (i % 20000),
+              (i % 900)
+            FROM generate_series(1, :n) AS i
+            ON CONFLICT ON CONSTRAINT uq_products_ref_name_brand DO NOTHING
+            """
+        ),
+        {"n": n},
+    )
+    # по синониму на каждый третий продукт: "<прилагательное> <существительное>"
+    await session.execute(
+        text(
+            """
+            INSERT INTO nutrition_bot.product_synonyms (product_ref_id, synonym)
+            SELECT p.id, split_part(p.name, ' ', 2) || ' ' || split_part(p.name, ' ', 1)
+            FROM nutrition_bot.products_ref p
+            WHERE abs(hashtext(p.id::text)) % 3 = 0
+            ON CONFLICT DO NOTHING
+            """
+        )
+    )
+    await session.commit()
+    await session.execute(text("ANALYZE nutrition_bot.products_ref"))
+    await session.execute(text("ANALYZE nutrition_bot.product_synonyms"))
+    await session.commit()
+    print(f"готово за {time.perf_counter() - t0:.1f} c")
+
+
+def _walk_plan(node: dict, out: list[str]) -> None:
+    label = node.get("Node Type", "?")
+    if node.get("Index Name"):
+        label += f" [{node['Index Name']}]"
+    out.append(label)
+    for child in node.get("Plans", []) or []:
+        _walk_plan(child, out)
+
+
+async def _explain(session: AsyncSession, repo: ProductRepo, q: str, limit: int) -> dict:
+    stmt = repo._ranked_query(q, limit=limit, offset=0)
+    sql = str(stmt.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}))
+    raw = (await session.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql))).scalar_one()
+    doc = raw if isinstance(raw, list) else json.loads(raw)
+    plan = doc[0]["Plan"]
+    nodes: list[str] = []
+    _walk_plan(plan, nodes)
+    scans = sorted({n for n in nodes if "Scan" in n})
+    return {
+        "exec_ms": float(doc[0]["Execution Time"]),
+        "hit": int(plan.get("Shared Hit Blocks", 0)),
+        "read": int(plan.get("Shared Read Blocks", 0)),
+        "scans": scans,
+    }
+
+
+async def _bench(session: AsyncSession, engine_name: str, queries: list[str], runs: int, limit: int) -> None:
+    settings.search_engine = engine_name
+    repo = ProductRepo(session)
+
+    print(f"\n=== engine={engine_name} ===")
+    print(f"{'запрос':<30} {'median ms':>10} {'rows':>6} {'exec ms':>9} {'hit':>8} {'read':>8}  планы")
+    for raw_q in queries:
+        q = normalize_query(raw_q)
+        timings = []
+        total = 0
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            # в обход кэша — меряем именно запрос
+            _, total = await repo._fetch_ranked(q, limit=limit, offset=0)
+            timings.append((time.perf_counter() - t0) * 1000)
+            await session.rollback()
+
+        if engine_name == "knn":
+            await repo._set_trgm_thresholds(q)
+        ex = await _explain(session, repo, q, limit)
+        await session.rollback()
+
+        print(
+            f"{raw_q:<30} {statistics.median(timings):>10.1f} {total:>6} "
+            f"{ex['exec_ms']:>9.1f} {ex['hit']:>8} {ex['read']:>8}  {', '.join(ex['scans'])}"
+        )
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк поиска кандидатов (trgm vs knn)")
+    ap.add_argument("--dsn", default=settings.database_dsn, help="DSN одноразовой базы для бенчмарка")
+    ap.add_argument("--products", type=int, default=500_000)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--limit", type=int, default=100, help="глубина выборки (как RANKED_PREFETCH)")
+    ap.add_argument("--query", action="append", help="запрос (можно несколько раз)")
+    args = ap.parse_args()
+
+    engine = create_async_engine(args.dsn)
+    try:
+        async with AsyncSession(engine) as session:
+            await _populate(session, args.products)
+            for engine_name in ("trgm", "knn"):
+                await _bench(session, engine_name, args.query or DEFAULT_QUERIES, args.runs, args.limit)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,508 @@
+"""
+Импорт справочника продуктов из больших дампов (Open Food Facts и подобные):
+CSV/TSV с заголовком или JSONL, в том числе .gz.
+
+    python -m app.tools.import_catalog data/en.openfoodfacts.org.products.csv.gz --cyrillic-only
+    python -m app.tools.import_catalog data/openfoodfacts-products.jsonl.gz --workers 6
+
+Файл читается потоково пачками строк (--chunk-lines); пачки разбирают процессы-воркеры,
+в обработке не больше 2 * workers пачек — память не зависит от размера файла.
+Каждая пачка грузится через COPY во временную таблицу и upsert в products_ref
+(по uq_products_ref_name_brand) и product_synonyms. Смещение в файле сохраняется
+в nutrition_bot.catalog_import_state в той же транзакции: после обрыва повторный
+запуск продолжает с последней загруженной пачки (--restart — начать заново).
+
+Существующие продукты по умолчанию не меняются (справочник мог править админ);
+--update перезаписывает ккал/БЖУ и пересчитывает позиции приёмов этих продуктов.
+
+Строки CSV не должны содержать переводов строк внутри кавычек (дампы OFF — TSV без кавычек).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import math
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import IO, Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+# (name, brand, kcal, protein, fat, carbs, synonyms)
+ImportRow = Tuple[str, Optional[str], float, Optional[float], Optional[float], Optional[float], List[str]]
+
+MAX_NAME_LEN = 200
+MAX_BRAND_LEN = 100
+MAX_SYNONYMS = 5
+
+_WS = re.compile(r"\s+")
+_QUOTES = str.maketrans({"«": '"', "»": '"', "“": '"', "”": '"', "„": '"', "’": "'", "`": "'"})
+# фасовка в названии: "930 мл", "1,5 л", "500г", "2 x 100 g"
+_QTY = re.compile(r"(?:\d+\s*[xх×]\s*)?\d+(?:[.,]\d+)?\s*(?:кг|гр|г|мл|л|kg|g|ml|l)\b\.?", re.IGNORECASE)
+_CYRILLIC = re.compile(r"[а-яё]", re.IGNORECASE)
+_EDGE_PUNCT = " \t-–—,.;:/|_*"
+
+
+@dataclass(frozen=True)
+class ParseConfig:
+    fmt: str                       # "csv" | "jsonl"
+    delimiter: str
+    header: Tuple[str, ...]        # для csv
+    name_fields: Tuple[str, ...]
+    brand_field: str
+    synonym_fields: Tuple[str, ...]
+    cyrillic_only: bool
+
+
+def normalize_name(value: Any, max_len: int = MAX_NAME_LEN) -> Optional[str]:
+    """
+    NFKC, единые кавычки, схлопнутые пробелы, без пунктуации по краям;
+    длинное название режется по границе слова. None — в строке нет букв.
+    """
+    if value is None:
+        return None
+    s = unicodedata.normalize("NFKC", str(value)).translate(_QUOTES)
+    s = _WS.sub(" ", s).strip(_EDGE_PUNCT)
+    if len(s) > max_len:
+        s = s[:max_len].rsplit(" ", 1)[0].strip(_EDGE_PUNCT)
+    if not any(ch.isalpha() for ch in s):
+        return None
+    return s
+
+
+def normalize_brand(value: Any) -> Optional[str]:
+    """
+    В дампах brands — список через запятую; берём первый.
+    """
+    if value is None:
+        return None
+    first = str(value).split(",", 1)[0]
+    return normalize_name(first, MAX_BRAND_LEN)
+
+
+def derive_synonyms(name: str, brand: Optional[str], alt_names: List[str]) -> List[str]:
+    """
+    Синонимы: альтернативные названия из дампа, название без бренда и без фасовки
+    ("Простоквашино молоко 2,5% 930 мл" -> "молоко 2,5%").
+    """
+    candidates = list(alt_names)
+    base = name
+    if brand:
+        stripped = re.sub(re.escape(brand), " ", name, flags=re.IGNORECASE)
+        if stripped != name:
+            base = stripped
+            candidates.append(stripped)
+    candidates.append(_QTY.sub(" ", base))
+
+    out: List[str] = []
+    seen = {name.lower()}
+    for c in candidates:
+        s = normalize_name(c)
+        if not s or len(s) < 3 or s.lower() in seen:
+            continue
+        seen.add(s.lower())
+        out.append(s)
+        if len(out) >= MAX_SYNONYMS:
+            break
+    return out
+
+
+def _num(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        v = float(str(value).replace(",", "."))
+    except ValueError:
+        return None
+    return v if math.isfinite(v) else None
+
+
+def _field(obj: dict, name: str) -> Any:
+    v = obj.get(name)
+    if v is None:
+        # JSONL OFF: пищевая ценность вложена в nutriments
+        nutr = obj.get("nutriments")
+        if isinstance(nutr, dict):
+            v = nutr.get(name)
+    return v
+
+
+def _to_row(obj: dict, cfg: ParseConfig) -> Optional[ImportRow]:
+    names = [n for n in (normalize_name(_field(obj, f)) for f in cfg.name_fields) if n]
+    if not names:
+        return None
+    name = names[0]
+    if cfg.cyrillic_only and not _CYRILLIC.search(name):
+        return None
+
+    kcal = _num(_field(obj, "energy-kcal_100g"))
+    if kcal is None:
+        kj = _num(_field(obj, "energy_100g"))
+        kcal = kj / 4.184 if kj is not None else None
+    # больше ~900 ккал/100 г не бывает — это ошибка ввода в дампе
+    if kcal is None or not 0 <= kcal <= 950:
+        return None
+
+    macros = []
+    for f in ("proteins_100g", "fat_100g", "carbohydrates_100g"):
+        v = _num(_field(obj, f))
+        macros.append(round(v, 2) if v is not None and 0 <= v <= 100 else None)
+
+    brand = normalize_brand(_field(obj, cfg.brand_field))
+    alts = list(names[1:])
+    for f in cfg.synonym_fields:
+        s = normalize_name(_field(obj, f))
+        if s:
+            alts.append(s)
+    synonyms = derive_synonyms(name, brand, alts)
+    return name, brand, round(kcal, 2), macros[0], macros[1], macros[2], synonyms
+
+
+def _init_worker() -> None:
+    # в дампах OFF бывают очень длинные поля (ингредиенты)
+    csv.field_size_limit(sys.maxsize)
+
+
+def parse_chunk(cfg: ParseConfig, lines: List[bytes]) -> Tuple[List[ImportRow], int]:
+    """
+    Разбор пачки сырых строк (в процессе-воркере). Возвращает (строки, отброшено);
+    дубли внутри пачки схлопываются по (name, brand) без учёта регистра, как citext.
+    """
+    decoded = [ln.decode("utf-8", errors="replace") for ln in lines]
+    objs: Iterator[dict]
+    if cfg.fmt == "jsonl":
+        def _json_objs() -> Iterator[dict]:
+            for ln in decoded:
+                ln = ln.strip()
+                if not ln:
+                    continue
+                try:
+                    o = json.loads(ln)
+                except ValueError:
+                    yield {}
+                    continue
+                yield o if isinstance(o, dict) else {}
+        objs = _json_objs()
+    else:
+        header = cfg.header
+        objs = (dict(zip(header, rec)) for rec in csv.reader(decoded, delimiter=cfg.delimiter))
+
+    rows: dict[tuple[str, str], ImportRow] = {}
+    rejected = 0
+    for obj in objs:
+        row = _to_row(obj, cfg)
+        if row is None:
+            rejected += 1
+            continue
+        key = (row[0].lower(), (row[1] or "").lower())
+        prev = rows.get(key)
+        if prev is not None:
+            merged = prev[6] + [s for s in row[6] if s.lower() not in {p.lower() for p in prev[6]}]
+            row = row[:6] + (merged[:MAX_SYNONYMS],)
+        rows[key] = row
+    return list(rows.values()), rejected
+
+
+def _open(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _read_chunks(f: IO[bytes], chunk_lines: int) -> Iterator[Tuple[List[bytes], int]]:
+    """
+    Пачки сырых строк и смещение (в распакованном потоке) после каждой пачки.
+    """
+    while True:
+        lines: List[bytes] = []
+        while len(lines) < chunk_lines:
+            ln = f.readline()
+            if not ln:
+                break
+            lines.append(ln)
+        if not lines:
+            return
+        yield lines, f.tell()
+
+
+_STAGE_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS catalog_import_rows (
+  name      text NOT NULL,
+  brand     text,
+  kcal      numeric(8,2) NOT NULL,
+  protein   numeric(8,2),
+  fat       numeric(8,2),
+  carbs     numeric(8,2),
+  synonyms  text[] NOT NULL
+)
+"""
+
+_UPSERT_BRANDED_SQL = """
+INSERT INTO nutrition_bot.products_ref AS p (name, brand, kcal_per_100g, protein_100g, fat_100g, carbs_100g)
+SELECT r.name, r.brand, r.kcal, r.protein, r.fat, r.carbs
+FROM catalog_import_rows r
+WHERE r.brand IS NOT NULL
+ON CONFLICT ON CONSTRAINT uq_products_ref_name_brand DO UPDATE
+  SET kcal_per_100g = excluded.kcal_per_100g,
+      protein_100g = excluded.protein_100g,
+      fat_100g = excluded.fat_100g,
+      carbs_100g = excluded.carbs_100g
+  WHERE CAST(:update AS boolean)
+    AND (p.kcal_per_100g, p.protein_100g, p.fat_100g, p.carbs_100g)
+        IS DISTINCT FROM (excluded.kcal_per_100g, excluded.protein_100g, excluded.fat_100g, excluded.carbs_100g)
+RETURNING p.id, (p.xmax = 0) AS inserted
+"""
+
+# NULL brand не конфликтует по UNIQUE (name, brand) — сопоставляем по имени явно
+_UPDATE_UNBRANDED_SQL = """
+UPDATE nutrition_bot.products_ref p
+SET kcal_per_100g = r.kcal,
+    protein_100g = r.protein,
+    fat_100g = r.fat,
+    carbs_100g = r.carbs
+FROM catalog_import_rows r
+WHERE r.brand IS NULL
+  AND p.brand IS NULL
+  AND p.name = CAST(r.name AS citext)
+  AND (p.kcal_per_100g, p.protein_100g, p.fat_100g, p.carbs_100g)
+      IS DISTINCT FROM (r.kcal, r.protein, r.fat, r.carbs)
+RETURNING p.id
+"""
+
+_INSERT_UNBRANDED_SQL = """
+INSERT INTO nutrition_bot.products_ref (name, brand, kcal_per_100g, protein_100g, fat_100g, carbs_100g)
+SELECT r.name, NULL, r.kcal, r.protein, r.fat, r.carbs
+FROM catalog_import_rows r
+WHERE r.brand IS NULL
+  AND NOT EXISTS (
+    SELECT 1 FROM nutrition_bot.products_ref p
+    WHERE p.name = CAST(r.name AS citext) AND p.brand IS NULL
+  )
+"""
+
+_SYNONYMS_SQL = """
+INSERT INTO nutrition_bot.product_synonyms (product_ref_id, synonym)
+SELECT DISTINCT p.id, CAST(s.syn AS citext)
+FROM catalog_import_rows r
+JOIN nutrition_bot.products_ref p
+  ON p.name = CAST(r.name AS citext)
+ AND p.brand IS NOT DISTINCT FROM CAST(r.brand AS citext)
+CROSS JOIN LATERAL unnest(r.synonyms) AS s(syn)
+ON CONFLICT ON CONSTRAINT uq_product_synonyms DO NOTHING
+"""
+
+
+@dataclass
+class ChunkResult:
+    inserted: int = 0
+    updated_ids: Tuple = ()
+
+
+async def _load_chunk(conn: AsyncConnection, rows: List[ImportRow], *, update: bool) -> ChunkResult:
+    """
+    COPY пачки во временную таблицу и set-based upsert (в текущей транзакции).
+    """
+    if not rows:
+        return ChunkResult()
+    # заодно открывает транзакцию (BEGIN у драйвера ленивый): COPY идёт в ней же
+    await conn.execute(text("TRUNCATE catalog_import_rows"))
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "catalog_import_rows",
+        records=rows,
+        columns=["name", "brand", "kcal", "protein", "fat", "carbs", "synonyms"],
+    )
+
+    res = (await conn.execute(text(_UPSERT_BRANDED_SQL), {"update": update})).all()
+    inserted = sum(1 for r in res if r.inserted)
+    updated = [r.id for r in res if not r.inserted]
+    if update:
+        updated += list((await conn.execute(text(_UPDATE_UNBRANDED_SQL))).scalars().all())
+    inserted += (await conn.execute(text(_INSERT_UNBRANDED_SQL))).rowcount or 0
+    await conn.execute(text(_SYNONYMS_SQL))
+    return ChunkResult(inserted=inserted, updated_ids=tuple(updated))
+
+
+async def _get_state(conn: AsyncConnection, source: str) -> Optional[Any]:
+    return (
+        await conn.execute(
+            text("SELECT * FROM nutrition_bot.catalog_import_state WHERE source = :source"),
+            {"source": source},
+        )
+    ).first()
+
+
+async def _save_state(conn: AsyncConnection, source: str, **values: Any) -> None:
+    await conn.execute(
+        text(
+            """
+            INSERT INTO nutrition_bot.catalog_import_state
+              (source, file_size, byte_offset, lines_done, inserted, updated, rejected, finished, updated_at)
+            VALUES (:source, :file_size, :byte_offset, :lines_done, :inserted, :updated, :rejected, :finished, now())
+            ON CONFLICT (source) DO UPDATE
+              SET file_size = excluded.file_size,
+                  byte_offset = excluded.byte_offset,
+                  lines_done = excluded.lines_done,
+                  inserted = excluded.inserted,
+                  updated = excluded.updated,
+                  rejected = excluded.rejected,
+                  finished = excluded.finished,
+                  updated_at = excluded.updated_at
+            """
+        ),
+        {"source": source, **values},
+    )
+
+
+def _detect_format(path: str, first_line: bytes) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".ndjson", ".json")) or first_line.lstrip().startswith(b"{"):
+        return "jsonl"
+    return "csv"
+
+
+async def _recompute(product_ids: List[Any]) -> None:
+    from app.jobs.recompute_kcal import recompute_product_kcal
+
+    for pid in product_ids:
+        await recompute_product_kcal(pid)
+
+
+async def _run(args: argparse.Namespace) -> None:
+    from app.db.session import engine
+
+    path = args.path
+    source = args.source or os.path.basename(path)
+    file_size = os.path.getsize(path)
+    workers = max(1, args.workers)
+
+    f = _open(path)
+    first = f.readline()
+    fmt = args.format or _detect_format(path, first)
+    header: Tuple[str, ...] = ()
+    delimiter = args.delimiter or ("\t" if b"\t" in first else ",")
+    if fmt == "csv":
+        header = tuple(next(csv.reader([first.decode("utf-8-sig")], delimiter=delimiter)))
+        data_start = f.tell()
+    else:
+        f.seek(0)
+        data_start = 0
+
+    cfg = ParseConfig(
+        fmt=fmt,
+        delimiter=delimiter,
+        header=header,
+        name_fields=tuple(x for x in args.name_fields.split(",") if x),
+        brand_field=args.brand_field,
+        synonym_fields=tuple(x for x in args.synonym_fields.split(",") if x),
+        cyrillic_only=args.cyrillic_only,
+    )
+
+    async with engine.connect() as conn:
+        await conn.execute(text(_STAGE_SQL))
+        await conn.commit()
+
+        totals = {"byte_offset": data_start, "lines_done": 0, "inserted": 0, "updated": 0, "rejected": 0}
+        state = None if args.restart else await _get_state(conn, source)
+        await conn.rollback()
+        if state is not None:
+            if state.file_size != file_size:
+                sys.exit(f"{source}: размер файла изменился с прошлого импорта — запустите с --restart")
+            if state.finished:
+                print(f"{source}: уже импортирован ({state.inserted} добавлено) — --restart для повторного импорта")
+                return
+            for k in totals:
+                totals[k] = int(getattr(state, k))
+            # gzip: seek вперёд = распаковка с начала, но без разбора и загрузки
+            f.seek(totals["byte_offset"])
+            print(f"{source}: продолжаем с {totals['byte_offset'] / 2**20:.1f} MB, строк {totals['lines_done']}")
+
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        lines_at_start = totals["lines_done"]
+        chunks = _read_chunks(f, args.chunk_lines)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # пачки в порядке файла: чекпоинт после k-й пачки означает "всё до неё загружено"
+            pending: deque = deque()
+            eof = False
+            try:
+                while True:
+                    while not eof and len(pending) < 2 * workers:
+                        item = next(chunks, None)
+                        if item is None:
+                            eof = True
+                            break
+                        lines, end_offset = item
+                        pending.append((loop.run_in_executor(pool, parse_chunk, cfg, lines), end_offset, len(lines)))
+                    if not pending:
+                        break
+
+                    fut, end_offset, n_lines = pending.popleft()
+                    rows, rejected = await fut
+                    result = await _load_chunk(conn, rows, update=args.update)
+                    totals["byte_offset"] = end_offset
+                    totals["lines_done"] += n_lines
+                    totals["inserted"] += result.inserted
+                    totals["updated"] += len(result.updated_ids)
+                    totals["rejected"] += rejected
+                    await _save_state(conn, source, file_size=file_size, finished=False, **totals)
+                    await conn.commit()
+
+                    if result.updated_ids:
+                        await _recompute(list(result.updated_ids))
+
+                    rate = (totals["lines_done"] - lines_at_start) / max(time.perf_counter() - t0, 1e-6)
+                    print(
+                        f"\r{totals['lines_done']} строк, добавлено {totals['inserted']}, "
+                        f"обновлено {totals['updated']}, отброшено {totals['rejected']} ({rate:.0f} строк/с)",
+                        end="",
+                        flush=True,
+                    )
+            except BaseException:
+                for fut, _, _ in pending:
+                    fut.cancel()
+                pool.shutdown(wait=False, cancel_futures=True)
+                print(f"\nимпорт прерван; продолжение с {totals['lines_done']} строки при следующем запуске")
+                raise
+
+        await _save_state(conn, source, file_size=file_size, finished=True, **totals)
+        await conn.commit()
+        # статистика планировщика после массовой вставки
+        await conn.execute(text("ANALYZE nutrition_bot.products_ref"))
+        await conn.execute(text("ANALYZE nutrition_bot.product_synonyms"))
+        await conn.commit()
+    f.close()
+    print(f"\nготово за {time.perf_counter() - t0:.1f} c")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", help="CSV/TSV/JSONL дамп, можно .gz")
+    ap.add_argument("--source", default="", help="ключ чекпоинта (по умолчанию имя файла)")
+    ap.add_argument("--format", choices=("csv", "jsonl"), default=None)
+    ap.add_argument("--delimiter", default=None, help="для CSV; по умолчанию TAB, если он есть в заголовке")
+    ap.add_argument("--name-fields", default="product_name_ru,product_name")
+    ap.add_argument("--brand-field", default="brands")
+    ap.add_argument("--synonym-fields", default="generic_name_ru,generic_name,abbreviated_product_name")
+    ap.add_argument("--cyrillic-only", action="store_true", help="только продукты с кириллицей в названии")
+    ap.add_argument("--update", action="store_true", help="перезаписывать ккал/БЖУ существующих продуктов")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--chunk-lines", type=int, default=20000)
+    ap.add_argument("--restart", action="store_true", help="игнорировать чекпоинт и начать с начала")
+    args = ap.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
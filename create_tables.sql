@@ -2,6 +2,9 @@
 -- Nutrition Telegram Bot (MVP) - PostgreSQL schema
 -- =========================================================
 -- Рекомендуется выполнять под пользователем с правами CREATE EXTENSION/SCHEMA.
+-- Скрипт идемпотентен: повторный запуск на существующей БД обновляет схему и данные
+-- (новые столбцы, бэкфиллы): объекты создаются через IF NOT EXISTS / OR REPLACE,
+-- триггеры — DROP TRIGGER IF EXISTS + CREATE TRIGGER.
 
 BEGIN;
 
@@ -12,9 +15,11 @@ CREATE SCHEMA IF NOT EXISTS nutrition_bot;
 -- pgcrypto: gen_random_uuid()
 -- citext: case-insensitive text
 -- pg_trgm: trigram similarity for fuzzy search
+-- unaccent: нормализация для полнотекстового поиска (russian FTS)
 CREATE EXTENSION IF NOT EXISTS pgcrypto;
 CREATE EXTENSION IF NOT EXISTS citext;
 CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
 
 -- 3) Helper: updated_at trigger
 CREATE OR REPLACE FUNCTION nutrition_bot.set_updated_at()
@@ -27,6 +32,16 @@ BEGIN
 END;
 $$;
 
+-- Нормализация текста для FTS: unaccent + ё→е.
+-- IMMUTABLE-обёртка (словарь указан явно) — нужна для generated-колонок tsvector.
+CREATE OR REPLACE FUNCTION nutrition_bot.fts_normalize(t text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE PARALLEL SAFE STRICT
+AS $$
+  SELECT replace(replace(public.unaccent('public.unaccent'::regdictionary, t), 'ё', 'е'), 'Ё', 'Е')
+$$;
+
 -- =========================================================
 -- USERS
 -- =========================================================
@@ -42,6 +57,7 @@ CREATE TABLE IF NOT EXISTS nutrition_bot.users (
   updated_at       timestamptz NOT NULL DEFAULT now()
 );
 
+DROP TRIGGER IF EXISTS trg_users_updated_at ON nutrition_bot.users;
 CREATE TRIGGER trg_users_updated_at
 BEFORE UPDATE ON nutrition_bot.users
 FOR EACH ROW
@@ -62,6 +78,7 @@ CREATE TABLE IF NOT EXISTS nutrition_bot.user_profile (
   updated_at         timestamptz NOT NULL DEFAULT now()
 );
 
+DROP TRIGGER IF EXISTS trg_user_profile_updated_at ON nutrition_bot.user_profile;
 CREATE TRIGGER trg_user_profile_updated_at
 BEFORE UPDATE ON nutrition_bot.user_profile
 FOR EACH ROW
@@ -87,6 +104,7 @@ CREATE TABLE IF NOT EXISTS nutrition_bot.products_ref (
   CONSTRAINT uq_products_ref_name_brand UNIQUE (name, brand)
 );
 
+DROP TRIGGER IF EXISTS trg_products_ref_updated_at ON nutrition_bot.products_ref;
 CREATE TRIGGER trg_products_ref_updated_at
 BEFORE UPDATE ON nutrition_bot.products_ref
 FOR EACH ROW
@@ -114,11 +132,20 @@ CREATE TABLE IF NOT EXISTS nutrition_bot.products_user (
   CONSTRAINT uq_products_user UNIQUE (user_id, name)
 );
 
+DROP TRIGGER IF EXISTS trg_products_user_updated_at ON nutrition_bot.products_user;
 CREATE TRIGGER trg_products_user_updated_at
 BEFORE UPDATE ON nutrition_bot.products_user
 FOR EACH ROW
 EXECUTE FUNCTION nutrition_bot.set_updated_at();
 
+-- Своя пищевая ценность продукта пользователя (то, чего нет в справочнике):
+-- позиции с user_product_id считают ккал/БЖУ по ней
+ALTER TABLE nutrition_bot.products_user
+  ADD COLUMN IF NOT EXISTS kcal_per_100g numeric(8,2) CHECK (kcal_per_100g >= 0),
+  ADD COLUMN IF NOT EXISTS protein_100g  numeric(8,2) CHECK (protein_100g >= 0),
+  ADD COLUMN IF NOT EXISTS fat_100g      numeric(8,2) CHECK (fat_100g >= 0),
+  ADD COLUMN IF NOT EXISTS carbs_100g    numeric(8,2) CHECK (carbs_100g >= 0);
+
 -- Индексы для "похожего поиска" (вывод топ-10 совпадений / синонимов)
 -- Требует pg_trgm
 CREATE INDEX IF NOT EXISTS idx_products_ref_name_trgm
@@ -127,6 +154,45 @@ CREATE INDEX IF NOT EXISTS idx_products_ref_name_trgm
 CREATE INDEX IF NOT EXISTS idx_product_synonyms_synonym_trgm
   ON nutrition_bot.product_synonyms USING gin (synonym gin_trgm_ops);
 
+-- Чекпоинт импорта справочника из больших дампов (app/tools/import_catalog.py):
+-- обновляется в той же транзакции, что и загруженная пачка, — прерванный импорт
+-- продолжается с byte_offset без потерь и повторов.
+CREATE TABLE IF NOT EXISTS nutrition_bot.catalog_import_state (
+  source       text PRIMARY KEY,         -- имя файла дампа
+  file_size    bigint NOT NULL,
+  byte_offset  bigint NOT NULL DEFAULT 0,
+  lines_done   bigint NOT NULL DEFAULT 0,
+  inserted     bigint NOT NULL DEFAULT 0,
+  updated      bigint NOT NULL DEFAULT 0,
+  rejected     bigint NOT NULL DEFAULT 0,
+  finished     boolean NOT NULL DEFAULT false,
+  updated_at   timestamptz NOT NULL DEFAULT now()
+);
+
+-- GiST-индексы для KNN-поиска (ORDER BY name <-> query LIMIT k, SEARCH_ENGINE=knn):
+-- top-K берётся прямо из индекса, без сортировки всех совпадений.
+CREATE INDEX IF NOT EXISTS idx_products_ref_name_trgm_gist
+  ON nutrition_bot.products_ref USING gist (name gist_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_product_synonyms_synonym_trgm_gist
+  ON nutrition_bot.product_synonyms USING gist (synonym gist_trgm_ops);
+
+-- Полнотекстовый поиск (russian): морфологические варианты ("котлеты" ↔ "котлета"),
+-- которые триграммы ранжируют низко. Generated-колонки + GIN.
+ALTER TABLE nutrition_bot.products_ref
+  ADD COLUMN IF NOT EXISTS name_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('russian'::regconfig, nutrition_bot.fts_normalize(name::text))) STORED;
+
+ALTER TABLE nutrition_bot.product_synonyms
+  ADD COLUMN IF NOT EXISTS synonym_tsv tsvector
+  GENERATED ALWAYS AS (to_tsvector('russian'::regconfig, nutrition_bot.fts_normalize(synonym::text))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_products_ref_name_tsv
+  ON nutrition_bot.products_ref USING gin (name_tsv);
+
+CREATE INDEX IF NOT EXISTS idx_product_synonyms_synonym_tsv
+  ON nutrition_bot.product_synonyms USING gin (synonym_tsv);
+
 CREATE INDEX IF NOT EXISTS idx_products_user_name_trgm
   ON nutrition_bot.products_user USING gin (name gin_trgm_ops);
 
@@ -136,6 +202,24 @@ CREATE INDEX IF NOT EXISTS idx_product_synonyms_product_ref_id
 CREATE INDEX IF NOT EXISTS idx_products_user_user_id
   ON nutrition_bot.products_user (user_id);
 
+-- История выбора продуктов пользователем: raw_name (нормализованный) -> продукт.
+-- Используется для персонального ранжирования кандидатов и авто-выбора.
+CREATE TABLE IF NOT EXISTS nutrition_bot.product_usage (
+  user_id              uuid NOT NULL REFERENCES nutrition_bot.users(id) ON DELETE CASCADE,
+  raw_name_normalized  text NOT NULL,
+  product_ref_id       uuid NOT NULL REFERENCES nutrition_bot.products_ref(id) ON DELETE CASCADE,
+  count                integer NOT NULL DEFAULT 1 CHECK (count > 0),
+  last_used            timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (user_id, raw_name_normalized, product_ref_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_product_usage_user_last_used
+  ON nutrition_bot.product_usage (user_id, last_used DESC);
+
+CREATE INDEX IF NOT EXISTS idx_product_usage_product_ref_id
+  ON nutrition_bot.product_usage (product_ref_id);
+
 -- =========================================================
 -- MEALS + ITEMS + PHOTOS
 -- =========================================================
@@ -151,6 +235,7 @@ CREATE TABLE IF NOT EXISTS nutrition_bot.meals (
   updated_at  timestamptz NOT NULL DEFAULT now()
 );
 
+DROP TRIGGER IF EXISTS trg_meals_updated_at ON nutrition_bot.meals;
 CREATE TRIGGER trg_meals_updated_at
 BEFORE UPDATE ON nutrition_bot.meals
 FOR EACH ROW
@@ -186,8 +271,27 @@ CREATE TABLE IF NOT EXISTS nutrition_bot.meal_items (
 CREATE INDEX IF NOT EXISTS idx_meal_items_meal_id
   ON nutrition_bot.meal_items (meal_id);
 
-CREATE INDEX IF NOT EXISTS idx_meal_items_product_ref_id
-  ON nutrition_bot.meal_items (product_ref_id);
+-- БЖУ позиции в граммах: считаются при записи вместе с kcal_total (как и ккал,
+-- по данным справочника на момент записи / пересчёта), чтобы отчёты не джойнили справочник.
+ALTER TABLE nutrition_bot.meal_items
+  ADD COLUMN IF NOT EXISTS protein_g numeric(10,2) CHECK (protein_g >= 0),
+  ADD COLUMN IF NOT EXISTS fat_g     numeric(10,2) CHECK (fat_g >= 0),
+  ADD COLUMN IF NOT EXISTS carbs_g   numeric(10,2) CHECK (carbs_g >= 0);
+
+-- заполнение для уже существующих позиций
+UPDATE nutrition_bot.meal_items i
+SET protein_g = round(i.grams * p.protein_100g / 100, 2),
+    fat_g     = round(i.grams * p.fat_100g / 100, 2),
+    carbs_g   = round(i.grams * p.carbs_100g / 100, 2)
+FROM nutrition_bot.products_ref p
+WHERE p.id = i.product_ref_id
+  AND i.grams IS NOT NULL
+  AND i.protein_g IS NULL AND i.fat_g IS NULL AND i.carbs_g IS NULL;
+
+-- (product_ref_id, id): поиск позиций продукта + keyset-обход при пересчёте ккал
+DROP INDEX IF EXISTS nutrition_bot.idx_meal_items_product_ref_id;
+CREATE INDEX IF NOT EXISTS idx_meal_items_product_ref_id_id
+  ON nutrition_bot.meal_items (product_ref_id, id);
 
 CREATE INDEX IF NOT EXISTS idx_meal_items_user_product_id
   ON nutrition_bot.meal_items (user_product_id);
@@ -200,7 +304,7 @@ CREATE TABLE IF NOT EXISTS nutrition_bot.meal_photos (
   meal_id            uuid NOT NULL REFERENCES nutrition_bot.meals(id) ON DELETE CASCADE,
   tg_file_id         text NOT NULL,
   tg_file_unique_id  text,
-  local_path         text,          -- например: /data/photos/<user>/<date>/<uuid>.jpg
+  storage_uri        text,          -- file:///data/photos/ab/cd/<user>/<date>/<meal>/<id>.jpg или s3://bucket/photos/...
   mime_type          text,
   width              integer CHECK (width >= 0),
   height             integer CHECK (height >= 0),
@@ -214,12 +318,133 @@ CREATE INDEX IF NOT EXISTS idx_meal_photos_meal_id
 CREATE INDEX IF NOT EXISTS idx_meal_photos_unique_id
   ON nutrition_bot.meal_photos (tg_file_unique_id);
 
+-- local_path (путь на диске одного инстанса) -> storage_uri (file:// или s3://):
+-- несколько процессов бота работают с общим хранилищем фото.
+-- Старые local_path могли быть относительными (PHOTO_DIR по умолчанию "./data/photos") —
+-- они дополняются абсолютным каталогом, из которого работал бот, например:
+--   PGOPTIONS="-c nutrition_bot.photo_base_dir=/srv/nutrition-bot" psql -f create_tables.sql
+ALTER TABLE nutrition_bot.meal_photos
+  ADD COLUMN IF NOT EXISTS storage_uri text;
+
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = 'nutrition_bot' AND table_name = 'meal_photos' AND column_name = 'local_path'
+  ) THEN
+    IF EXISTS (
+      SELECT 1 FROM nutrition_bot.meal_photos
+      WHERE storage_uri IS NULL AND local_path IS NOT NULL AND local_path NOT LIKE '/%'
+    ) AND coalesce(current_setting('nutrition_bot.photo_base_dir', true), '') NOT LIKE '/%' THEN
+      RAISE EXCEPTION 'meal_photos.local_path has relative paths: set nutrition_bot.photo_base_dir to an absolute directory';
+    END IF;
+
+    UPDATE nutrition_bot.meal_photos
+    SET storage_uri = 'file://' || CASE
+      WHEN local_path LIKE '/%' THEN local_path
+      ELSE rtrim(current_setting('nutrition_bot.photo_base_dir', true), '/')
+           || '/' || regexp_replace(local_path, '^(\./)+', '')
+    END
+    WHERE storage_uri IS NULL AND local_path IS NOT NULL;
+
+    ALTER TABLE nutrition_bot.meal_photos DROP COLUMN local_path;
+  END IF;
+END $$;
+
 -- Часто полезно запрещать дубли для одного приема (если unique_id есть)
 -- (если tg_file_unique_id NULL, уникальность не проверится)
 CREATE UNIQUE INDEX IF NOT EXISTS uq_meal_photos_meal_unique_file
   ON nutrition_bot.meal_photos (meal_id, tg_file_unique_id)
   WHERE tg_file_unique_id IS NOT NULL;
 
+-- поиск записи по объекту: сверка хранилища с БД (orphan-скан), проверка перед удалением
+CREATE INDEX IF NOT EXISTS idx_meal_photos_storage_uri
+  ON nutrition_bot.meal_photos (storage_uri);
+
+-- =========================================================
+-- Отложенное удаление файлов фото: строки meal_photos удаляются в транзакции
+-- (каскадом от meals, при правке приёма, уборкой брошенных), а объекты в хранилище
+-- удаляет фоновый воркер пачками (app/jobs/photo_gc.py).
+-- =========================================================
+CREATE TABLE IF NOT EXISTS nutrition_bot.photo_delete_queue (
+  id           bigserial PRIMARY KEY,
+  storage_uri  text NOT NULL,
+  enqueued_at  timestamptz NOT NULL DEFAULT now(),
+  attempts     integer NOT NULL DEFAULT 0,
+  last_error   text
+);
+
+-- Statement-level: одна вставка на DELETE, сколько бы фото он ни задел (в т.ч. каскад).
+CREATE OR REPLACE FUNCTION nutrition_bot.enqueue_deleted_photos()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO nutrition_bot.photo_delete_queue (storage_uri)
+  SELECT DISTINCT o.storage_uri FROM old_photos o WHERE o.storage_uri IS NOT NULL;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_meal_photos_enqueue_delete ON nutrition_bot.meal_photos;
+CREATE TRIGGER trg_meal_photos_enqueue_delete
+AFTER DELETE ON nutrition_bot.meal_photos
+REFERENCING OLD TABLE AS old_photos
+FOR EACH STATEMENT
+EXECUTE FUNCTION nutrition_bot.enqueue_deleted_photos();
+
+-- Курсор инкрементального скана хранилища на "осиротевшие" файлы (без строки в meal_photos).
+CREATE TABLE IF NOT EXISTS nutrition_bot.photo_scan_state (
+  scheme      text PRIMARY KEY,          -- file / s3
+  cursor      text,                      -- последний просмотренный ключ; NULL — начать сначала
+  updated_at  timestamptz NOT NULL DEFAULT now()
+);
+
+-- =========================================================
+-- Шаблоны приёмов пищи ("сохранить как шаблон" / "из шаблона")
+-- =========================================================
+CREATE TABLE IF NOT EXISTS nutrition_bot.meal_templates (
+  id          uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id     uuid NOT NULL REFERENCES nutrition_bot.users(id) ON DELETE CASCADE,
+  name        text NOT NULL,
+  created_at  timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_meal_templates_user_id
+  ON nutrition_bot.meal_templates (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS nutrition_bot.meal_template_items (
+  id              uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  template_id     uuid NOT NULL REFERENCES nutrition_bot.meal_templates(id) ON DELETE CASCADE,
+  position        integer NOT NULL CHECK (position > 0),
+  raw_name        text NOT NULL,
+  product_ref_id  uuid REFERENCES nutrition_bot.products_ref(id) ON DELETE SET NULL,
+  user_product_id uuid REFERENCES nutrition_bot.products_user(id) ON DELETE SET NULL,
+  grams           numeric(10,2) CHECK (grams > 0)
+);
+
+CREATE INDEX IF NOT EXISTS idx_meal_template_items_template_id
+  ON nutrition_bot.meal_template_items (template_id);
+
+-- =========================================================
+-- Частые продукты пользователя (экран "⭐ Частые продукты")
+-- Пересчитывается периодической агрегацией по meal_items (app/jobs/frequent_products.py).
+-- =========================================================
+CREATE TABLE IF NOT EXISTS nutrition_bot.user_frequent_products (
+  user_id          uuid NOT NULL REFERENCES nutrition_bot.users(id) ON DELETE CASCADE,
+  product_ref_id   uuid NOT NULL REFERENCES nutrition_bot.products_ref(id) ON DELETE CASCADE,
+  rank             integer NOT NULL CHECK (rank > 0),
+  uses             integer NOT NULL CHECK (uses > 0),
+  usual_grams      numeric(10,2) NOT NULL CHECK (usual_grams > 0),  -- медиана граммов
+  last_used_date   date NOT NULL,
+  refreshed_at     timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (user_id, product_ref_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_frequent_products_user_rank
+  ON nutrition_bot.user_frequent_products (user_id, rank);
+
 -- =========================================================
 -- Optional: VIEW for daily stats (удобно для "Статистики по дню")
 -- =========================================================
@@ -235,4 +460,122 @@ LEFT JOIN nutrition_bot.meal_items mi ON mi.meal_id = m.id
 LEFT JOIN nutrition_bot.meal_photos mp ON mp.meal_id = m.id
 GROUP BY m.user_id, m.meal_date;
 
+-- =========================================================
+-- Дневной rollup: календарь/статистика читают готовые агрегаты.
+-- Обновляется явно (nutrition_bot.refresh_day_stats) в той же транзакции,
+-- что и запись приёма пищи: сохранение, копирование, удаление.
+-- =========================================================
+CREATE TABLE IF NOT EXISTS nutrition_bot.day_stats (
+  user_id       uuid NOT NULL REFERENCES nutrition_bot.users(id) ON DELETE CASCADE,
+  meal_date     date NOT NULL,
+  meals_count   integer NOT NULL DEFAULT 0,
+  photos_count  integer NOT NULL DEFAULT 0,
+  kcal_total    numeric(12,2) NOT NULL DEFAULT 0,
+  updated_at    timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (user_id, meal_date)
+);
+
+ALTER TABLE nutrition_bot.day_stats
+  ADD COLUMN IF NOT EXISTS protein_g numeric(12,2) NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS fat_g     numeric(12,2) NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS carbs_g   numeric(12,2) NOT NULL DEFAULT 0;
+
+-- Кэш аналитики режима питания (время приёмов, пищевое окно, будни/выходные).
+-- Считается в приложении (NumPy) по всей истории; сбрасывается refresh_day_stats
+-- при любом изменении приёмов пользователя.
+CREATE TABLE IF NOT EXISTS nutrition_bot.meal_timing_summary (
+  user_id      uuid PRIMARY KEY REFERENCES nutrition_bot.users(id) ON DELETE CASCADE,
+  payload      jsonb NOT NULL,
+  computed_at  timestamptz NOT NULL DEFAULT now()
+);
+
+-- Пересчёт rollup для набора дней пользователя (дни без приёмов удаляются).
+-- Позиции и фото агрегируются отдельно (LATERAL), чтобы join не размножал суммы.
+CREATE OR REPLACE FUNCTION nutrition_bot.refresh_day_stats(p_user_id uuid, p_dates date[])
+RETURNS void
+LANGUAGE sql
+AS $$
+  DELETE FROM nutrition_bot.meal_timing_summary WHERE user_id = p_user_id;
+
+  DELETE FROM nutrition_bot.day_stats d
+  WHERE d.user_id = p_user_id
+    AND d.meal_date = ANY (p_dates)
+    AND NOT EXISTS (
+      SELECT 1 FROM nutrition_bot.meals m
+      WHERE m.user_id = p_user_id AND m.meal_date = d.meal_date
+    );
+
+  INSERT INTO nutrition_bot.day_stats
+    (user_id, meal_date, meals_count, photos_count, kcal_total, protein_g, fat_g, carbs_g, updated_at)
+  SELECT
+    m.user_id,
+    m.meal_date,
+    COUNT(*),
+    COALESCE(SUM(ph.cnt), 0),
+    COALESCE(SUM(it.kcal), 0),
+    COALESCE(SUM(it.protein), 0),
+    COALESCE(SUM(it.fat), 0),
+    COALESCE(SUM(it.carbs), 0),
+    now()
+  FROM nutrition_bot.meals m
+  LEFT JOIN LATERAL (
+    SELECT
+      SUM(mi.kcal_total) AS kcal,
+      SUM(mi.protein_g) AS protein,
+      SUM(mi.fat_g) AS fat,
+      SUM(mi.carbs_g) AS carbs
+    FROM nutrition_bot.meal_items mi
+    WHERE mi.meal_id = m.id
+  ) it ON true
+  LEFT JOIN LATERAL (
+    SELECT COUNT(*) AS cnt FROM nutrition_bot.meal_photos mp WHERE mp.meal_id = m.id
+  ) ph ON true
+  WHERE m.user_id = p_user_id
+    AND m.meal_date = ANY (p_dates)
+  GROUP BY m.user_id, m.meal_date
+  ON CONFLICT (user_id, meal_date) DO UPDATE
+    SET meals_count = excluded.meals_count,
+        photos_count = excluded.photos_count,
+        kcal_total = excluded.kcal_total,
+        protein_g = excluded.protein_g,
+        fat_g = excluded.fat_g,
+        carbs_g = excluded.carbs_g,
+        updated_at = excluded.updated_at;
+$$;
+
+-- Заполнение / пересборка rollup из существующих данных
+INSERT INTO nutrition_bot.day_stats (user_id, meal_date, meals_count, photos_count, kcal_total, protein_g, fat_g, carbs_g)
+SELECT
+  m.user_id,
+  m.meal_date,
+  COUNT(*),
+  COALESCE(SUM(ph.cnt), 0),
+  COALESCE(SUM(it.kcal), 0),
+  COALESCE(SUM(it.protein), 0),
+  COALESCE(SUM(it.fat), 0),
+  COALESCE(SUM(it.carbs), 0)
+FROM nutrition_bot.meals m
+LEFT JOIN LATERAL (
+  SELECT
+    SUM(mi.kcal_total) AS kcal,
+    SUM(mi.protein_g) AS protein,
+    SUM(mi.fat_g) AS fat,
+    SUM(mi.carbs_g) AS carbs
+  FROM nutrition_bot.meal_items mi
+  WHERE mi.meal_id = m.id
+) it ON true
+LEFT JOIN LATERAL (
+  SELECT COUNT(*) AS cnt FROM nutrition_bot.meal_photos mp WHERE mp.meal_id = m.id
+) ph ON true
+GROUP BY m.user_id, m.meal_date
+ON CONFLICT (user_id, meal_date) DO UPDATE
+  SET meals_count = excluded.meals_count,
+      photos_count = excluded.photos_count,
+      kcal_total = excluded.kcal_total,
+      protein_g = excluded.protein_g,
+      fat_g = excluded.fat_g,
+      carbs_g = excluded.carbs_g,
+      updated_at = now();
+
 COMMIT;
@@ -0,0 +1,52 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.db.hooks import after_commit, after_transaction
+
+
+class _AsyncLike:
+    """
+    after_commit/after_transaction используют только session.info (у AsyncSession оно общее с sync).
+    """
+
+    def __init__(self, sync: Session):
+        self.info = sync.info
+
+
+def _session() -> Session:
+    session = Session(create_engine("sqlite://"))
+    session.execute(text("SELECT 1"))
+    return session
+
+
+def test_hooks_run_after_commit():
+    calls = []
+    session = _session()
+    after_commit(_AsyncLike(session), lambda: calls.append("commit"))
+    after_transaction(_AsyncLike(session), lambda: calls.append("end"))
+    assert calls == []
+    session.commit()
+    assert calls == ["commit", "end"]
+
+
+def test_rollback_drops_commit_hooks_but_runs_transaction_hooks():
+    calls = []
+    session = _session()
+    after_commit(_AsyncLike(session), lambda: calls.append("commit"))
+    after_transaction(_AsyncLike(session), lambda: calls.append("end"))
+    session.rollback()
+    assert calls == ["end"]
+
+    # в следующей транзакции отброшенные хуки не всплывают
+    session.execute(text("SELECT 1"))
+    session.commit()
+    assert calls == ["end"]
+
+
+def test_failing_hook_does_not_break_the_rest():
+    calls = []
+    session = _session()
+    after_commit(_AsyncLike(session), lambda: 1 / 0)
+    after_commit(_AsyncLike(session), lambda: calls.append("ok"))
+    session.commit()
+    assert calls == ["ok"]
@@ -0,0 +1,60 @@
+import asyncio
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from app.bot.utils.photos import append_draft_photo
+from app.db.repo_meals import DraftPhoto
+
+
+class _SlowStorage(MemoryStorage):
+    """
+    Как внешнее хранилище FSM (Redis): чтение и запись отдают управление event loop.
+    """
+
+    async def get_data(self, key):
+        await asyncio.sleep(0)
+        return await super().get_data(key)
+
+    async def set_data(self, key, data):
+        await asyncio.sleep(0)
+        await super().set_data(key, data)
+
+
+def _photo(n: int, unique_id: str | None = None) -> DraftPhoto:
+    return DraftPhoto(
+        tg_file_id=f"file{n}",
+        tg_file_unique_id=unique_id if unique_id is not None else f"u{n}",
+        storage_uri=f"file:///photos/{n}.jpg",
+        mime_type="image/jpeg",
+        width=100,
+        height=100,
+        file_size_bytes=1000,
+    )
+
+
+def _state() -> FSMContext:
+    return FSMContext(storage=_SlowStorage(), key=StorageKey(bot_id=1, chat_id=10, user_id=10))
+
+
+def test_album_photos_are_not_lost():
+    async def run():
+        state = _state()
+        await asyncio.gather(*(append_draft_photo(state, _photo(n)) for n in range(10)))
+        return await state.get_data()
+
+    data = asyncio.run(run())
+    assert sorted(ph["tg_file_id"] for ph in data["draft_photos"]) == [f"file{n}" for n in range(10)]
+
+
+def test_repeated_photo_is_not_added_twice():
+    async def run():
+        state = _state()
+        first = await append_draft_photo(state, _photo(1))
+        second = await append_draft_photo(state, _photo(2, unique_id="u1"))
+        return first, second, await state.get_data()
+
+    first, second, data = asyncio.run(run())
+    assert (first, second) == (1, 1)
+    assert [ph["tg_file_id"] for ph in data["draft_photos"]] == ["file1"]
@@ -0,0 +1,85 @@
+import asyncio
+import uuid
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.db.repo_meals import DraftItem, MealRepo
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class _Session:
+    """
+    Отдаёт заранее заданные результаты по порядку запросов и запоминает сами запросы.
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.executed = []
+
+    async def execute(self, stmt, params=None):
+        self.executed.append((str(stmt), params))
+        return _Result(self.results.pop(0) if self.results else [])
+
+
+def test_orphan_sweep_keeps_meals_with_grams_and_uses_given_cutoff():
+    cutoff = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+    session = _Session([])
+    deleted = asyncio.run(MealRepo(session).delete_orphan_meals(created_before=cutoff))
+
+    sql, params = session.executed[0]
+    assert deleted == 0
+    assert params == {"created_before": cutoff}
+    assert "i.grams IS NOT NULL" in sql
+    assert "nutrition_bot.meal_photos" in sql
+
+
+def _current_item(item_id: uuid.UUID, position: int, raw_name: str, grams: str):
+    return SimpleNamespace(
+        id=item_id, position=position, raw_name=raw_name, product_ref_id=None, user_product_id=None, grams=Decimal(grams)
+    )
+
+
+def test_apply_edit_touches_only_changed_items():
+    meal_id, user_id = uuid.uuid4(), uuid.uuid4()
+    keep_id, change_id, drop_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    session = _Session(
+        [SimpleNamespace(meal_date=date(2026, 10, 19), meal_time=time(8, 30))],
+        [
+            _current_item(keep_id, 1, "чай", "200.00"),
+            _current_item(change_id, 2, "хлеб", "30.00"),
+            _current_item(drop_id, 3, "сыр", "20.00"),
+        ],
+    )
+    ok = asyncio.run(
+        MealRepo(session).apply_edit(
+            meal_id,
+            user_id=user_id,
+            meal_time=time(8, 30),
+            items=[
+                DraftItem(id=str(keep_id), position=1, raw_name="чай", grams=200.0),
+                DraftItem(id=str(change_id), position=2, raw_name="хлеб", grams=60.0),
+            ],
+            removed_photo_ids=[],
+            new_photos=[],
+        )
+    )
+    assert ok is True
+
+    statements = [sql for sql, _ in session.executed]
+    # приём, позиции, DELETE убранной, UPDATE изменённой, rollup дня; время не менялось
+    assert len(statements) == 5
+    assert statements[2].startswith("DELETE FROM nutrition_bot.meal_items")
+    update_params = session.executed[3][1]
+    assert update_params["ids"] == [change_id]
+    assert update_params["grams"] == [60.0]
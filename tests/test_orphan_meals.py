@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from app.config import settings
+from app.jobs import orphan_meals
+
+
+class _Session:
+    def __init__(self):
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        self.committed = True
+
+
+class _MealRepo:
+    calls: list = []
+
+    def __init__(self, session):
+        self.session = session
+
+    async def delete_orphan_meals(self, *, created_before):
+        _MealRepo.calls.append(created_before)
+        return 0
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    sessions = []
+
+    def session_maker():
+        s = _Session()
+        sessions.append(s)
+        return s
+
+    _MealRepo.calls = []
+    monkeypatch.setattr(orphan_meals, "SessionMaker", session_maker)
+    monkeypatch.setattr(orphan_meals, "MealRepo", _MealRepo)
+    return sessions
+
+
+def test_sweep_is_disabled_without_fixed_cutoff(monkeypatch, fake_db):
+    monkeypatch.setattr(settings, "orphan_meals_created_before", None)
+    asyncio.run(orphan_meals.sweep_orphan_meals())
+    assert fake_db == []
+    assert _MealRepo.calls == []
+
+
+def test_sweep_uses_fixed_cutoff_not_rolling_age(monkeypatch, fake_db):
+    cutoff = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+    monkeypatch.setattr(settings, "orphan_meals_created_before", cutoff)
+    asyncio.run(orphan_meals.sweep_orphan_meals())
+    asyncio.run(orphan_meals.sweep_orphan_meals())
+    assert _MealRepo.calls == [cutoff, cutoff]
+    assert all(s.committed for s in fake_db)
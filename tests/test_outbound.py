@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from aiogram.methods import AnswerCallbackQuery, EditMessageText, SendMediaGroup, SendMessage
+from aiogram.types import InputMediaPhoto
+
+from app.bot.middlewares import outbound
+from app.bot.middlewares.outbound import OutboundRateLimiter, _TokenBucket
+from app.config import settings
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings, "tg_global_rate_per_sec", 25.0)
+    monkeypatch.setattr(settings, "tg_chat_rate_per_sec", 1.0)
+    monkeypatch.setattr(settings, "tg_chat_burst", 3.0)
+    monkeypatch.setattr(outbound.time, "monotonic", lambda: 1000.0)
+
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+
+    monkeypatch.setattr(outbound.asyncio, "sleep", fake_sleep)
+    return OutboundRateLimiter(), waits
+
+
+def _send(limiter: OutboundRateLimiter, method):
+    async def make_request(bot, m):
+        return "ok"
+
+    return asyncio.run(limiter(make_request, None, method))
+
+
+def test_panel_edits_and_callback_answers_skip_chat_bucket(limiter):
+    lim, waits = limiter
+    for n in range(10):
+        _send(lim, EditMessageText(chat_id=1, message_id=5, text=f"page {n}"))
+        _send(lim, AnswerCallbackQuery(callback_query_id=str(n)))
+    assert waits == []
+    assert 1 not in lim._chats
+
+
+def test_media_group_costs_one_token_per_photo(limiter):
+    lim, waits = limiter
+    media = [InputMediaPhoto(media=f"file{n}") for n in range(10)]
+    _send(lim, SendMediaGroup(chat_id=1, media=media))
+    # альбом уходит сразу, но следующий в этот чат ждёт, пока погасится долг 10 - 3 токенов
+    assert waits == []
+    _send(lim, SendMessage(chat_id=1, text="x"))
+    assert waits == [pytest.approx(8.0)]
+
+
+def test_token_bucket_cost_one_matches_plain_queue():
+    b = _TokenBucket(rate=1.0, burst=3.0)
+    now = b.updated
+    assert [b.reserve(now) for _ in range(5)] == [0.0, 0.0, 0.0, 1.0, 2.0]
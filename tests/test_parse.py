@@ -0,0 +1,65 @@
+from datetime import time
+
+import pytest
+
+from app.bot.utils.parse import parse_item_grams, parse_items, split_leading_time
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("макароны 150г", ("макароны", 150.0)),
+        ("салат 200 g", ("салат", 200.0)),
+        ("картофель 0,5 кг", ("картофель", 500.0)),
+        ("молоко 250 мл", ("молоко", 250.0)),
+        ("сок 1 л", ("сок", 1000.0)),
+        ("вода 0.5 л", ("вода", 500.0)),
+        ("water 1.5 l", ("water", 1500.0)),
+        ("котлета 2 шт по 90", ("котлета", 180.0)),
+        ("котлета 2x90 г", ("котлета", 180.0)),
+        ("2x90 г котлета", ("котлета", 180.0)),
+        ("2 шт по 90 котлета", ("котлета", 180.0)),
+        ("пицца 2 куска по 120г", ("пицца", 240.0)),
+        ("сыр 3 ломтика по 20 г", ("сыр", 60.0)),
+        ("2 куска по 120г пицца", ("пицца", 240.0)),
+        ("2 яйца по 60", ("яйца", 120.0)),
+        ("пицца 2 больших куска по 120г", ("пицца 2 больших куска по 120г", None)),
+        ("150г гречка", ("гречка", 150.0)),
+        ("яйца 2 шт", ("яйца", None)),
+        ("3 шт. блины", ("блины", None)),
+        ("салат", ("салат", None)),
+        ("200г", ("200г", None)),
+    ],
+)
+def test_parse_item_grams(text, expected):
+    assert parse_item_grams(text) == expected
+
+
+def test_parse_items_keeps_decimal_comma():
+    assert parse_items("картофель 0,5 кг, сок 1,5 л") == [("картофель", 500.0), ("сок", 1500.0)]
+
+
+def test_parse_items_bare_weight_goes_to_previous_item():
+    assert parse_items("творог 5%, 200г") == [("творог 5%", 200.0)]
+
+
+def test_parse_items_pieces_named_by_product_are_not_a_bare_weight():
+    assert parse_items("хлеб, 2 яйца по 60г") == [("хлеб", None), ("яйца", 120.0)]
+
+
+def test_parse_items_bare_weight_without_target_is_dropped():
+    assert parse_items("200г, хлеб") == [("хлеб", None)]
+    assert parse_items("хлеб 30г, 200г") == [("хлеб", 30.0)]
+
+
+def test_parse_items_mixed():
+    assert parse_items("макароны 150г, котлета 2 шт по 90, салат") == [
+        ("макароны", 150.0),
+        ("котлета", 180.0),
+        ("салат", None),
+    ]
+
+
+def test_split_leading_time():
+    assert split_leading_time("08:30 овсянка 60г") == (time(8, 30), "овсянка 60г")
+    assert split_leading_time("овсянка 60г") == (None, "овсянка 60г")
@@ -0,0 +1,37 @@
+import asyncio
+import uuid
+
+from app.db import hooks
+from app.db.repo_products import ProductFacts, ProductRepo, _facts_cache, _ranked_cache
+
+
+class _Session:
+    def __init__(self):
+        self.info = {}
+
+    async def execute(self, stmt, params=None):
+        return None
+
+
+def _facts(product_id: uuid.UUID, kcal: float) -> ProductFacts:
+    return ProductFacts(
+        product_id=product_id, name="гречка", kcal_per_100g=kcal, protein_100g=None, fat_100g=None, carbs_100g=None
+    )
+
+
+def test_delete_ref_drops_caches_again_after_commit():
+    product_id = uuid.uuid4()
+    session = _Session()
+    _facts_cache.set(product_id, _facts(product_id, 330.0))
+    _ranked_cache.set("гречка", ((), 0))
+
+    asyncio.run(ProductRepo(session).delete_ref(product_id))
+    assert _facts_cache.get(product_id) is None
+    assert _ranked_cache.get("гречка") is None
+
+    # до коммита конкурентный читатель успел заполнить кэши старой строкой
+    _facts_cache.set(product_id, _facts(product_id, 330.0))
+    _ranked_cache.set("гречка", ((), 0))
+    hooks._on_commit(session)
+    assert _facts_cache.get(product_id) is None
+    assert _ranked_cache.get("гречка") is None
@@ -0,0 +1,64 @@
+import asyncio
+import uuid
+from datetime import date, time
+
+from sqlalchemy.dialects import postgresql
+
+from app.db.repo_meals import DraftItem, MealRepo
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class _Session:
+    """
+    Запоминает выполненные запросы; INSERT приёма возвращает заданный id (None — конфликт).
+    """
+
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(stmt)
+        return _Result(self.inserted_id if len(self.statements) == 1 else None)
+
+
+def _save(session, meal_id):
+    return asyncio.run(
+        MealRepo(session).save_draft(
+            meal_id,
+            user_id=uuid.uuid4(),
+            meal_date=date(2026, 10, 19),
+            meal_time=time(8, 30),
+            note=None,
+            items=[DraftItem(id=str(uuid.uuid4()), position=1, raw_name="чай", grams=200.0)],
+            photos=[],
+        )
+    )
+
+
+def test_meal_insert_ignores_existing_id():
+    session = _Session(inserted_id=None)
+    _save(session, uuid.uuid4())
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (id) DO NOTHING" in sql
+
+
+def test_repeated_save_writes_nothing_else():
+    session = _Session(inserted_id=None)
+    assert _save(session, uuid.uuid4()) is False
+    assert len(session.statements) == 1
+
+
+def test_first_save_writes_items_and_rollup():
+    meal_id = uuid.uuid4()
+    session = _Session(inserted_id=meal_id)
+    assert _save(session, meal_id) is True
+    # приём, позиции, rollup дня
+    assert len(session.statements) == 3
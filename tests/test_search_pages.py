@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.db import repo_products
+from app.db.repo_products import BUCKET_USER, ProductRepo, RankedCandidate, _ranked_cache
+
+
+def _candidates(n: int) -> list[RankedCandidate]:
+    return [
+        RankedCandidate(product_id=uuid.uuid4(), name=f"гречка {i:03d}", score=1.0 - i / 1000, bucket=1)
+        for i in range(n)
+    ]
+
+
+class _FakeRepo(ProductRepo):
+    """
+    Выдача запроса — готовый список в порядке ранжирования (без БД).
+    """
+
+    def __init__(self, ranked: list[RankedCandidate]):
+        super().__init__(session=None)
+        self.ranked = ranked
+
+    async def _fetch_ranked(self, q, *, limit, offset, exclude=()):
+        rest = [c for c in self.ranked if c.product_id not in set(exclude)]
+        return rest[offset:offset + limit], len(rest)
+
+
+@pytest.fixture(autouse=True)
+def small_prefetch(monkeypatch):
+    monkeypatch.setattr(repo_products, "RANKED_PREFETCH", 10)
+    _ranked_cache.clear()
+    yield
+    _ranked_cache.clear()
+
+
+def test_deep_pages_are_full_and_cover_everything_once():
+    ranked = _candidates(40)
+    # закреплены: один из кэшированной части выдачи, два — глубже неё
+    pinned = [
+        RankedCandidate(product_id=ranked[i].product_id, name=ranked[i].name, score=1.0, bucket=BUCKET_USER)
+        for i in (3, 15, 27)
+    ]
+    repo = _FakeRepo(ranked)
+    limit = 6
+
+    pages = []
+    offset = 0
+    while True:
+        page, total = asyncio.run(repo.search_ranked_candidates("гречка", limit=limit, offset=offset, pinned=pinned))
+        pages.append(page)
+        offset += limit
+        if offset >= total:
+            break
+
+    assert total == 40
+    assert all(len(p) == limit for p in pages[:-1])
+    ids = [c.product_id for p in pages for c in p]
+    assert len(ids) == len(set(ids)) == 40
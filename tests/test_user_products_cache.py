@@ -0,0 +1,57 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from app.db import hooks
+from app.db.repo_user_products import UserProductRepo, _user_products_cache
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def one(self):
+        return self.row
+
+
+class _Session:
+    def __init__(self, row):
+        self.row = row
+        self.info = {}
+
+    async def execute(self, stmt, params=None):
+        return _Result(self.row)
+
+
+def _upsert(session, user_id):
+    return asyncio.run(UserProductRepo(session).upsert(user_id, name="сырники мамины", kcal_per_100g=220.0))
+
+
+def _row():
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        name="сырники мамины",
+        kcal_per_100g=220.0,
+        protein_100g=None,
+        fat_100g=None,
+        carbs_100g=None,
+        inserted=True,
+    )
+
+
+def test_upsert_drops_cached_list_instead_of_writing_to_it():
+    user_id = uuid.uuid4()
+    _user_products_cache.set(user_id, ())
+    _upsert(_Session(_row()), user_id)
+    assert _user_products_cache.get(user_id) is None
+
+
+def test_list_cached_inside_rolled_back_transaction_is_dropped():
+    user_id = uuid.uuid4()
+    session = _Session(_row())
+    product = _upsert(session, user_id)
+
+    # та же сессия перечитала список (уже с новым продуктом) до коммита, затем откат
+    _user_products_cache.set(user_id, (product,))
+    hooks._on_rollback(session)
+    assert _user_products_cache.get(user_id) is None